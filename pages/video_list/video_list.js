@@ -58,11 +58,11 @@ function handleResolutionChange(event) {
  * Loads videos from the backend and sets up the UI.
  */
 async function loadAndSetupVideos() {
-    let response
     try {
-        response = await getData();
-        VIDEOS = await response.json();
-        await getNewestVideos();
+        const page = await getVideoPage(`video/?limit=${VIDEO_PAGE_SIZE}`);
+        VIDEOS = page.results;
+        NEXT_VIDEO_PAGE = page.next;
+        await getNewestVideos(VIDEOS);
         setStartVideo();
         await renderVideosDynamically();
         setupInitialVideo();
@@ -71,7 +71,50 @@ async function loadAndSetupVideos() {
         document.getElementById('category-new').style.display = 'none';
         document.getElementById('playButton').style.display = 'none';
         showToastMessage(true, ['Failed to load videos']);
+        return;
     }
+    loadRemainingVideos();
+}
+
+/**
+ * Loads the remaining catalogue pages one after another and appends their videos
+ * to the rendered sections (the first page is already visible).
+ */
+async function loadRemainingVideos() {
+    while (NEXT_VIDEO_PAGE) {
+        try {
+            const page = await getVideoPage(NEXT_VIDEO_PAGE);
+            NEXT_VIDEO_PAGE = page.next;
+            appendVideos(page.results);
+        } catch (error) {
+            NEXT_VIDEO_PAGE = null;
+            showToastMessage(true, ['Failed to load more videos']);
+        }
+    }
+}
+
+/**
+ * Adds videos of a further page to VIDEOS and to their sections without re-rendering existing tiles.
+ * @param {Object[]} videos - The videos of the page.
+ */
+function appendVideos(videos) {
+    const container = document.querySelector('.list_section');
+    VIDEOS.push(...videos);
+    const newest = [];
+    getNewestVideos(videos, newest);
+    newest.forEach(video => NEWEST.append(videoTemplate(video)));
+    videos.forEach(video => {
+        const cat = video.category.toLowerCase();
+        if (cat === 'newest') return;
+        let ul = container.querySelector(`.dynamic-category ul[id="${CSS.escape(cat)}"]`);
+        if (!ul) {
+            const section = renderCategorySection(cat, []);
+            container.appendChild(section);
+            ul = section.querySelector('ul');
+        }
+        ul.appendChild(videoTemplate(video));
+    });
+    updateAllScrollIndicators();
 }
 
 /**
@@ -86,14 +129,17 @@ function setupInitialVideo() {
 
 /**
  * Filters the most recent videos (within the last 5 days).
+ * @param {Object[]} videos - The videos to check.
+ * @param {Object[]} [newest] - Receives the recent videos as well (besides LATESTVIDEOS).
  */
-async function getNewestVideos() {
+async function getNewestVideos(videos, newest = []) {
     let currentDate = new Date();
     let timeSpan = new Date(currentDate.getTime() - (5 * 24 * 60 * 60 * 1000));
-    VIDEOS.forEach(video => {
+    videos.forEach(video => {
         const videoDate = new Date(video.created_at)
         if (videoDate >= timeSpan) {
             LATESTVIDEOS.push(video)
+            newest.push(video)
         }
     })
 }
@@ -190,6 +236,7 @@ function renderCategorySection(cat, videos) {
 
 /**
  * Creates a video thumbnail element.
+ * Uses the responsive WebP srcset (if provided) so tiles load a small image instead of the full poster.
  * @param {Object} video - The video object.
  * @returns {HTMLElement} The list item containing the video thumbnail.
  */
@@ -197,6 +244,11 @@ function videoTemplate(video) {
     let listItem = document.createElement('li');
     let img = document.createElement('img');
     img.setAttribute("src", video.thumbnail_url)
+    if (video.thumbnail_srcset && video.thumbnail_srcset.webp) {
+        img.setAttribute("srcset", video.thumbnail_srcset.webp)
+        img.setAttribute("sizes", THUMBNAIL_TILE_SIZES)
+    }
+    img.setAttribute("loading", "lazy")
     img.setAttribute("alt", video.title)
     img.setAttribute("onclick", `showVideo(${video.id})`)
     listItem.append(img);
@@ -91,6 +91,25 @@ async function getData(uid, token) {
     return response;
 }
 
+/**
+ * Loads one page of the video catalogue.
+ * @param {string} url - Relative endpoint (e.g. `video/?limit=50`) or the absolute `next` URL of the previous page.
+ * @returns {Promise<{next: (string|null), results: Object[]}>} The page.
+ */
+async function getVideoPage(url) {
+    const response = await fetch(url.startsWith('http') ? url : `${API_BASE_URL}${url}`, {
+        method: 'GET',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        credentials: 'include',
+    });
+    if (!response.ok) {
+        throw new Error(`Failed to load videos (${response.status})`);
+    }
+    return response.json();
+}
+
 /**
  * Redirects the user to the registration page after validating the email.
  * Stores the entered email in localStorage.
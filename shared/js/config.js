@@ -66,3 +66,17 @@ const TOAST_DURATION = 2000;
  * // url is 'video/5/720p/index.m3u8'
  */
 const URL_TO_INDEX_M3U8 = (id, resolution) => `video/${id}/${resolution}/index.m3u8`
+
+/**
+ * Number of videos per catalogue page (keyset pagination, see `loadRemainingVideos`).
+ * The first page is rendered immediately, the rest is appended in the background.
+ * @constant {number}
+ */
+const VIDEO_PAGE_SIZE = 50;
+
+/**
+ * `sizes` attribute for video tiles in the catalogue.
+ * Tiles are 150px high at 16/9, so the browser picks the 320w (or 640w on HiDPI) variant.
+ * @constant {string}
+ */
+const THUMBNAIL_TILE_SIZES = '267px';
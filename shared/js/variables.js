@@ -17,6 +17,13 @@ let signUpValues = {
  */
 let VIDEOS
 
+/**
+ * URL of the next catalogue page, or null when all videos are loaded.
+ *
+ * @type {string | null}
+ */
+let NEXT_VIDEO_PAGE = null
+
 /**
  * Stores the latest videos fetched or displayed.
  *
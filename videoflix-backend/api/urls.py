@@ -23,11 +23,15 @@ from api.users.views import (
 )
 from api.videos.views import (
     CategoryViewSet,
+    PersonViewSet,
     VideoViewSet,
     VideoCommentViewSet,
     VideoRatingViewSet,
     VideoHLSView,
     VideoSegmentView,
+    VideoSeekView,
+    VideoClipView,
+    VideoThumbnailView,
 )
 from api.info.views import LegalPageViewSet
 
@@ -39,6 +43,7 @@ router.register(r'watch-history', UserWatchHistoryViewSet, basename='watch-histo
 router.register(r'favorites', UserFavoriteViewSet, basename='favorite')
 router.register(r'categories', CategoryViewSet, basename='category')
 router.register(r'video', VideoViewSet, basename='video')
+router.register(r'people', PersonViewSet, basename='person')
 router.register(r'comments', VideoCommentViewSet, basename='comment')
 router.register(r'ratings', VideoRatingViewSet, basename='rating')
 router.register(r'legal', LegalPageViewSet, basename='legal')
@@ -59,7 +64,10 @@ urlpatterns = [
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
     # HLS streaming (vor Router, damit video/1/480p/index.m3u8 nicht vom VideoViewSet abgefangen wird)
+    path('video/<int:movie_id>/thumbnail/<int:width>w.<str:fmt>', VideoThumbnailView.as_view(), name='video_thumbnail'),
     path('video/<int:movie_id>/<str:resolution>/index.m3u8', VideoHLSView.as_view(), name='video_hls'),
+    path('video/<int:movie_id>/<str:resolution>/seek', VideoSeekView.as_view(), name='video_seek'),
+    path('video/<int:movie_id>/<str:resolution>/clip.m3u8', VideoClipView.as_view(), name='video_clip'),
     path('video/<int:movie_id>/<str:resolution>/<str:segment>', VideoSegmentView.as_view(), name='video_segment'),
 
     # REST resources
@@ -25,6 +25,8 @@ from api.users.serializers import (
     UserWatchHistorySerializer,
     UserFavoriteSerializer,
 )
+from core.queues import enqueue_task
+from users.tasks import send_activation_email_task, send_password_reset_email_task
 from users.utils import (
     authenticate_user,
     generate_jwt_tokens,
@@ -252,7 +254,12 @@ def extract_registration_data(request):
 
 
 def send_activation_email_safe(user, uid, token):
-    """Attempt to send activation email. Return success status."""
+    """Queue activation email on the fast queue (sent inline if Redis is unavailable). Return success status."""
+    try:
+        enqueue_task(send_activation_email_task, user.id, uid, token)
+        return True
+    except Exception as error:
+        logging.getLogger(__name__).warning('Could not queue activation email, sending inline: %s', error)
     try:
         send_activation_email(user, uid, token)
         return True
@@ -262,7 +269,12 @@ def send_activation_email_safe(user, uid, token):
 
 
 def _send_password_reset_safe(user, uid, token):
-    """Attempt to send password reset email. Swallows exceptions."""
+    """Queue password reset email on the fast queue (sent inline if Redis is unavailable). Swallows exceptions."""
+    try:
+        enqueue_task(send_password_reset_email_task, user.id, uid, token)
+        return
+    except Exception as error:
+        logging.getLogger(__name__).warning('Could not queue password reset email, sending inline: %s', error)
     try:
         send_password_reset_email(user, uid, token)
     except Exception as error:
@@ -0,0 +1,135 @@
+"""
+Versioned response cache for the public catalogue endpoints.
+
+Rendered responses are stored in the Django cache (Redis) under a key made of
+the endpoint, the query parameters and the current catalogue version. Signals
+bump the version whenever videos or categories change (see core.signals), so
+old entries are never read again and simply expire.
+
+Only one worker recomputes a missing entry (``cache.add`` lock); concurrent
+requests wait for its result instead of hitting the database as well. The same
+mechanism serves request-independent snapshots (see ``get_snapshot``), which
+background jobs can precompute right after a version bump.
+Responses carry an ETag, and a matching If-None-Match is answered with 304.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.http import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+CATALOGUE_VERSION_KEY = 'catalogue:version'
+LOCK_POLL_INTERVAL = 0.05
+
+
+def get_catalogue_version():
+    """Current catalogue version (starts at 1)."""
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOGUE_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOGUE_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalogue_version():
+    """Invalidate all cached catalogue responses."""
+    try:
+        return cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:  # key missing (first bump or evicted)
+        cache.add(CATALOGUE_VERSION_KEY, 2, timeout=None)
+        return cache.get(CATALOGUE_VERSION_KEY)
+
+
+def response_cache_key(view, request, kwargs):
+    """Cache key of a response: endpoint, lookup kwargs, host, query params and catalogue version."""
+    query = sorted((name, sorted(values)) for name, values in request.query_params.lists())
+    parts = [view.basename, view.action, sorted(kwargs.items()), request.get_host(), query]
+    digest = hashlib.sha1(repr(parts).encode()).hexdigest()
+    return f'catalogue:response:{get_catalogue_version()}:{view.basename}:{view.action}:{digest}'
+
+
+def _render(response):
+    """Return the cache entry for a successful response, or None if it must not be cached."""
+    if response.status_code != 200 or not hasattr(response, 'data'):
+        return None
+    content = JSONRenderer().render(response.data)
+    return {'content': content, 'etag': f'"{hashlib.sha1(content).hexdigest()}"'}
+
+
+def _single_flight(key, compute, make_entry, timeout):
+    """
+    Return (entry, result): the cached entry, recomputed by exactly one worker.
+    Waiting workers poll for the result and compute it themselves only if the lock
+    holder does not finish in time. result is set if this call computed it; entries
+    for which make_entry returns None are not cached.
+    """
+    lock_key = f'{key}:lock'
+    deadline = time.monotonic() + settings.CATALOGUE_CACHE_LOCK_WAIT
+    while not cache.add(lock_key, 1, timeout=settings.CATALOGUE_CACHE_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            result = compute()
+            return make_entry(result), result
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry, None
+    try:
+        entry = cache.get(key)  # another worker may have finished just before we got the lock
+        if entry is not None:
+            return entry, None
+        result = compute()
+        entry = make_entry(result)
+        if entry is not None:
+            cache.set(key, entry, timeout=timeout)
+        return entry, result
+    finally:
+        cache.delete(lock_key)
+
+
+def get_snapshot(name, build, rebuild=False):
+    """
+    Return the precomputed snapshot `name` of the current catalogue version, building it
+    once (single worker) if missing. rebuild=True recomputes and stores it unconditionally.
+    """
+    key = f'catalogue:snapshot:{get_catalogue_version()}:{name}'
+    if rebuild:
+        snapshot = build()
+        cache.set(key, snapshot, timeout=settings.CATALOGUE_CACHE_TIMEOUT)
+        return snapshot
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot, _result = _single_flight(key, build, lambda data: data, settings.CATALOGUE_CACHE_TIMEOUT)
+    return snapshot
+
+
+def _etag_matches(etag, if_none_match):
+    """Weak comparison as required for If-None-Match (RFC 9110 13.1.2)."""
+    tags = parse_etags(if_none_match)
+    return '*' in tags or etag in tags or f'W/{etag}' in tags
+
+
+def cached_catalogue_response(view_method):
+    """Cache a GET view method's JSON response per catalogue version (with ETag/304)."""
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = response_cache_key(self, request, kwargs)
+        entry = cache.get(key)
+        if entry is None:
+            entry, response = _single_flight(
+                key, lambda: view_method(self, request, *args, **kwargs), _render, settings.CATALOGUE_CACHE_TIMEOUT
+            )
+            if entry is None:
+                return response
+        etag = entry['etag']
+        if _etag_matches(etag, request.headers.get('If-None-Match', '')):
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(entry['content'], content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'  # clients may keep it, but revalidate (cheap 304)
+        return response
+    return wrapper
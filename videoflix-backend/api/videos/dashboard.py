@@ -0,0 +1,89 @@
+"""
+Category dashboard (``/api/video/by_category/``).
+
+The newest published videos of every category are selected in a single query:
+ROW_NUMBER() over the category partitions of the video/category relation picks
+the top N rows per category; the categories (with their denormalized published
+video count) and primary categories are joined in the same query.
+
+The serialized result is a request-independent snapshot (relative URLs) stored
+per catalogue version (see ``api.videos.cache.get_snapshot``). A background job
+precomputes it after every catalogue change, so requests only read it and make
+the URLs absolute.
+"""
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from videos.models import Video
+
+from .cache import get_snapshot
+from .serializers import CategorySerializer, VideoListSerializer
+
+DASHBOARD_SNAPSHOT = 'by_category'
+
+
+def query_category_dashboard(limit):
+    """
+    Return [(category, [video, ...]), ...] ordered by category name, with the `limit`
+    newest published videos per category. Categories without published videos are
+    left out. One query.
+    """
+    membership = Video.categories.through.objects.filter(video__status='published')
+    rows = (
+        membership
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=F('category_id'),
+            order_by=[F('video__created_at').desc(), F('video_id').desc()],
+        ))
+        .filter(rank__lte=limit)
+        .select_related('category', 'video__primary_category')
+        .order_by('category__name', 'category_id', 'rank')
+    )
+    groups = []
+    for row in rows:
+        if not groups or groups[-1][0].id != row.category_id:
+            groups.append((row.category, []))
+        groups[-1][1].append(row.video)
+    return groups
+
+
+def build_category_dashboard():
+    """Serialize the dashboard without a request (relative URLs), as stored in the snapshot."""
+    return [
+        {
+            'category': CategorySerializer(category).data,
+            'videos': VideoListSerializer(videos, many=True).data,
+        }
+        for category, videos in query_category_dashboard(settings.CATEGORY_DASHBOARD_VIDEOS)
+    ]
+
+
+def _absolute_srcset(srcset, request):
+    candidates = (candidate.rsplit(' ', 1) for candidate in srcset.split(', '))
+    return ', '.join(f'{request.build_absolute_uri(url)} {width}' for url, width in candidates)
+
+
+def _absolute_video(video, request):
+    """Copy of a serialized video row with absolute thumbnail URLs (the placeholder stays a data URI)."""
+    video = dict(video)
+    if video['thumbnail_url'].startswith('/'):
+        video['thumbnail_url'] = request.build_absolute_uri(video['thumbnail_url'])
+    video['thumbnail_srcset'] = {
+        fmt: _absolute_srcset(srcset, request) for fmt, srcset in video['thumbnail_srcset'].items()
+    }
+    return video
+
+
+def get_category_dashboard(request):
+    """Return the dashboard for a request: the current snapshot with absolute URLs."""
+    return [
+        {'category': group['category'], 'videos': [_absolute_video(video, request) for video in group['videos']]}
+        for group in get_snapshot(DASHBOARD_SNAPSHOT, build_category_dashboard)
+    ]
+
+
+def refresh_category_dashboard():
+    """RQ task: precompute the dashboard snapshot of the current catalogue version."""
+    get_snapshot(DASHBOARD_SNAPSHOT, build_category_dashboard, rebuild=True)
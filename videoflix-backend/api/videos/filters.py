@@ -0,0 +1,70 @@
+"""
+Filters and facets of the video list on the normalized people index.
+
+``?person=``, ``?actor=`` and ``?director=`` take a person slug and select the
+videos with a matching credit through an EXISTS on ``VideoCredit`` (index on
+person, role, video) instead of an ILIKE scan over the free-text fields.
+Facets count the credits and release years of the filtered list with one
+GROUP BY query each, joined to the list through its primary keys.
+"""
+from django.conf import settings
+from django.db.models import Count, Exists, F, OuterRef
+from django_filters import rest_framework as django_filters
+
+from videos.models import Video, VideoCredit
+
+PERSON_FILTER_ROLES = {'person': None, 'actor': 'cast', 'director': 'director'}
+
+
+def with_person(queryset, slug, role=None):
+    """Videos of `queryset` crediting the person `slug` (in `role`, or in any role)."""
+    credits = VideoCredit.objects.filter(video=OuterRef('pk'), person__slug=slug)
+    if role:
+        credits = credits.filter(role=role)
+    return queryset.filter(Exists(credits))
+
+
+class VideoFilter(django_filters.FilterSet):
+    """Filters of the video list (fields as before, plus people by slug)."""
+
+    person = django_filters.CharFilter(method='filter_person', label='Person (Slug, jede Rolle)')
+    actor = django_filters.CharFilter(method='filter_person', label='Darsteller/in (Slug)')
+    director = django_filters.CharFilter(method='filter_person', label='Regie (Slug)')
+
+    class Meta:
+        model = Video
+        fields = ['categories__slug', 'quality', 'age_rating', 'release_year']
+
+    def filter_person(self, queryset, name, value):
+        return with_person(queryset, value, PERSON_FILTER_ROLES[name])
+
+
+def credit_facet(videos, role, limit):
+    """[{name, slug, count}] of the people most often credited in `role` among `videos`."""
+    return list(
+        VideoCredit.objects
+        .filter(video__in=videos.order_by().values('pk'), role=role)
+        .values(name=F('person__name'), slug=F('person__slug'))
+        .annotate(count=Count('video_id'))
+        .order_by('-count', 'name')[:limit]
+    )
+
+
+def release_year_facet(videos):
+    """[{release_year, count}] of `videos`, newest year first."""
+    return list(
+        videos.order_by().exclude(release_year=None)
+        .values('release_year')
+        .annotate(count=Count('pk'))
+        .order_by('-release_year')
+    )
+
+
+def video_facets(videos, limit=None):
+    """Facet counts of a filtered video queryset: directors, cast and release years."""
+    limit = limit or settings.VIDEO_FACET_LIMIT
+    return {
+        'directors': credit_facet(videos, 'director', limit),
+        'cast': credit_facet(videos, 'cast', limit),
+        'release_years': release_year_facet(videos),
+    }
@@ -0,0 +1,119 @@
+"""
+Keyset (cursor) pagination for the video catalogue.
+
+Pages are selected with a WHERE on the sort key plus the id as tie-breaker
+(e.g. ``created_at < x OR (created_at = x AND id < y)``) instead of OFFSET,
+so every page costs the same and no COUNT(*) is run. Cursors are opaque
+(base64 encoded JSON) and bound to the ordering they were created for.
+
+Pagination is only active when the request asks for it (``?limit=`` or
+``?cursor=``); without those parameters the view returns the bare array
+as before, so older clients keep working.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Forward-only keyset pagination on (ordering field, id)."""
+
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    page_size = 50
+    max_page_size = 200
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params and self.limit_query_param not in request.query_params:
+            return None  # Kompatibilitätsmodus: ganzes Array
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.field, self.descending = self.get_ordering(request, queryset, view)
+        ordering = self._ordering_key()
+        cursor = self.decode_cursor(request)
+        if cursor is not None:
+            if cursor.get('o') != ordering:
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(self._after(queryset.model, cursor))
+        prefix = '-' if self.descending else ''
+        rows = list(queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')[:self.limit + 1])
+        self.has_next = len(rows) > self.limit
+        self.page = rows[:self.limit]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(limit, 1), self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        """Return (field, descending) of the first ordering term (OrderingFilter or view default)."""
+        ordering = OrderingFilter().get_ordering(request, queryset, view) or ['-id']
+        term = ordering[0]
+        return term.lstrip('-'), term.startswith('-')
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        value = getattr(last, self.field)
+        cursor = {
+            'o': self._ordering_key(),
+            'v': last._meta.get_field(self.field).value_to_string(last) if value is not None else None,
+            'id': last.pk,
+        }
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor, separators=(',', ':')).encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.cursor_query_param)
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            if not isinstance(cursor, dict) or not isinstance(cursor.get('id'), int):
+                raise ValueError
+            return cursor
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _ordering_key(self):
+        return f'-{self.field}' if self.descending else self.field
+
+    def _after(self, model, cursor):
+        """WHERE clause selecting the rows after the cursor position."""
+        try:
+            value = model._meta.get_field(self.field).to_python(cursor.get('v'))
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        lookup = 'lt' if self.descending else 'gt'
+        if self.field == 'id':
+            return Q(**{f'id__{lookup}': cursor['id']})
+        return Q(**{f'{self.field}__{lookup}': value}) | Q(**{self.field: value, f'id__{lookup}': cursor['id']})
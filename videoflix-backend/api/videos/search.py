@@ -0,0 +1,100 @@
+"""
+Full-text and fuzzy search over the video catalogue (PostgreSQL).
+
+Every video carries a stored ``search_vector`` (title weighted A, director and
+cast B, description C; see ``videos.models.video_search_vector``) that is
+updated on save and GIN-indexed. A query matches a video if it matches that
+vector (websearch syntax: ``"exact phrase"``, ``-exclude``, ``or``) or if it is
+trigram-similar to the title or director (pg_trgm ``%`` operator, GIN-indexed
+as well), so typos still find something. Both conditions are index scans,
+unlike the ``ILIKE '%q%'`` sequential scan of DRF's SearchFilter.
+
+Highlights are computed with ``ts_headline`` only for the returned page. The
+database marks matches with control characters; the text is HTML-escaped in
+Python before the markers become ``<mark>`` elements, so titles and
+descriptions cannot inject markup.
+"""
+import html
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, TrigramSimilarity
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from rest_framework.filters import BaseFilterBackend
+
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+
+def search_query(text):
+    """tsquery of a user's search text (websearch syntax, never a syntax error)."""
+    return SearchQuery(text, search_type='websearch', config=settings.VIDEO_SEARCH_CONFIG)
+
+
+def search_condition(text):
+    """WHERE clause of the videos matching `text`: full text, or fuzzy title/director."""
+    return (
+        Q(search_vector=search_query(text))
+        | Q(title__trigram_similar=text)
+        | Q(director__trigram_similar=text)
+    )
+
+
+def search_videos(queryset, text):
+    """Videos of `queryset` matching `text`, best first (full-text rank, then trigram similarity)."""
+    return (
+        queryset.filter(search_condition(text))
+        .annotate(
+            rank=SearchRank(F('search_vector'), search_query(text)),
+            similarity=Greatest(TrigramSimilarity('title', text), TrigramSimilarity('director', text)),
+        )
+        .order_by('-rank', '-similarity', '-id')
+    )
+
+
+def render_highlight(headline):
+    """HTML-escape a ts_headline result and turn its match markers into <mark> elements."""
+    return html.escape(headline).replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+
+
+def add_highlights(videos, text):
+    """Set title_highlight and description_highlight on `videos` (one query for the whole page)."""
+    if not videos:
+        return videos
+    query = search_query(text)
+    options = {'config': settings.VIDEO_SEARCH_CONFIG, 'start_sel': HIGHLIGHT_START, 'stop_sel': HIGHLIGHT_STOP}
+    model = type(videos[0])
+    headlines = dict(
+        (pk, (title, description))
+        for pk, title, description in model.objects.filter(pk__in=[video.pk for video in videos]).annotate(
+            title_highlight=SearchHeadline('title', query, highlight_all=True, **options),
+            description_highlight=SearchHeadline(
+                'description', query, max_fragments=2, max_words=30, min_words=10,
+                fragment_delimiter=' … ', **options
+            ),
+        ).values_list('pk', 'title_highlight', 'description_highlight')
+    )
+    for video in videos:
+        title, description = headlines.get(video.pk, (video.title, video.description))
+        video.title_highlight = render_highlight(title)
+        video.description_highlight = render_highlight(description)
+    return videos
+
+
+class VideoSearchFilter(BaseFilterBackend):
+    """?search= filter of the video list on the indexed search columns (replaces SearchFilter)."""
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get(self.search_param, '').strip()
+        return queryset.filter(search_condition(text)) if text else queryset
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Full-text search (title, director, cast, description) with typo tolerance',
+            'schema': {'type': 'string'},
+        }]
@@ -1,6 +1,39 @@
-import os
+from django.conf import settings
 from rest_framework import serializers
-from videos.models import Category, Video, VideoComment, VideoRating
+from videos.models import Category, Person, Video, VideoComment, VideoCredit, VideoRating, VideoRendition
+from videos.thumbnails import supported_derivative_formats, thumbnail_version
+
+
+def build_thumbnail_srcset(video, request=None):
+    """Return {format: srcset} with one responsive thumbnail URL per configured width."""
+    base_url = f'/api/video/{video.id}/thumbnail/'
+    if request:
+        base_url = request.build_absolute_uri(base_url)
+    version = thumbnail_version(video)
+    return {
+        fmt: ', '.join(
+            f'{base_url}{width}w.{fmt}?v={version} {width}w'
+            for width in settings.THUMBNAIL_DERIVATIVE_WIDTHS
+        )
+        for fmt in supported_derivative_formats()
+    }
+
+
+def ready_renditions(video):
+    """Ready renditions of a video, lowest first (uses the 'ready_renditions' prefetch if present)."""
+    prefetched = getattr(video, 'ready_renditions', None)
+    if prefetched is not None:
+        return prefetched
+    return list(video.renditions.filter(is_ready=True).order_by('height'))
+
+
+class VideoRenditionSerializer(serializers.ModelSerializer):
+    """Serializer für fertige HLS-Renditions"""
+
+    class Meta:
+        model = VideoRendition
+        fields = ['resolution', 'codec', 'width', 'height', 'bandwidth', 'average_bandwidth',
+                  'segment_count', 'bytes']
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -14,14 +47,38 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
     def get_video_count(self, obj):
-        """Gibt die Anzahl der Videos in dieser Kategorie zurück"""
-        return obj.videos.filter(status='published').count()
+        """Gibt die Anzahl der veröffentlichten Videos zurück (denormalisierter Zähler, keine Abfrage)"""
+        return obj.published_video_count
+
+
+class PersonSerializer(serializers.ModelSerializer):
+    """Serializer für Personen (Regie, Besetzung)"""
+
+    video_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Person
+        fields = ['id', 'name', 'slug', 'video_count']
+        read_only_fields = fields
+
+
+class VideoCreditSerializer(serializers.ModelSerializer):
+    """Mitwirkung an einem Video (Person mit Rolle)"""
+
+    name = serializers.CharField(source='person.name', read_only=True)
+    slug = serializers.CharField(source='person.slug', read_only=True)
+
+    class Meta:
+        model = VideoCredit
+        fields = ['name', 'slug', 'role']
+        read_only_fields = fields
 
 
 class VideoListSerializer(serializers.ModelSerializer):
     """Serializer für Video-Liste (API-Spezifikation)"""
     
     thumbnail_url = serializers.SerializerMethodField()
+    thumbnail_srcset = serializers.SerializerMethodField()
     category = serializers.SerializerMethodField()
 
     class Meta:
@@ -32,6 +89,7 @@ class VideoListSerializer(serializers.ModelSerializer):
             'title',
             'description',
             'thumbnail_url',
+            'thumbnail_srcset',
             'category'
         ]
         read_only_fields = ['id', 'created_at']
@@ -39,26 +97,37 @@ class VideoListSerializer(serializers.ModelSerializer):
     _PLACEHOLDER_IMG = "data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7"
 
     def get_thumbnail_url(self, obj):
-        """Thumbnail-URL nur wenn Datei existiert, sonst Platzhalter – so werden Thumbnails immer angezeigt."""
-        try:
-            if obj.thumbnail:
-                path = getattr(obj.thumbnail, 'path', None)
-                if path and os.path.exists(path):
-                    request = self.context.get('request')
-                    if request:
-                        return request.build_absolute_uri(obj.thumbnail.url)
-                    return obj.thumbnail.url
-        except Exception:
-            pass
-        return self._PLACEHOLDER_IMG
+        """
+        Thumbnail-URL wenn thumbnail_ready gesetzt ist, sonst Platzhalter – so werden Thumbnails
+        immer angezeigt. Kein Dateisystemzugriff pro Zeile (video_path_check gleicht das Flag ab).
+        """
+        if not (obj.thumbnail_ready and obj.thumbnail):
+            return self._PLACEHOLDER_IMG
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(obj.thumbnail.url)
+        return obj.thumbnail.url
+
+    def get_thumbnail_srcset(self, obj):
+        """Responsive WebP/AVIF srcset strings per format; empty if there is no thumbnail."""
+        if self.get_thumbnail_url(obj) == self._PLACEHOLDER_IMG:
+            return {}
+        return build_thumbnail_srcset(obj, self.context.get('request'))
 
     def get_category(self, obj):
-        """Gibt die erste Kategorie zurück (singular). Wirft nie."""
-        try:
-            first = obj.categories.first()
-            return first.name if first else ""
-        except Exception:
-            return ""
+        """Gibt die Hauptkategorie zurück (singular, denormalisiert – mit select_related keine Abfrage pro Zeile)."""
+        return obj.primary_category.name if obj.primary_category else ""
+
+
+class VideoSearchResultSerializer(VideoListSerializer):
+    """Suchtreffer: Listenfelder plus Relevanz und hervorgehobene Fundstellen (HTML mit <mark>, escaped)"""
+
+    rank = serializers.FloatField(read_only=True)
+    title_highlight = serializers.CharField(read_only=True)
+    description_highlight = serializers.CharField(read_only=True)
+
+    class Meta(VideoListSerializer.Meta):
+        fields = VideoListSerializer.Meta.fields + ['rank', 'title_highlight', 'description_highlight']
 
 
 class VideoListDetailedSerializer(serializers.ModelSerializer):
@@ -87,16 +156,18 @@ class VideoDetailSerializer(serializers.ModelSerializer):
     comment_count = serializers.SerializerMethodField()
     rating_count = serializers.SerializerMethodField()
     uploaded_by_name = serializers.SerializerMethodField()
+    renditions = serializers.SerializerMethodField()
+    credits = VideoCreditSerializer(many=True, read_only=True)
 
     class Meta:
         model = Video
         fields = [
             'id', 'title', 'slug', 'description', 'categories',
-            'original_video', 'video_360p', 'video_480p', 'video_720p', 'video_1080p',
+            'original_video', 'renditions',
             'thumbnail', 'duration', 'formatted_duration', 'quality',
             'file_size', 'formatted_file_size', 'status', 'is_featured',
             'published_at', 'view_count', 'rating', 'rating_count',
-            'comment_count', 'director', 'cast', 'release_year',
+            'comment_count', 'director', 'cast', 'credits', 'release_year',
             'language', 'age_rating', 'uploaded_by_name', 'created_at', 'updated_at'
         ]
         read_only_fields = [
@@ -118,6 +189,10 @@ class VideoDetailSerializer(serializers.ModelSerializer):
             return obj.uploaded_by.full_name or obj.uploaded_by.username
         return None
 
+    def get_renditions(self, obj):
+        """Gibt die fertigen HLS-Renditions zurück (niedrigste zuerst)"""
+        return VideoRenditionSerializer(ready_renditions(obj), many=True).data
+
 
 class VideoCreateSerializer(serializers.ModelSerializer):
     """Serializer für Video-Upload"""
@@ -203,19 +278,17 @@ class VideoStreamSerializer(serializers.ModelSerializer):
         ]
 
     def get_available_qualities(self, obj):
-        """Returns list of available quality options"""
-        return ['360p', '480p', '720p', '1080p']
+        """Returns the resolutions with a ready rendition (lowest first)"""
+        return [rendition.resolution for rendition in ready_renditions(obj)]
     
     def get_hls_streams(self, obj):
-        """Returns HLS M3U8 URLs for all qualities"""
+        """Returns HLS M3U8 URLs for the ready renditions"""
         request = self.context.get('request')
         base_url = request.build_absolute_uri('/') if request else 'http://localhost:8000/'
         
         return {
-            '360p': f'{base_url}api/video/{obj.id}/360p/index.m3u8',
-            '480p': f'{base_url}api/video/{obj.id}/480p/index.m3u8',
-            '720p': f'{base_url}api/video/{obj.id}/720p/index.m3u8',
-            '1080p': f'{base_url}api/video/{obj.id}/1080p/index.m3u8',
+            rendition.resolution: f'{base_url}api/video/{obj.id}/{rendition.resolution}/index.m3u8'
+            for rendition in ready_renditions(obj)
         }
     
     def get_thumbnail_url(self, obj):
@@ -1,20 +1,29 @@
-from django.db.models import Avg, Prefetch
+from django.conf import settings
+from django.db.models import Avg, Count, Prefetch, Q
 from django.http import Http404
 from django_filters.rest_framework import DjangoFilterBackend
-from drf_spectacular.utils import extend_schema, extend_schema_view
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 import logging
-from videos.models import Category, Video, VideoComment, VideoRating
+import redis
+from videos.models import Category, Person, Video, VideoComment, VideoCredit, VideoRating, VideoRendition
 
 logger = logging.getLogger(__name__)
+from api.videos.cache import cached_catalogue_response
+from api.videos.dashboard import get_category_dashboard
+from api.videos.filters import VideoFilter, video_facets, with_person
+from api.videos.pagination import KeysetPagination
+from api.videos.search import VideoSearchFilter, add_highlights, search_videos
 from api.videos.serializers import (
     CategorySerializer,
+    PersonSerializer,
     VideoListSerializer,
     VideoListDetailedSerializer,
+    VideoSearchResultSerializer,
     VideoDetailSerializer,
     VideoCreateSerializer,
     VideoCommentSerializer,
@@ -30,7 +39,20 @@ from videos.utils import (
     validate_segment_name,
     serve_original_mp4,
     serve_ts_segment,
+    serve_thumbnail_variant,
+    get_ready_resolutions,
+    serve_nearest_rendition_playlist,
+    record_rendition_access,
+    parse_seconds_param,
+    serve_segment_seek,
+    serve_clip_playlist,
 )
+from videos.tasks import enqueue_hls_rendition, enqueue_renditions_if_popular
+from videos.hero import pick_hero_id, remove_video as remove_hero_video
+from videos.suggest import suggest as suggest_terms
+from videos.trending import record_view, trending_in_category
+
+HERO_PICK_ATTEMPTS = 3
 
 
 def validate_video_and_resolution(video, resolution):
@@ -48,6 +70,16 @@ def get_video_stream_response(movie_id, resolution):
     original_path = get_original_video_path(video)
     if not original_path:
         raise Http404('Video file not found')
+    record_rendition_access(video.id, resolution)
+    ready = get_ready_resolutions(video)
+    if resolution not in ready:
+        try:
+            enqueue_hls_rendition(video.id, resolution)
+        except redis.RedisError as exc:
+            logger.warning(f'Could not enqueue {resolution} rendition of video ID {video.id}: {exc}')
+        response = serve_nearest_rendition_playlist(original_path, resolution, ready)
+        if response:
+            return response
     m3u8_path = build_m3u8_path(original_path, resolution)
     response = serve_m3u8_or_fallback(m3u8_path, original_path)
     if not response:
@@ -64,6 +96,51 @@ class VideoHLSView(APIView):
         return get_video_stream_response(movie_id, resolution)
 
 
+def get_rendition_original_path(movie_id, resolution):
+    """Return (original_path, None) for a published video and valid resolution, or (None, 400 Response)."""
+    video = get_published_video(movie_id)
+    invalid_response = validate_hls_resolution(resolution)
+    if invalid_response:
+        return None, invalid_response
+    original_path = get_original_video_path(video)
+    if not original_path:
+        raise Http404('Video file not found')
+    return original_path, None
+
+
+class VideoSeekView(APIView):
+    """Return the segment (name, start, byte offset) containing a timestamp, via the segment index."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, movie_id, resolution):
+        """GET ?t=<seconds>"""
+        original_path, error_response = get_rendition_original_path(movie_id, resolution)
+        if error_response:
+            return error_response
+        seconds, error_response = parse_seconds_param(request.query_params.get('t'), 't')
+        if error_response:
+            return error_response
+        return serve_segment_seek(original_path, resolution, seconds)
+
+
+class VideoClipView(APIView):
+    """Return an HLS playlist with only the segments of a time range (clip)."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, movie_id, resolution):
+        """GET ?start=<seconds>&end=<seconds>"""
+        original_path, error_response = get_rendition_original_path(movie_id, resolution)
+        if error_response:
+            return error_response
+        start, error_response = parse_seconds_param(request.query_params.get('start'), 'start')
+        if error_response:
+            return error_response
+        end, error_response = parse_seconds_param(request.query_params.get('end'), 'end')
+        if error_response:
+            return error_response
+        return serve_clip_playlist(original_path, resolution, start, end)
+
+
 def get_segment_response(movie_id, resolution, segment):
     """Get HLS segment response (original.mp4 or .ts file)."""
     video = get_published_video(movie_id)
@@ -100,6 +177,16 @@ class VideoSegmentView(APIView):
         return serve_ts_segment(original_path, resolution, segment)
 
 
+class VideoThumbnailView(APIView):
+    """Return a responsive thumbnail variant (WebP/AVIF) in the requested width."""
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, movie_id, width, fmt):
+        """Return the resized thumbnail image."""
+        video = get_published_video(movie_id)
+        return serve_thumbnail_variant(video, width, fmt)
+
+
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     """
     Read-only ViewSet for video categories.
@@ -109,6 +196,68 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [permissions.AllowAny]
     lookup_field = 'slug'
 
+    @cached_catalogue_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_catalogue_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+
+@extend_schema_view(
+    list=extend_schema(description='Personen (Regie, Besetzung) mit Anzahl veröffentlichter Videos'),
+    retrieve=extend_schema(description='Person mit Anzahl veröffentlichter Videos'),
+)
+class PersonViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only ViewSet for people (normalized from director and cast).
+    GET /api/people/<slug>/videos/ returns their published videos ("more with this actor").
+    """
+    queryset = Person.objects.annotate(
+        video_count=Count('credits__video', filter=Q(credits__video__status='published'), distinct=True)
+    ).filter(video_count__gt=0)
+    serializer_class = PersonSerializer
+    permission_classes = [permissions.AllowAny]
+    lookup_field = 'slug'
+    filter_backends = [filters.OrderingFilter]
+    ordering_fields = ['name']
+    ordering = ['name']
+    pagination_class = KeysetPagination  # nur mit ?limit= / ?cursor=
+
+    @cached_catalogue_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_catalogue_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @extend_schema(
+        description='Veröffentlichte Videos der Person, neueste zuerst',
+        parameters=[
+            OpenApiParameter('role', str, enum=['director', 'cast'], description='Nur diese Rolle'),
+            OpenApiParameter('exclude', int, description='Video-ID, die ausgelassen wird (aktuelles Video)'),
+        ],
+        responses=VideoListSerializer(many=True),
+    )
+    @action(detail=True, methods=['get'])
+    @cached_catalogue_response
+    def videos(self, request, slug=None):
+        """Published videos crediting this person (indexed join on VideoCredit)."""
+        role = request.query_params.get('role')
+        if role not in (None, 'director', 'cast'):
+            return Response({'detail': 'Ungültige Rolle.'}, status=status.HTTP_400_BAD_REQUEST)
+        videos = with_person(
+            Video.objects.filter(status='published').select_related('primary_category').defer('search_vector'),
+            slug, role
+        )
+        exclude = request.query_params.get('exclude')
+        if exclude and exclude.isdigit():
+            videos = videos.exclude(pk=int(exclude))
+        videos = videos.order_by('-created_at', '-id')[:settings.PERSON_VIDEOS_LIMIT]
+        return Response(VideoListSerializer(videos, many=True, context={'request': request}).data)
+
 
 @extend_schema_view(
     list=extend_schema(description='List all published videos'),
@@ -120,18 +269,40 @@ class VideoViewSet(viewsets.ModelViewSet):
     ViewSet for videos. GET /api/video/ returns the list of published videos.
     """
     queryset = Video.objects.filter(status='published')
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['categories__slug', 'quality', 'age_rating', 'release_year']
-    search_fields = ['title', 'description', 'director', 'cast']
+    filter_backends = [DjangoFilterBackend, VideoSearchFilter, filters.OrderingFilter]  # ?search= nutzt den Suchindex
+    filterset_class = VideoFilter  # Felder wie bisher plus ?person= / ?actor= / ?director=
     ordering_fields = ['created_at', 'view_count', 'rating', 'title']
     ordering = ['-created_at']
     lookup_field = 'slug'
     permission_classes = [permissions.AllowAny]  # Liste und Abspielen ohne Login
-    pagination_class = None  # Frontend erwartet Array, keine Paginierung
+    pagination_class = KeysetPagination  # nur mit ?limit= / ?cursor=, sonst Array wie bisher
+    
+    def get_queryset(self):
+        """
+        Listen holen die Hauptkategorie per JOIN (konstante Anzahl Abfragen, auch bei tausenden
+        Titeln); Detail-, Stream- und Hero-Ansicht laden Kategorien und fertige Renditions mit.
+        Der Suchvektor wird nur in der Datenbank gebraucht und nie mitgeladen.
+        """
+        queryset = super().get_queryset().defer('search_vector')
+        if self.action in ('list', 'featured', 'trending', 'by_category', 'search'):
+            queryset = queryset.select_related('primary_category')
+        if self.action in ('retrieve', 'stream', 'hero'):
+            queryset = queryset.prefetch_related(
+                'categories',
+                Prefetch('credits', queryset=VideoCredit.objects.select_related('person')),
+                Prefetch(
+                    'renditions',
+                    queryset=VideoRendition.objects.filter(is_ready=True).order_by('height'),
+                    to_attr='ready_renditions'
+                ),
+            )
+        return queryset
     
     def get_serializer_class(self):
         if self.action == 'list':
             return VideoListSerializer
+        elif self.action == 'search':
+            return VideoSearchResultSerializer
         elif self.action == 'create':
             return VideoCreateSerializer
         elif self.action == 'stream':
@@ -144,9 +315,17 @@ class VideoViewSet(viewsets.ModelViewSet):
         context['request'] = self.request
         return context
     
+    @cached_catalogue_response
     def list(self, request, *args, **kwargs):
-        """Return list of videos as JSON array."""
+        """
+        Return videos as a keyset-paginated page ({next, results}) if ?limit= or ?cursor= is
+        given, otherwise the whole list as JSON array (clients without pagination).
+        """
         queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
@@ -154,6 +333,14 @@ class VideoViewSet(viewsets.ModelViewSet):
         """Increment view count when retrieving a video."""
         instance = self.get_object()
         instance.increment_view_count()
+        try:
+            record_view(instance.id)
+        except redis.RedisError as exc:
+            logger.warning(f'Could not record trending view of video ID {instance.id}: {exc}')
+        try:
+            enqueue_renditions_if_popular(instance)
+        except redis.RedisError as exc:
+            logger.warning(f'Could not enqueue renditions of video ID {instance.id}: {exc}')
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
@@ -165,6 +352,7 @@ class VideoViewSet(viewsets.ModelViewSet):
         description='Return featured videos for the hero section'
     )
     @action(detail=False, methods=['get'])
+    @cached_catalogue_response
     def featured(self, request):
         """Returns featured videos for hero section"""
         featured_videos = self.get_queryset().filter(is_featured=True)[:10]
@@ -176,24 +364,45 @@ class VideoViewSet(viewsets.ModelViewSet):
     )
     @action(detail=False, methods=['get'])
     def hero(self, request):
-        """Returns random featured video for hero section"""
-        hero_video = self.get_queryset().filter(is_featured=True).order_by('?').first()
-        if not hero_video:
-            hero_video = self.get_queryset().order_by('-view_count').first()
-        
-        if hero_video:
-            serializer = VideoDetailSerializer(hero_video, context={'request': request})
-            return Response(serializer.data)
+        """
+        Returns a random featured video (or the most viewed one) for the hero section. The id
+        comes from the Redis hero pool (see videos.hero), so only a primary key lookup hits the
+        database; a stale pool entry is dropped and another one is picked.
+        """
+        for _attempt in range(HERO_PICK_ATTEMPTS):
+            video_id = pick_hero_id()
+            if video_id is None:
+                break
+            hero_video = self.get_queryset().filter(pk=video_id).first()
+            if hero_video:
+                serializer = VideoDetailSerializer(hero_video, context={'request': request})
+                return Response(serializer.data)
+            try:
+                remove_hero_video(video_id)
+            except redis.RedisError as exc:
+                logger.warning(f'Could not drop video ID {video_id} from the hero pool: {exc}')
         
         return Response({'detail': 'No videos available'}, status=status.HTTP_404_NOT_FOUND)
     
     @extend_schema(
-        description='Gibt die beliebtesten Videos (nach Views) zurück'
+        description='Gibt die aktuell beliebtesten Videos zurück (zeitlich abklingende Aufrufe)',
+        parameters=[OpenApiParameter('category', str, description='Nur diese Kategorie (Slug)')],
     )
     @action(detail=False, methods=['get'])
+    @cached_catalogue_response
     def trending(self, request):
-        """Return trending videos by view count."""
-        trending_videos = self.get_queryset().order_by('-view_count')[:20]
+        """
+        Return trending videos by time-decayed views (see videos.trending): the top of the
+        indexed score column, or of the category's Redis sorted set with ?category=<slug>.
+        """
+        slug = request.query_params.get('category')
+        if slug:
+            category = Category.objects.filter(slug=slug).only('id').first()
+            if category is None:
+                return Response({'detail': 'Kategorie nicht gefunden.'}, status=status.HTTP_404_NOT_FOUND)
+            trending_videos = trending_in_category(self.get_queryset(), category.id, settings.TRENDING_LIMIT)
+        else:
+            trending_videos = self.get_queryset().order_by('-trending_score', '-id')[:settings.TRENDING_LIMIT]
         serializer = VideoListSerializer(trending_videos, many=True)
         return Response(serializer.data)
     
@@ -204,25 +413,68 @@ class VideoViewSet(viewsets.ModelViewSet):
     def stream(self, request, slug=None):
         """Return HLS stream URLs for the video."""
         video = self.get_object()
-        serializer = VideoStreamSerializer(video)
+        serializer = VideoStreamSerializer(video, context={'request': request})
         return Response(serializer.data)
     
+    @extend_schema(
+        description='Volltextsuche mit Relevanz-Sortierung und hervorgehobenen Fundstellen',
+        parameters=[
+            OpenApiParameter('q', str, description='Suchtext (Websuche-Syntax: "Phrase", -Ausschluss, or)'),
+            OpenApiParameter('limit', int, description='Maximale Trefferzahl'),
+        ],
+        responses=VideoSearchResultSerializer(many=True),
+    )
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked search results (full text, typo-tolerant) with highlighted matches, see api.videos.search."""
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response({'detail': 'Parameter q fehlt.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', settings.VIDEO_SEARCH_MAX_RESULTS))
+        except ValueError:
+            limit = settings.VIDEO_SEARCH_MAX_RESULTS
+        limit = min(max(limit, 1), settings.VIDEO_SEARCH_MAX_RESULTS)
+        videos = add_highlights(list(search_videos(self.get_queryset(), text)[:limit]), text)
+        serializer = self.get_serializer(videos, many=True)
+        return Response(serializer.data)
+    
+    @extend_schema(
+        description='Facetten der (gefilterten) Liste: häufigste Regie, Besetzung und Erscheinungsjahre'
+    )
+    @action(detail=False, methods=['get'])
+    @cached_catalogue_response
+    def facets(self, request):
+        """Facet counts for the list filtered like GET /api/video/ (see api.videos.filters)."""
+        return Response(video_facets(self.filter_queryset(self.get_queryset())))
+    
+    @extend_schema(
+        description='Vorschläge für die Suchbox (Titel, Regie, Besetzung), beliebteste zuerst',
+        parameters=[
+            OpenApiParameter('q', str, description='Bisher eingegebener Text (Präfix)'),
+            OpenApiParameter('limit', int, description='Maximale Anzahl Vorschläge'),
+        ],
+    )
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Typeahead suggestions from the Redis prefix index (no database query), see videos.suggest."""
+        try:
+            limit = int(request.query_params.get('limit', settings.VIDEO_SUGGEST_LIMIT))
+        except ValueError:
+            limit = settings.VIDEO_SUGGEST_LIMIT
+        limit = min(max(limit, 1), settings.VIDEO_SUGGEST_MAX_LIMIT)
+        try:
+            suggestions = suggest_terms(request.query_params.get('q', ''), limit)
+        except redis.RedisError as exc:
+            logger.warning(f'Suggest index unavailable: {exc}')
+            suggestions = []  # the search box works without suggestions
+        return Response(suggestions)
+    
     @action(detail=False, methods=['get'])
+    @cached_catalogue_response
     def by_category(self, request):
-        """Return videos grouped by categories for dashboard."""
-        categories = Category.objects.prefetch_related(
-            Prefetch('videos', queryset=self.get_queryset().order_by('-created_at')[:20])
-        )
-        
-        result = []
-        for category in categories:
-            if category.videos.exists():
-                result.append({
-                    'category': CategorySerializer(category).data,
-                    'videos': VideoListSerializer(category.videos.all(), many=True, context={'request': request}).data
-                })
-        
-        return Response(result)
+        """Return videos grouped by categories for dashboard (snapshot, see api.videos.dashboard)."""
+        return Response(get_category_dashboard(request))
 
 
 class VideoCommentViewSet(viewsets.ModelViewSet):
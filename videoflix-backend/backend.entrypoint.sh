@@ -54,8 +54,8 @@ echo "==================================="
 echo "Starting Gunicorn..."
 echo "==================================="
 
-# Starte RQ Worker im Hintergrund
-python manage.py rqworker default &
+# Starte RQ Worker-Pools im Hintergrund (fast / encode / maintenance, siehe RQ_WORKER_POOLS)
+python manage.py run_workers &
 
 # Starte Gunicorn (--reload bei DEBUG für automatischen Neustart bei Code-Änderungen)
 if [ "$DEBUG" = "True" ]; then
@@ -0,0 +1,43 @@
+"""
+Task routing for Django-RQ.
+
+Every task type belongs to a cost class (fast, encode, maintenance) with its own
+queue, so short jobs (probes, thumbnails, emails) never wait behind long encodes.
+The routing table lives in ``settings.RQ_TASK_ROUTES``; the worker pools that
+consume the queues are configured in ``settings.RQ_WORKER_POOLS``.
+"""
+import os
+
+import django_rq
+from django.conf import settings
+
+
+def task_path(func):
+    """Return the dotted path of a task function (key of RQ_TASK_ROUTES)."""
+    return f'{func.__module__}.{func.__name__}'
+
+
+def get_queue_name(func):
+    """Return the queue name a task is routed to."""
+    return settings.RQ_TASK_ROUTES.get(task_path(func), settings.RQ_DEFAULT_TASK_QUEUE)
+
+
+def get_task_queue(func):
+    """Return the RQ queue a task is routed to."""
+    return django_rq.get_queue(get_queue_name(func))
+
+
+def enqueue_task(func, *args, **kwargs):
+    """Enqueue a task on the queue of its cost class."""
+    return get_task_queue(func).enqueue(func, *args, **kwargs)
+
+
+def default_worker_count(pool_name):
+    """
+    Number of workers for a pool. Encode workers are sized from the CPU count and the
+    per-encode thread budget, so parallel encodes do not oversubscribe the machine.
+    """
+    configured = settings.RQ_WORKER_POOLS[pool_name].get('workers')
+    if configured:
+        return configured
+    return max(1, (os.cpu_count() or 1) // settings.VIDEO_ENCODE_THREADS)
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party apps
     'rest_framework',
@@ -248,19 +249,106 @@ CACHES = {
     }
 }
 
+# Response cache of the public catalogue endpoints (api/videos/cache.py). Entries are keyed by
+# a catalogue version that signals bump on every change; the timeout only bounds staleness of
+# values that change without a bump (trending scores of the periodic rollup).
+CATALOGUE_CACHE_TIMEOUT = 300
+CATALOGUE_CACHE_LOCK_TIMEOUT = 30  # seconds; lock of the single worker recomputing an entry
+CATALOGUE_CACHE_LOCK_WAIT = 5  # seconds other requests wait for that worker before computing themselves
+CATEGORY_DASHBOARD_VIDEOS = 20  # newest videos per category in /api/video/by_category/
+
+# Video search (api/videos/search.py): stored, GIN-indexed tsvector (title A, director/cast B,
+# description C) plus pg_trgm indexes on title and director for typo-tolerant matches.
+VIDEO_SEARCH_CONFIG = 'german'  # PostgreSQL text search configuration (stemming, stop words)
+VIDEO_SEARCH_MAX_RESULTS = 50  # upper bound of ?limit= on /api/video/search/
+
+# Typeahead (/api/video/suggest/, videos/suggest.py): Redis prefix index over titles and names,
+# maintained by signals, ranked by view count among the first N lexicographic matches.
+VIDEO_SUGGEST_LIMIT = 8
+VIDEO_SUGGEST_MAX_LIMIT = 20
+VIDEO_SUGGEST_CANDIDATES = 200
+VIDEO_FACET_LIMIT = 20  # people per role in /api/video/facets/
+PERSON_VIDEOS_LIMIT = 20  # videos in /api/people/<slug>/videos/ ("more with this actor")
+
+# Hero pool (videos/hero.py): Redis set of featured videos (SRANDMEMBER) and the most viewed
+# videos as fallback, maintained by signals and rebuilt by a cron job.
+HERO_TOP_VIEWS_SIZE = 50
+
+# Trending (videos/trending.py): views are counted in Redis and folded into exponentially
+# decayed scores by a rollup job every 5 minutes (RQ_CRON_JOBS).
+TRENDING_HALF_LIFE_HOURS = 48
+TRENDING_LIMIT = 20
+TRENDING_CATEGORY_SIZE = 100  # videos kept per category sorted set
+
 
 # Django RQ (Task Queue for video processing)
+# One queue per cost class: 'fast' (probes, thumbnails, emails), 'encode' (HLS encodes),
+# 'maintenance' (cleanup, sweeps). 'default' is kept for jobs enqueued by older code.
+RQ_CONNECTION = {
+    'HOST': os.environ.get("REDIS_HOST", "redis"),
+    'PORT': int(os.environ.get("REDIS_PORT", 6379)),
+    'DB': int(os.environ.get("REDIS_DB", 0)),
+    'PASSWORD': os.environ.get("REDIS_PASSWORD", "foobared"),
+    'REDIS_CLIENT_KWARGS': {},
+}
 RQ_QUEUES = {
-    'default': {
-        'HOST': os.environ.get("REDIS_HOST", "redis"),
-        'PORT': int(os.environ.get("REDIS_PORT", 6379)),
-        'DB': int(os.environ.get("REDIS_DB", 0)),
-        'PASSWORD': os.environ.get("REDIS_PASSWORD", "foobared"),
-        'DEFAULT_TIMEOUT': 900,
-        'REDIS_CLIENT_KWARGS': {},
-    },
+    'default': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 900},
+    'fast': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 900},
+    'encode': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 6 * 3600},
+    'maintenance': {**RQ_CONNECTION, 'DEFAULT_TIMEOUT': 3600},
 }
 
+# Task routing (dotted path -> queue); unlisted tasks go to RQ_DEFAULT_TASK_QUEUE
+RQ_DEFAULT_TASK_QUEUE = 'default'
+RQ_TASK_ROUTES = {
+    'videos.tasks.prepare_video': 'fast',
+    'videos.tasks.get_video_duration': 'fast',
+    'videos.tasks.generate_thumbnail': 'fast',
+    'videos.tasks.generate_thumbnail_derivatives': 'fast',
+    'users.tasks.send_activation_email_task': 'fast',
+    'users.tasks.send_password_reset_email_task': 'fast',
+    'videos.tasks.process_uploaded_video': 'encode',
+    'videos.tasks.encode_lazy_rendition': 'encode',
+    'videos.tasks.convert_video_to_hls': 'encode',
+    'videos.tasks.prune_unused_renditions': 'maintenance',
+    'videos.tasks.reap_stale_processing': 'maintenance',
+    'videos.tasks.retry_video_processing': 'maintenance',
+    'videos.tasks.enqueue_video_processing': 'maintenance',
+    'videos.tasks.delete_video_media': 'maintenance',
+    'api.videos.dashboard.refresh_category_dashboard': 'fast',
+    'videos.hero.rebuild_hero_pool': 'maintenance',
+    'videos.trending.rollup_trending': 'maintenance',
+    'videos.trending.rebuild_category_trending': 'maintenance',
+}
+
+# Worker pools started by `manage.py run_workers`. Each worker consumes its queues in the
+# listed order (= priority). 'workers': None sizes the pool from the CPU count and
+# VIDEO_ENCODE_THREADS.
+# The maintenance worker also runs the RQ scheduler (delayed retries); the 'cron' pool runs
+# `manage.py run_cron` instead of a worker.
+RQ_WORKER_POOLS = {
+    'fast': {'queues': ['fast', 'default'], 'workers': 2},
+    'encode': {'queues': ['encode', 'fast'], 'workers': None},
+    'maintenance': {'queues': ['maintenance'], 'workers': 1, 'with_scheduler': True},
+    'cron': {'command': 'run_cron', 'workers': 1},
+}
+
+# Periodic jobs (cron expression, croniter syntax) enqueued by `manage.py run_cron`
+RQ_CRON_JOBS = [
+    {'func': 'videos.tasks.reap_stale_processing', 'cron': '*/5 * * * *'},
+    {'func': 'videos.hero.rebuild_hero_pool', 'cron': '*/30 * * * *'},
+    {'func': 'videos.trending.rollup_trending', 'cron': '*/5 * * * *'},
+    {'func': 'videos.trending.rebuild_category_trending', 'cron': '17 4 * * *'},
+]
+VIDEO_ENCODE_THREADS = int(os.environ.get("VIDEO_ENCODE_THREADS", 4))  # FFmpeg threads per encode
+
+# Encode scheduling: every encode takes its threads from a global core budget (Redis semaphore
+# shared by all workers) and runs niced (+ ionice best-effort/7) so HTTP serving keeps its latency.
+VIDEO_ENCODE_CORE_BUDGET = int(os.environ.get("VIDEO_ENCODE_CORE_BUDGET", os.cpu_count() or 1))
+VIDEO_ENCODE_SLOT_TTL = 120  # seconds; leases of crashed workers expire after this
+VIDEO_ENCODE_NICE = 10
+VIDEO_ENCODE_IONICE = True
+
 
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
@@ -337,12 +425,76 @@ LOGGING = {
 
 
 # Video Processing Settings
+# 'bitrate' is the rendition's target (advertised) bitrate; 'rate_control' names a profile
+# from VIDEO_RATE_CONTROL_PROFILES. Any profile key can also be overridden per rendition.
 VIDEO_RESOLUTIONS = {
-    '360p': {'width': 640, 'height': 360, 'bitrate': '800k'},
-    '480p': {'width': 854, 'height': 480, 'bitrate': '1400k'},
-    '720p': {'width': 1280, 'height': 720, 'bitrate': '2800k'},
-    '1080p': {'width': 1920, 'height': 1080, 'bitrate': '5000k'},
+    '360p': {'width': 640, 'height': 360, 'bitrate': '800k', 'rate_control': 'capped_crf'},
+    '480p': {'width': 854, 'height': 480, 'bitrate': '1400k', 'rate_control': 'capped_crf'},
+    '720p': {'width': 1280, 'height': 720, 'bitrate': '2800k', 'rate_control': 'capped_crf'},
+    '1080p': {'width': 1920, 'height': 1080, 'bitrate': '5000k', 'rate_control': 'capped_crf'},
+}
+
+# Rate control profiles: capped CRF with VBV. maxrate/bufsize are multiples of the rendition bitrate.
+VIDEO_RATE_CONTROL_PROFILES = {
+    'capped_crf': {'crf': 23, 'maxrate_factor': 1.0, 'bufsize_factor': 2.0, 'preset': 'medium', 'tune': None},
+    'capped_crf_film': {'crf': 22, 'maxrate_factor': 1.1, 'bufsize_factor': 2.0, 'preset': 'slow', 'tune': 'film'},
+    'capped_crf_fast': {'crf': 24, 'maxrate_factor': 1.0, 'bufsize_factor': 1.5, 'preset': 'veryfast', 'tune': None},
+}
+DEFAULT_RATE_CONTROL_PROFILE = 'capped_crf'
+
+# HLS segment length in seconds; keyframes are forced on segment boundaries
+HLS_SEGMENT_DURATION = 10
+
+# Lazy renditions: only the base rungs are encoded at upload. Other rungs are queued when their
+# playlist is first requested or when the view count reaches the threshold; meanwhile the nearest
+# available rung is served. prune_renditions removes unused non-base rungs of rarely watched titles.
+VIDEO_BASE_RENDITIONS = ['360p', '720p']
+VIDEO_LAZY_RENDITION_VIEW_THRESHOLD = 50
+VIDEO_RENDITION_PRUNE_AFTER_DAYS = 30
+# A lazy rung whose encode failed is not queued again until its backoff expired (doubled per failure)
+VIDEO_RENDITION_RETRY_BACKOFF = 600  # seconds
+VIDEO_RENDITION_RETRY_BACKOFF_MAX = 24 * 3600
+
+# Per-title complexity analysis: a low-res CRF probe encode of sampled chunks.
+# The probe bitrate relative to 'reference_kbps' (typical content) scales every rendition's bitrate.
+VIDEO_COMPLEXITY_PROBE = {
+    'chunks': 4,
+    'chunk_seconds': 4,
+    'width': 320,
+    'height': 180,
+    'crf': 23,
+    'preset': 'veryfast',
+    'threads': 2,
+    'reference_kbps': 300,
 }
+VIDEO_COMPLEXITY_FACTOR_RANGE = (0.5, 1.2)
+
+# Thumbnail Generation Settings
+THUMBNAIL_SIZE = (1280, 720)
+THUMBNAIL_CANDIDATE_COUNT = 8  # Keyframes scored per video, best one becomes the poster
+THUMBNAIL_DERIVATIVE_WIDTHS = [320, 640, 960, 1280]  # Pre-generated at processing time
+THUMBNAIL_DERIVATIVE_FORMATS = ['webp', 'avif']  # AVIF is skipped if Pillow lacks support
+THUMBNAIL_RESIZE_WIDTH_STEP = 40  # On-demand widths must be a multiple of this
+THUMBNAIL_RESIZE_CACHE_DIR = MEDIA_ROOT / 'cache' / 'thumbnails'
+THUMBNAIL_RESIZE_CACHE_MAX_BYTES = 512 * 1024 * 1024  # LRU eviction above 512 MB
+
+# Per-video processing lock (Redis lease, renewed while held; expires if a worker dies)
+VIDEO_PROCESSING_LOCK_TTL = 300  # seconds
+
+# Crash recovery: running jobs keep a heartbeat key alive. Videos stuck in 'processing' without
+# heartbeat or pending job are cleaned up and re-enqueued with exponential backoff by the reaper;
+# after VIDEO_PROCESSING_MAX_ATTEMPTS they go back to 'draft'.
+VIDEO_HEARTBEAT_TTL = 60  # seconds
+VIDEO_PROCESSING_MAX_ATTEMPTS = 3
+VIDEO_PROCESSING_RETRY_BACKOFF = 60  # seconds, doubled per attempt
+VIDEO_PROCESSING_RETRY_BACKOFF_MAX = 3600
+
+# Planning estimates for `manage.py reprocess_video --dry-run`: encode seconds per second of
+# material and rendition (one worker, VIDEO_ENCODE_THREADS threads) plus fixed prepare time.
+VIDEO_ENCODE_SPEED_ESTIMATE = {'360p': 0.15, '480p': 0.25, '720p': 0.5, '1080p': 1.0}
+VIDEO_PREPARE_SECONDS_ESTIMATE = 20
+VIDEO_REPROCESS_STATE_FILE = BASE_DIR / 'logs' / 'reprocess_state.json'
+VIDEO_REPROCESS_QUEUE_POLL_INTERVAL = 10  # seconds
 
 # Maximum Video Upload Size (in MB)
 MAX_VIDEO_UPLOAD_SIZE = 500  # 500 MB
@@ -2,10 +2,11 @@
 Django Signals for Videoflix Project
 Central management of all signals
 """
-import django_rq
 import logging
 import os
-from django.db.models.signals import post_save, post_delete
+import redis
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 
@@ -53,41 +54,332 @@ def user_post_delete(sender, instance, **kwargs):
 # VIDEO SIGNALS
 # ================================
 
-def _should_enqueue_video_processing(instance, created):
+def _should_enqueue_video_processing(instance, created, replaced=False):
     """
     Decide whether the video processing job should be enqueued.
 
     Rules:
     - New `Video` instance with an `original_video` → enqueue
+    - Existing `Video` whose `original_video` was replaced → enqueue (old run was cancelled)
     - Existing `Video` that just received an `original_video` while still in `draft` → enqueue
     - Do NOT enqueue when the status is not `draft` (already processing or published)
     """
     if not instance.original_video:
         return False
-    if created:
+    if created or replaced:
         return True
     if instance.status != 'draft':
         return False
-    if instance.video_360p:
+    if instance.renditions.filter(is_ready=True).exists():
         return False
     return True
 
 
 def _enqueue_video_processing(video_id):
-    """Enqueue video processing job in Django-RQ."""
-    from videos.tasks import process_uploaded_video
-    queue = django_rq.get_queue('default')
-    queue.enqueue(process_uploaded_video, video_id)
+    """Enqueue video processing job in Django-RQ (deduplicated, see videos.jobs)."""
+    from videos.tasks import enqueue_video_processing
+    enqueue_video_processing(video_id)
+
+
+def _cancel_video_processing(video_id):
+    """
+    Cancel running and pending processing jobs of a video (see videos.jobs). A Redis outage
+    must not break the delete or save: running jobs then finish, and their results are
+    discarded by the orphan media GC or overwritten by the next processing run.
+    """
+    from videos.jobs import cancel_video_processing
+    try:
+        cancel_video_processing(video_id)
+    except redis.RedisError as exc:
+        logger.warning(f'Could not cancel processing of video ID {video_id}: {exc}')
+
+
+@receiver(pre_save, sender='videos.Video')
+def detect_original_video_replacement(sender, instance, **kwargs):
+    """
+    Pre-save signal for the `Video` model.
+    Marks the instance when an existing video gets a different `original_video` file.
+    """
+    update_fields = kwargs.get('update_fields')
+    if not instance.pk or (update_fields is not None and 'original_video' not in update_fields):
+        return
+    stored_name = sender.objects.filter(pk=instance.pk).values_list('original_video', flat=True).first()
+    instance._original_video_replaced = bool(stored_name) and stored_name != instance.original_video.name
 
 
 @receiver(post_save, sender='videos.Video')
 def auto_process_video(sender, instance, created, **kwargs):
     """
     Post-save signal for the `Video` model.
-    Queues processing (duration, thumbnail, HLS) via Django-RQ when appropriate.
+    Cancels the run for a replaced original, then queues processing (duration, thumbnail, HLS)
+    via Django-RQ when appropriate.
     """
-    if not _should_enqueue_video_processing(instance, created):
+    replaced = instance.__dict__.pop('_original_video_replaced', False)
+    if replaced:
+        logger.info(f'Original video of {instance.title} (ID {instance.id}) replaced – cancelling running processing')
+        _cancel_video_processing(instance.id)
+    if not _should_enqueue_video_processing(instance, created, replaced):
         return
     logger.info(f'Video upload/update: {instance.title} (ID {instance.id}) – starting processing in queue')
     _enqueue_video_processing(instance.id)
     logger.info(f'Video processing queued for video ID {instance.id}')
+
+
+def _enqueue_media_deletion(dirs):
+    """Enqueue removal of media dirs on the maintenance queue once the delete is committed."""
+    from core.queues import enqueue_task
+    from videos.tasks import delete_video_media
+    transaction.on_commit(lambda: enqueue_task(delete_video_media, dirs))
+
+
+@receiver(post_delete, sender='videos.Video')
+def cleanup_deleted_video(sender, instance, **kwargs):
+    """
+    Post-delete signal for the `Video` model (also fired for queryset deletes).
+    Stops running FFmpeg jobs of the video, drops its queued follow-up jobs and
+    removes its media dirs (videos, thumbnails) in a background job.
+    """
+    _cancel_video_processing(instance.id)
+    dirs = instance.get_media_dirs()
+    if dirs:
+        _enqueue_media_deletion(dirs)
+
+
+# ================================
+# CATEGORY SIGNALS
+# ================================
+
+def _update_primary_categories(video_ids):
+    """Recompute the denormalized primary category of the given videos."""
+    from videos.models import Video
+    for video in Video.objects.filter(id__in=video_ids).only('id'):
+        video.update_primary_category()
+
+
+@receiver(m2m_changed, sender='videos.Video_categories')
+def video_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Keep `Video.primary_category` in sync when categories are added to or removed from
+    videos (from either side of the relation). category.videos.clear() sends no pk_set,
+    so the affected videos are remembered on pre_clear.
+    """
+    if reverse and action == 'pre_clear':
+        instance._cleared_video_ids = list(instance.videos.values_list('id', flat=True))
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        instance.update_primary_category()
+    elif action == 'post_clear':
+        _update_primary_categories(instance.__dict__.pop('_cleared_video_ids', []))
+    else:
+        _update_primary_categories(pk_set or [])
+
+
+@receiver(pre_delete, sender='videos.Category')
+def remember_category_videos(sender, instance, **kwargs):
+    """Remember the videos of a category before the delete removes the relation."""
+    instance._video_ids = list(instance.videos.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender='videos.Category')
+def category_deleted(sender, instance, **kwargs):
+    """Videos of a deleted category get their next category as primary category."""
+    _update_primary_categories(instance.__dict__.pop('_video_ids', []))
+
+
+@receiver(post_save, sender='videos.Category')
+def category_saved(sender, instance, created, **kwargs):
+    """A rename can change which category comes first by name for its videos."""
+    if created:
+        return
+    _update_primary_categories(instance.videos.values_list('id', flat=True))
+
+
+# ================================
+# CATEGORY COUNTER SIGNALS
+# ================================
+# Category.published_video_count is recomputed for the affected categories in the same
+# transaction as the change (one UPDATE each, see Category.refresh_published_video_counts).
+
+def _refresh_category_counts(category_ids):
+    from videos.models import Category
+    if category_ids:
+        Category.refresh_published_video_counts(category_ids)
+
+
+@receiver(pre_save, sender='videos.Video')
+def remember_previous_status(sender, instance, **kwargs):
+    """Remember the stored status of an existing video before a save that may change it."""
+    update_fields = kwargs.get('update_fields')
+    if not instance.pk or (update_fields is not None and 'status' not in update_fields):
+        return
+    instance._previous_status = sender.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender='videos.Video')
+def update_category_counts_on_status_change(sender, instance, created, **kwargs):
+    """Recount the video's categories when it was published or unpublished."""
+    previous = instance.__dict__.pop('_previous_status', None)
+    if created or previous is None or previous == instance.status:
+        return
+    if 'published' in (previous, instance.status):
+        _refresh_category_counts(list(instance.categories.values_list('id', flat=True)))
+
+
+@receiver(m2m_changed, sender='videos.Video_categories')
+def update_category_counts_on_categories_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Recount categories when videos are added to or removed from them (either side)."""
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            _refresh_category_counts([instance.pk])
+        return
+    if instance.status != 'published':
+        return
+    if action == 'pre_clear':
+        instance._cleared_category_ids = list(instance.categories.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        _refresh_category_counts(pk_set)
+    elif action == 'post_clear':
+        _refresh_category_counts(instance.__dict__.pop('_cleared_category_ids', []))
+
+
+@receiver(pre_delete, sender='videos.Video')
+def remember_video_categories(sender, instance, **kwargs):
+    """Remember the categories of a published video before the delete removes the relation."""
+    if instance.status == 'published':
+        instance._category_ids = list(instance.categories.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender='videos.Video')
+def update_category_counts_on_delete(sender, instance, **kwargs):
+    """Recount the categories of a deleted published video."""
+    _refresh_category_counts(instance.__dict__.pop('_category_ids', []))
+
+
+# ================================
+# REDIS INDEX SIGNALS
+# ================================
+# The typeahead index (videos.suggest) and the hero pool (videos.hero) are updated after
+# commit. Redis errors are only logged: the indexes may be stale until the next save or
+# their rebuild (manage.py rebuild_suggest_index, periodic hero pool rebuild).
+
+SUGGEST_FIELDS = {'title', 'director', 'cast', 'status'}
+HERO_FIELDS = {'status', 'is_featured', 'view_count'}
+
+
+def _run_index_update(func, *args):
+    try:
+        func(*args)
+    except redis.RedisError as exc:
+        logger.warning(f'Redis index update failed ({func.__module__}.{func.__name__}): {exc}')
+
+
+@receiver(post_save, sender='videos.Video')
+def update_suggest_index(sender, instance, update_fields=None, **kwargs):
+    """Re-index the video's terms, or only its popularity after a view count update."""
+    from videos import suggest
+    if update_fields is not None and set(update_fields) <= {'view_count'}:
+        transaction.on_commit(lambda: _run_index_update(suggest.update_popularity, instance.pk, instance.view_count))
+    elif update_fields is None or set(update_fields) & SUGGEST_FIELDS:
+        transaction.on_commit(lambda: _run_index_update(suggest.index_video, instance))
+
+
+@receiver(post_delete, sender='videos.Video')
+def remove_from_suggest_index(sender, instance, **kwargs):
+    """Drop a deleted video's terms from the typeahead index."""
+    from videos import suggest
+    video_id = instance.pk
+    transaction.on_commit(lambda: _run_index_update(suggest.remove_video, video_id))
+
+
+@receiver(post_save, sender='videos.Video')
+def update_hero_pool(sender, instance, update_fields=None, **kwargs):
+    """Sync the video's hero pool membership (featured set, top views) after status/flag/view changes."""
+    from videos import hero
+    if update_fields is None or set(update_fields) & HERO_FIELDS:
+        transaction.on_commit(lambda: _run_index_update(hero.update_video, instance))
+
+
+@receiver(post_delete, sender='videos.Video')
+def remove_from_hero_pool(sender, instance, **kwargs):
+    """Drop a deleted video from the hero pool."""
+    from videos import hero
+    video_id = instance.pk
+    transaction.on_commit(lambda: _run_index_update(hero.remove_video, video_id))
+
+
+# ================================
+# CATALOGUE CACHE SIGNALS
+# ================================
+
+# Video fields shown by the cached catalogue responses. Other fields (processing state,
+# complexity, attempts) and view counts do not change them; trending scores are refreshed by
+# the rollup job and cached 'trending' responses expire with CATALOGUE_CACHE_TIMEOUT.
+CATALOGUE_VIDEO_FIELDS = {
+    'title', 'slug', 'description', 'thumbnail', 'thumbnail_ready', 'primary_category',
+    'original_video', 'duration', 'quality', 'file_size', 'status', 'is_featured', 'published_at',
+    'rating', 'director', 'cast', 'release_year', 'language', 'age_rating', 'uploaded_by', 'created_at',
+}
+
+
+def _bump_catalogue_version():
+    """
+    Invalidate the cached catalogue responses (see api.videos.cache) once the change is
+    committed; bumping earlier would let a concurrent request cache the old rows under
+    the new version. A background job then precomputes the category dashboard snapshot.
+    """
+    transaction.on_commit(_invalidate_catalogue)
+
+
+def _invalidate_catalogue():
+    from api.videos.cache import bump_catalogue_version
+    bump_catalogue_version()
+    _run_index_update(_enqueue_dashboard_refresh)
+
+
+def _enqueue_dashboard_refresh():
+    """Enqueue the dashboard snapshot refresh (coalesced: one pending job at a time)."""
+    from api.videos.dashboard import refresh_category_dashboard
+    from videos.jobs import enqueue_unique
+    enqueue_unique(refresh_category_dashboard, job_id='refresh-category-dashboard')
+
+
+def _is_catalogue_change(video, update_fields):
+    """
+    True if a saved video changed a field of the public catalogue. Videos that were not
+    published before and are not published now (drafts, processing) are not visible in it.
+    """
+    fields = CATALOGUE_VIDEO_FIELDS if update_fields is None else CATALOGUE_VIDEO_FIELDS & set(update_fields)
+    if not video.changed_fields(fields):
+        return False
+    return 'published' in (video.status, video.loaded_value('status', 'published'))
+
+
+@receiver(post_save, sender='videos.Video')
+@receiver(post_save, sender='videos.Category')
+@receiver(post_save, sender='videos.Person')
+def invalidate_catalogue_on_save(sender, instance, update_fields=None, **kwargs):
+    """Bump the catalogue version after a category or person was saved, or a video changed visibly."""
+    if sender._meta.model_name == 'video' and not _is_catalogue_change(instance, update_fields):
+        return
+    _bump_catalogue_version()
+
+
+@receiver(post_delete, sender='videos.Video')
+@receiver(post_delete, sender='videos.Category')
+@receiver(post_delete, sender='videos.Person')
+def invalidate_catalogue_on_delete(sender, instance, **kwargs):
+    """Bump the catalogue version after a published video, a category or a person was deleted."""
+    if sender._meta.model_name == 'video' and instance.status != 'published':
+        return
+    _bump_catalogue_version()
+
+
+@receiver(m2m_changed, sender='videos.Video_categories')
+def invalidate_catalogue_on_categories_change(sender, instance, action, reverse, **kwargs):
+    """Bump the catalogue version when published videos are added to or removed from categories."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse and instance.status != 'published':
+        return
+    _bump_catalogue_version()
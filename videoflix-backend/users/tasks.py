@@ -0,0 +1,29 @@
+"""
+Background tasks for users (Django-RQ, routed to the 'fast' queue).
+"""
+import logging
+
+from .models import User
+from .utils import send_activation_email, send_password_reset_email
+
+logger = logging.getLogger(__name__)
+
+
+def send_activation_email_task(user_id, uid, token):
+    """Send the activation email for the given user"""
+    user = User.objects.filter(id=user_id).first()
+    if not user:
+        logger.error(f'Activation email: user with ID {user_id} not found')
+        return False
+    send_activation_email(user, uid, token)
+    return True
+
+
+def send_password_reset_email_task(user_id, uid, token):
+    """Send the password reset email for the given user"""
+    user = User.objects.filter(id=user_id).first()
+    if not user:
+        logger.error(f'Password reset email: user with ID {user_id} not found')
+        return False
+    send_password_reset_email(user, uid, token)
+    return True
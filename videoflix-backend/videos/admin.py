@@ -1,28 +1,70 @@
+import os
+
+from django.conf import settings
 from django.contrib import admin
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
-from .models import Category, Video, VideoComment, VideoRating
+from .models import (
+    Category, MediaIntegrityCheck, Person, Video, VideoComment, VideoCredit, VideoRating, VideoRendition,
+)
+from .thumbnails import derivative_filename, thumbnail_version
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     """Admin-Konfiguration für Kategorien"""
     
-    list_display = ['name', 'slug', 'video_count', 'created_at']
+    list_display = ['name', 'slug', 'published_video_count', 'created_at']
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
+    readonly_fields = ['published_video_count']
+    ordering = ['name']
+
+
+@admin.register(Person)
+class PersonAdmin(admin.ModelAdmin):
+    """Admin-Konfiguration für Personen (aus Regie und Besetzung der Videos)"""
+    
+    list_display = ['name', 'slug', 'created_at']
+    search_fields = ['name']
+    prepopulated_fields = {'slug': ('name',)}
     ordering = ['name']
+
+
+class VideoCreditInline(admin.TabularInline):
+    """Mitwirkende eines Videos (nur lesen, gepflegt aus den Feldern Regisseur und Besetzung)"""
     
-    def video_count(self, obj):
-        """Zeigt die Anzahl der Videos in dieser Kategorie"""
-        return obj.videos.count()
-    video_count.short_description = 'Anzahl Videos'
+    model = VideoCredit
+    extra = 0
+    can_delete = False
+    fields = ['person', 'role', 'position']
+    readonly_fields = fields
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+class VideoRenditionInline(admin.TabularInline):
+    """Rendition-Inventar eines Videos (nur lesen, geschrieben von der Verarbeitung)"""
+    
+    model = VideoRendition
+    extra = 0
+    can_delete = False
+    fields = ['resolution', 'codec', 'width', 'height', 'bandwidth', 'average_bandwidth',
+              'segment_count', 'bytes', 'is_ready', 'updated_at']
+    readonly_fields = fields
+    ordering = ['height']
+    
+    def has_add_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Video)
 class VideoAdmin(admin.ModelAdmin):
     """Admin-Konfiguration für Videos"""
     
+    inlines = [VideoCreditInline, VideoRenditionInline]
+
     list_display = [
         'title',
         'status',
@@ -37,7 +79,7 @@ class VideoAdmin(admin.ModelAdmin):
     search_fields = ['title', 'description', 'director', 'cast']
     prepopulated_fields = {'slug': ('title',)}
     filter_horizontal = ['categories']
-    readonly_fields = ['view_count', 'file_size', 'created_at', 'updated_at', 'thumbnail_preview']
+    readonly_fields = ['view_count', 'file_size', 'complexity_factor', 'processing_attempts', 'created_at', 'updated_at', 'thumbnail_preview']
     ordering = ['-created_at']
     
     fieldsets = (
@@ -56,6 +98,7 @@ class VideoAdmin(admin.ModelAdmin):
                 'duration',
                 'quality',
                 'file_size',
+                'complexity_factor',
                 'director',
                 'cast',
                 'release_year',
@@ -64,7 +107,7 @@ class VideoAdmin(admin.ModelAdmin):
             )
         }),
         (_('Status & Veröffentlichung'), {
-            'fields': ('status', 'is_featured', 'published_at', 'uploaded_by')
+            'fields': ('status', 'processing_attempts', 'is_featured', 'published_at', 'uploaded_by')
         }),
         (_('Statistiken'), {
             'fields': ('view_count', 'rating')
@@ -81,15 +124,41 @@ class VideoAdmin(admin.ModelAdmin):
     duration_display.short_description = 'Dauer'
     
     def thumbnail_preview(self, obj):
-        """Zeigt eine Vorschau des Thumbnails"""
+        """Zeigt eine Vorschau des Thumbnails (kleines WebP-Derivat, falls vorhanden)"""
         if obj.thumbnail:
             return format_html(
                 '<img src="{}" style="max-height: 200px; max-width: 300px;" />',
-                obj.thumbnail.url
+                self._preview_url(obj)
             )
         return _('Kein Thumbnail')
     thumbnail_preview.short_description = 'Thumbnail Vorschau'
 
+    def _preview_url(self, obj):
+        """URL des 320px-WebP-Derivats, sonst des Original-Thumbnails"""
+        filename = derivative_filename(thumbnail_version(obj), 320, 'webp')
+        name = os.path.join(os.path.dirname(obj.thumbnail.name), filename)
+        if os.path.isfile(os.path.join(settings.MEDIA_ROOT, name)):
+            return obj.thumbnail.storage.url(name)
+        return obj.thumbnail.url
+
+
+@admin.register(MediaIntegrityCheck)
+class MediaIntegrityCheckAdmin(admin.ModelAdmin):
+    """Admin-Konfiguration für Integritätsprüfungen (nur lesen, geschrieben von video_path_check)"""
+    
+    list_display = ['video', 'needs_reprocessing', 'original_ok', 'thumbnail_ok', 'problem_count', 'checked_at']
+    list_filter = ['needs_reprocessing', 'original_ok', 'thumbnail_ok', 'checked_at']
+    search_fields = ['video__title']
+    raw_id_fields = ['video']
+    readonly_fields = ['video', 'checked_at', 'original_ok', 'thumbnail_ok', 'renditions', 'problems',
+                       'needs_reprocessing', 'scan_ms']
+    ordering = ['-needs_reprocessing', '-checked_at']
+    
+    def problem_count(self, obj):
+        """Anzahl gefundener Probleme"""
+        return len(obj.problems)
+    problem_count.short_description = 'Probleme'
+
 
 @admin.register(VideoComment)
 class VideoCommentAdmin(admin.ModelAdmin):
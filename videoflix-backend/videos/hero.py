@@ -0,0 +1,108 @@
+"""
+Precomputed hero pool (Redis).
+
+The home page hero is a random featured video, or the most viewed video if none
+is featured. Instead of ``ORDER BY random()`` over the featured videos (and
+``ORDER BY view_count`` over the whole table as fallback) on every page load,
+signals maintain two small Redis structures:
+
+- a set with the ids of all published featured videos, sampled with SRANDMEMBER;
+- a sorted set of the HERO_TOP_VIEWS_SIZE most viewed published videos (view
+  count as score), trimmed after every update.
+
+A periodic job (RQ_CRON_JOBS) rebuilds both from the database; that repairs
+drift from writes that bypass signals. After a Redis flush the pool is rebuilt
+on first use, by one request at a time. While Redis is unavailable (or the pool
+is being rebuilt) the hero is picked with an indexed database query.
+"""
+import logging
+
+import redis
+from django.conf import settings
+
+from .jobs import get_redis
+from .models import Video
+
+logger = logging.getLogger(__name__)
+
+FEATURED_KEY = 'videoflix:hero:featured'  # set: ids of published featured videos
+TOP_VIEWS_KEY = 'videoflix:hero:top_views'  # zset: id -> view count, top HERO_TOP_VIEWS_SIZE only
+BUILT_KEY = 'videoflix:hero:built'  # present once the pool was built
+REBUILD_LOCK_KEY = 'videoflix:hero:rebuild_lock'  # held by the request rebuilding a missing pool
+REBUILD_LOCK_TIMEOUT = 60  # seconds
+
+
+def pick_hero_id():
+    """Id of a random featured video, else of the most viewed one; None if there is none."""
+    try:
+        connection = get_redis()
+        if not connection.exists(BUILT_KEY):
+            if not connection.set(REBUILD_LOCK_KEY, 1, nx=True, ex=REBUILD_LOCK_TIMEOUT):
+                return pick_hero_id_from_db()  # another request is rebuilding the pool
+            try:
+                rebuild_hero_pool()
+            finally:
+                connection.delete(REBUILD_LOCK_KEY)
+        video_id = connection.srandmember(FEATURED_KEY)
+        if video_id is None:
+            top = connection.zrevrange(TOP_VIEWS_KEY, 0, 0)
+            video_id = top[0] if top else None
+    except redis.RedisError as exc:
+        logger.warning(f'Hero pool unavailable, picking from the database: {exc}')
+        return pick_hero_id_from_db()
+    return int(video_id) if video_id is not None else None
+
+
+def pick_hero_id_from_db():
+    """
+    Fallback without the pool: the newest featured video (index on is_featured), else the
+    currently most popular one (index on trending_score). Not random, but no table scan.
+    """
+    published = Video.objects.filter(status='published')
+    video_id = published.filter(is_featured=True).order_by('-id').values_list('id', flat=True).first()
+    if video_id is None:
+        video_id = published.order_by('-trending_score', '-id').values_list('id', flat=True).first()
+    return video_id
+
+
+def update_video(video):
+    """Sync a video's pool membership with its status, featured flag and view count."""
+    published = video.status == 'published'
+    pipe = get_redis().pipeline()
+    if published and video.is_featured:
+        pipe.sadd(FEATURED_KEY, video.pk)
+    else:
+        pipe.srem(FEATURED_KEY, video.pk)
+    if published:
+        pipe.zadd(TOP_VIEWS_KEY, {video.pk: video.view_count})
+        pipe.zremrangebyrank(TOP_VIEWS_KEY, 0, -(settings.HERO_TOP_VIEWS_SIZE + 1))
+    else:
+        pipe.zrem(TOP_VIEWS_KEY, video.pk)
+    pipe.execute()
+
+
+def remove_video(video_id):
+    """Drop a video from the pool (deleted, or found missing when picked)."""
+    pipe = get_redis().pipeline()
+    pipe.srem(FEATURED_KEY, video_id)
+    pipe.zrem(TOP_VIEWS_KEY, video_id)
+    pipe.execute()
+
+
+def rebuild_hero_pool():
+    """RQ task: rebuild the hero pool from the database (replaced atomically)."""
+    published = Video.objects.filter(status='published')
+    featured = list(published.filter(is_featured=True).values_list('id', flat=True))
+    top_views = dict(
+        published.order_by('-view_count', '-id').values_list('id', 'view_count')[:settings.HERO_TOP_VIEWS_SIZE]
+    )
+    pipe = get_redis().pipeline()
+    pipe.delete(FEATURED_KEY, TOP_VIEWS_KEY)
+    if featured:
+        pipe.sadd(FEATURED_KEY, *featured)
+    if top_views:
+        pipe.zadd(TOP_VIEWS_KEY, top_views)
+    pipe.set(BUILT_KEY, 1)
+    pipe.execute()
+    logger.info(f'Hero pool rebuilt: {len(featured)} featured, {len(top_views)} top viewed videos')
+    return len(featured), len(top_views)
@@ -0,0 +1,90 @@
+"""
+Media integrity checks for videos (original, HLS renditions, segments, thumbnail).
+
+check_video_media() only touches the filesystem, so many videos can be checked in
+parallel threads; the results are stored in MediaIntegrityCheck rows by the caller
+(see the video_path_check command).
+"""
+import os
+import time
+
+from django.conf import settings
+
+from .utils import build_m3u8_path, get_original_video_path, parse_media_playlist
+
+TS_PACKET_SIZE = 188  # MPEG-TS segments consist of whole 188-byte packets
+
+
+def is_sane_segment_size(size):
+    """A TS segment is non-empty and a whole number of TS packets."""
+    return size >= TS_PACKET_SIZE and size % TS_PACKET_SIZE == 0
+
+
+def check_rendition(original_path, resolution):
+    """
+    Check one HLS rendition. Returns (segment_count, problems); segment_count is None if
+    the rendition does not exist.
+    """
+    m3u8_path = build_m3u8_path(original_path, resolution)
+    if not os.path.isfile(m3u8_path):
+        return None, []
+    try:
+        entries, finalized = parse_media_playlist(m3u8_path)
+        segments = [name for name, _duration in entries]
+    except (OSError, UnicodeDecodeError, ValueError) as error:
+        return 0, [f'{resolution}: playlist unreadable ({error})']
+    problems = [] if finalized else [f'{resolution}: playlist not finalized']
+    if not segments:
+        problems.append(f'{resolution}: playlist has no segments')
+    hls_dir = os.path.dirname(m3u8_path)
+    for segment in segments:
+        try:
+            size = os.stat(os.path.join(hls_dir, segment)).st_size
+        except OSError:
+            problems.append(f'{resolution}: segment {segment} missing')
+            continue
+        if not is_sane_segment_size(size):
+            problems.append(f'{resolution}: segment {segment} has invalid size {size}')
+    return len(segments), problems
+
+
+def check_video_media(video):
+    """
+    Check all media of a video on disk. Returns a dict with the fields of
+    MediaIntegrityCheck (without the video) plus 'healthy_renditions', the
+    resolutions without problems.
+    """
+    started = time.monotonic()
+    problems = []
+    renditions = {}
+    healthy = []
+    original_path = get_original_video_path(video)
+    original_ok = bool(original_path) and os.path.getsize(original_path) > 0
+    if not original_ok:
+        problems.append('original missing or empty')
+    else:
+        for resolution in settings.VIDEO_RESOLUTIONS:
+            segment_count, rendition_problems = check_rendition(original_path, resolution)
+            if segment_count is not None:
+                renditions[resolution] = segment_count
+                if not rendition_problems:
+                    healthy.append(resolution)
+            elif resolution in settings.VIDEO_BASE_RENDITIONS and video.status == 'published':
+                rendition_problems = [f'{resolution}: base rendition missing']
+            problems.extend(rendition_problems)
+
+    thumbnail_ok = bool(video.thumbnail) and os.path.isfile(
+        os.path.join(settings.MEDIA_ROOT, video.thumbnail.name)
+    )
+    if not thumbnail_ok and video.status == 'published':
+        problems.append('thumbnail missing')
+
+    return {
+        'original_ok': original_ok,
+        'thumbnail_ok': thumbnail_ok,
+        'renditions': renditions,
+        'problems': problems,
+        'needs_reprocessing': bool(problems),
+        'scan_ms': int((time.monotonic() - started) * 1000),
+        'healthy_renditions': healthy,
+    }
@@ -0,0 +1,357 @@
+"""
+Job bookkeeping for video processing (Redis, shared with Django-RQ).
+
+Deterministic job ids: a video has exactly one job id per kind of work, so a job
+that is still pending can be found (and coalesced) instead of enqueued twice.
+Per-video lease lock: only one processing run writes a video's media at a time.
+The lock expires on its own if the worker dies and is renewed while it is held.
+Heartbeat: running jobs keep a short-lived key alive, so the stale job reaper can
+tell a crashed run from a slow one.
+Cancellation: deleting a video or replacing its original bumps a per-video cancel
+epoch; runs started before notice the change, kill FFmpeg and stop.
+Rendition backoff: a failed lazy rendition encode blocks re-enqueueing that rung
+for an exponentially growing time, so a broken source is not re-encoded per request.
+"""
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import django_rq
+from django.conf import settings
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+
+from core.queues import get_task_queue
+
+logger = logging.getLogger(__name__)
+
+WAITING_JOB_STATUSES = ('queued', 'deferred', 'scheduled')
+# A running job is pending too: enqueueing its id again would overwrite the job hash and
+# start a second run. A crashed run stays 'started', so it only counts while RQ's job
+# heartbeat (written every 30 s by default) is recent.
+PENDING_JOB_STATUSES = (*WAITING_JOB_STATUSES, 'started')
+STARTED_JOB_STALE_AFTER = 120  # seconds without job heartbeat
+RUNNING_JOB_FOLLOW_UP_DELAY = 5  # seconds, see enqueue_unique(if_running=...)
+ENQUEUE_GUARD_MS = 2000
+CANCEL_EPOCH_TTL = 24 * 3600  # longer than any encode job may run
+
+
+class ProcessingCancelled(Exception):
+    """Raised inside a processing run whose video was deleted or replaced meanwhile."""
+
+
+# KEYS[1] = lock key; ARGV[1] = token, ARGV[2] = ttl in ms
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# KEYS[1] = lock key; ARGV[1] = token
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# KEYS[1] = lock key, KEYS[2] = rerun key; ARGV[1] = token
+# Returns 1 (lock kept, rerun requested), 0 (released) or -1 (lock was lost)
+_RELEASE_OR_RERUN_SCRIPT = """
+if redis.call('get', KEYS[1]) ~= ARGV[1] then
+    return -1
+end
+if redis.call('del', KEYS[2]) == 1 then
+    return 1
+end
+redis.call('del', KEYS[1])
+return 0
+"""
+
+# KEYS[1] = lock key, KEYS[2] = rerun key; ARGV[1] = ttl in ms
+_REQUEST_RERUN_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 1 then
+    redis.call('set', KEYS[2], 1, 'PX', ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+def get_redis():
+    """Return the Redis connection used by the Django-RQ queues."""
+    return django_rq.get_connection('default')
+
+
+def prepare_job_id(video_id):
+    """Deterministic RQ job id of the fast preparation stage (probe, thumbnail) of a video."""
+    return f'prepare-video-{video_id}'
+
+
+def processing_job_id(video_id):
+    """Deterministic RQ job id of the encode stage of a video's processing run."""
+    return f'process-video-{video_id}'
+
+
+def rendition_job_id(video_id, resolution):
+    """Deterministic RQ job id of a single (lazy) HLS rendition encode."""
+    return f'hls-{video_id}-{resolution}'
+
+
+def retry_job_id(video_id):
+    """Deterministic RQ job id of a delayed processing retry scheduled by the reaper."""
+    return f'retry-video-{video_id}'
+
+
+def follow_up_job_id(video_id):
+    """Deterministic RQ job id of a processing request deferred until a finishing run has ended."""
+    return f'follow-up-video-{video_id}'
+
+
+def _lock_key(video_id):
+    return f'videoflix:video:{video_id}:lock'
+
+
+def _rerun_key(video_id):
+    return f'videoflix:video:{video_id}:rerun'
+
+
+def _heartbeat_key(video_id):
+    return f'videoflix:video:{video_id}:heartbeat'
+
+
+def _cancel_key(video_id):
+    return f'videoflix:video:{video_id}:cancel_epoch'
+
+
+def _rendition_failures_key(video_id, resolution):
+    return f'videoflix:video:{video_id}:hls_failures:{resolution}'
+
+
+def _rendition_backoff_key(video_id, resolution):
+    return f'videoflix:video:{video_id}:hls_backoff:{resolution}'
+
+
+def enqueue_unique(func, *args, job_id, if_running=None, **kwargs):
+    """
+    Enqueue `func` on its routed queue under a deterministic `job_id`, unless that job
+    is already pending: then the pending job is returned instead (request coalesced).
+    Returns None if another process is enqueueing the same job right now.
+    A running job may already be past reading its input. With `if_running`, a running job
+    is not coalesced: `if_running()` is called instead (e.g. to request a rerun) and its
+    result returned.
+    """
+    connection = get_redis()
+    guard_key = f'videoflix:enqueue_guard:{job_id}'
+    if not connection.set(guard_key, 1, nx=True, px=ENQUEUE_GUARD_MS):
+        return None
+    try:
+        queue = get_task_queue(func)
+        job = queue.fetch_job(job_id)
+        if job and is_job_pending(job):
+            if if_running and job.get_status() == 'started':
+                return if_running()
+            logger.info(f'Job {job_id} already pending – request coalesced')
+            return job
+        return queue.enqueue(func, *args, job_id=job_id, **kwargs)
+    finally:
+        connection.delete(guard_key)
+
+
+def is_job_pending(job):
+    """Return True if `job` waits to run or runs on a live worker (see PENDING_JOB_STATUSES)."""
+    status = job.get_status()
+    if status != 'started':
+        return status in PENDING_JOB_STATUSES
+    if job.last_heartbeat is None:
+        return True
+    return (datetime.now(timezone.utc) - job.last_heartbeat).total_seconds() < STARTED_JOB_STALE_AFTER
+
+
+def has_pending_job(video_id):
+    """Return True if a prepare, processing, retry or follow-up job of the video is still waiting to run."""
+    connection = get_redis()
+    job_ids = (prepare_job_id(video_id), processing_job_id(video_id), retry_job_id(video_id), follow_up_job_id(video_id))
+    for job_id in job_ids:
+        try:
+            job = Job.fetch(job_id, connection=connection)
+        except NoSuchJobError:
+            continue
+        if job.get_status() in WAITING_JOB_STATUSES:
+            return True
+    return False
+
+
+def is_processing_alive(video_id):
+    """Return True if a run of the video is active (heartbeat or lock) or still pending."""
+    connection = get_redis()
+    if connection.exists(_heartbeat_key(video_id), _lock_key(video_id)):
+        return True
+    return has_pending_job(video_id)
+
+
+def video_job_ids(video_id):
+    """All deterministic job ids that can exist for a video."""
+    return [
+        prepare_job_id(video_id),
+        processing_job_id(video_id),
+        retry_job_id(video_id),
+        follow_up_job_id(video_id),
+        *(rendition_job_id(video_id, resolution) for resolution in settings.VIDEO_RESOLUTIONS),
+    ]
+
+
+def cancel_video_processing(video_id):
+    """
+    Cancel all processing of a video: running jobs see the bumped cancel epoch and kill
+    their FFmpeg process group, pending jobs (prepare, encode, retries, renditions) are dropped.
+    """
+    connection = get_redis()
+    pipe = connection.pipeline()
+    pipe.incr(_cancel_key(video_id))
+    pipe.expire(_cancel_key(video_id), CANCEL_EPOCH_TTL)
+    for resolution in settings.VIDEO_RESOLUTIONS:  # a replaced original gets a fresh start
+        pipe.delete(_rendition_failures_key(video_id, resolution), _rendition_backoff_key(video_id, resolution))
+    pipe.execute()
+    for job_id in video_job_ids(video_id):
+        try:
+            job = Job.fetch(job_id, connection=connection)
+        except NoSuchJobError:
+            continue
+        if job.get_status() in WAITING_JOB_STATUSES:
+            job.cancel()
+            logger.info(f'Pending job {job_id} cancelled')
+
+
+def record_rendition_failure(video_id, resolution):
+    """
+    Block re-enqueueing a failed rendition encode for VIDEO_RENDITION_RETRY_BACKOFF seconds,
+    doubled per consecutive failure (capped). Returns the backoff in seconds.
+    """
+    connection = get_redis()
+    failures_key = _rendition_failures_key(video_id, resolution)
+    failures = connection.incr(failures_key)
+    connection.expire(failures_key, 2 * settings.VIDEO_RENDITION_RETRY_BACKOFF_MAX)
+    delay = min(
+        settings.VIDEO_RENDITION_RETRY_BACKOFF * 2 ** (failures - 1),
+        settings.VIDEO_RENDITION_RETRY_BACKOFF_MAX
+    )
+    connection.set(_rendition_backoff_key(video_id, resolution), failures, ex=delay)
+    return delay
+
+
+def clear_rendition_failures(video_id, resolution):
+    """Forget earlier failures of a rendition encode after it succeeded."""
+    get_redis().delete(_rendition_failures_key(video_id, resolution), _rendition_backoff_key(video_id, resolution))
+
+
+def is_rendition_backed_off(video_id, resolution):
+    """Return True while a failed rendition encode must not be enqueued again."""
+    return bool(get_redis().exists(_rendition_backoff_key(video_id, resolution)))
+
+
+def request_rerun(video_id):
+    """
+    If a processing run currently holds the video's lock, ask it to run once more
+    when it is done (several requests collapse into one rerun). Returns True if so.
+    """
+    ttl_ms = settings.VIDEO_PROCESSING_LOCK_TTL * 1000
+    script = get_redis().register_script(_REQUEST_RERUN_SCRIPT)
+    return bool(script(keys=[_lock_key(video_id), _rerun_key(video_id)], args=[ttl_ms]))
+
+
+class VideoLock:
+    """Redis lease lock for one video, renewed by a background thread while held."""
+
+    def __init__(self, video_id, ttl=None):
+        self.video_id = video_id
+        self.ttl = ttl or settings.VIDEO_PROCESSING_LOCK_TTL
+        self.token = uuid.uuid4().hex
+        self.connection = get_redis()
+        self._stop = threading.Event()
+        self._renewer = None
+
+    def acquire(self):
+        """Try to take the lock without blocking. Returns True on success."""
+        acquired = bool(self.connection.set(_lock_key(self.video_id), self.token, nx=True, ex=self.ttl))
+        if acquired:
+            self._renewer = threading.Thread(target=self._renew_loop, daemon=True)
+            self._renewer.start()
+        return acquired
+
+    def _renew_loop(self):
+        """Extend the lease every ttl/3 seconds until released or lost."""
+        script = self.connection.register_script(_RENEW_SCRIPT)
+        while not self._stop.wait(self.ttl / 3):
+            if not script(keys=[_lock_key(self.video_id)], args=[self.token, self.ttl * 1000]):
+                logger.warning(f'Processing lock for video ID {self.video_id} was lost')
+                return
+
+    def release_or_rerun(self):
+        """
+        Release the lock, unless a rerun was requested meanwhile: then keep it and
+        return True so the caller processes the video once more.
+        """
+        script = self.connection.register_script(_RELEASE_OR_RERUN_SCRIPT)
+        result = script(keys=[_lock_key(self.video_id), _rerun_key(self.video_id)], args=[self.token])
+        if result == 1:
+            return True
+        self._stop.set()
+        return False
+
+    def release(self):
+        """Release the lock unconditionally (if it is still ours)."""
+        self._stop.set()
+        script = self.connection.register_script(_RELEASE_SCRIPT)
+        script(keys=[_lock_key(self.video_id)], args=[self.token])
+
+
+class Heartbeat:
+    """Context manager keeping the video's heartbeat key alive while a job works on it."""
+
+    def __init__(self, video_id, ttl=None):
+        self.video_id = video_id
+        self.ttl = ttl or settings.VIDEO_HEARTBEAT_TTL
+        self.connection = get_redis()
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self._beat()
+        threading.Thread(target=self._beat_loop, daemon=True).start()
+        return self
+
+    def _beat(self):
+        self.connection.set(_heartbeat_key(self.video_id), time.time(), ex=self.ttl)
+
+    def _beat_loop(self):
+        while not self._stop.wait(self.ttl / 3):
+            self._beat()
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self.connection.delete(_heartbeat_key(self.video_id))
+        return False
+
+
+class CancelToken:
+    """Tells a processing run whether its video was cancelled since the token was created."""
+
+    def __init__(self, video_id):
+        self.video_id = video_id
+        self.connection = get_redis()
+        self.epoch = self._current_epoch()
+
+    def _current_epoch(self):
+        return int(self.connection.get(_cancel_key(self.video_id)) or 0)
+
+    @property
+    def cancelled(self):
+        return self._current_epoch() != self.epoch
+
+    def check(self):
+        """Raise ProcessingCancelled if the video was cancelled."""
+        if self.cancelled:
+            raise ProcessingCancelled(f'Processing of video ID {self.video_id} was cancelled')
@@ -0,0 +1,55 @@
+"""
+Management-Befehl: Personen und Mitwirkungen aus den Textfeldern aufbauen.
+Zerlegt Video.director und Video.cast (Komma-getrennt) aller Videos in Person- und
+VideoCredit-Zeilen. Arbeitet in Batches mit Bulk-Inserts; die Mitwirkungen eines Batches
+werden ersetzt, der Befehl kann also beliebig oft laufen. Danach hält Video.save
+die Mitwirkungen aktuell.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from videos.models import Person, Video, VideoCredit, parse_credits
+
+
+class Command(BaseCommand):
+    help = 'Personen und Mitwirkungen aus Regisseur/Besetzung aller Videos aufbauen (Bulk)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Videos pro Batch')
+        parser.add_argument('--prune', action='store_true', help='Personen ohne Mitwirkung danach löschen')
+
+    def handle(self, *args, **options):
+        rows = Video.objects.order_by('id').values_list('id', 'director', 'cast').iterator(
+            chunk_size=options['batch_size']
+        )
+        batch, videos, credits = [], 0, 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= options['batch_size']:
+                credits += self._backfill(batch)
+                videos += len(batch)
+                batch = []
+        if batch:
+            credits += self._backfill(batch)
+            videos += len(batch)
+        self.stdout.write(f'{videos} Videos, {credits} Mitwirkungen geschrieben.')
+        if options['prune']:
+            pruned, _details = Person.objects.filter(credits__isnull=True).delete()
+            self.stdout.write(f'{pruned} Personen ohne Mitwirkung gelöscht.')
+        self.stdout.write(self.style.SUCCESS(f'{Person.objects.count()} Personen im Index.'))
+
+    def _backfill(self, batch):
+        """Replace the credits of one batch of (id, director, cast) rows. Returns the credit count."""
+        parsed = {video_id: parse_credits(director, cast) for video_id, director, cast in batch}
+        person_ids = Person.ids_for_names(
+            name for credits in parsed.values() for _slug, name, _role, _position in credits
+        )
+        credits = [
+            VideoCredit(video_id=video_id, person_id=person_ids[slug], role=role, position=position)
+            for video_id, video_credits in parsed.items()
+            for slug, _name, role, position in video_credits
+        ]
+        with transaction.atomic():
+            VideoCredit.objects.filter(video_id__in=parsed).delete()
+            VideoCredit.objects.bulk_create(credits, batch_size=5000)
+        return len(credits)
@@ -0,0 +1,119 @@
+"""
+Management-Befehl: Rate-Control-Profile vergleichen.
+Erzeugt synthetisches Testmaterial (ffmpeg lavfi) oder nutzt eine eigene Datei,
+kodiert es pro Profil und Auflösung nach HLS und misst Encode-Geschwindigkeit,
+Ausgabegröße und Streuung der Segmentgrößen.
+"""
+import os
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from videos.utils import (
+    build_hls_ffmpeg_command,
+    get_quality_settings,
+    get_video_duration_seconds,
+    run_ffmpeg_command,
+)
+
+SYNTHETIC_SOURCES = {
+    # Ruhiges Bild: Testmuster ohne Rauschen (Talking-Head/Cartoon-ähnlich)
+    'static': 'testsrc2=size=1920x1080:rate=25',
+    # Komplexes Bild: Testmuster mit zeitlich wechselndem Rauschen (Action/Film-Korn)
+    'noisy': 'testsrc2=size=1920x1080:rate=25,noise=alls=40:allf=t+u',
+}
+
+
+def build_synthetic_source_command(lavfi_source, duration, output_path):
+    """Build FFmpeg command that renders a synthetic lossless-ish test clip."""
+    return [
+        'ffmpeg', '-v', 'error', '-f', 'lavfi', '-i', f'{lavfi_source}:duration={duration}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+        '-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '10',
+        '-c:a', 'aac', '-shortest', '-y', output_path
+    ]
+
+
+def measure_hls_output(hls_dir):
+    """Return (total_bytes, segment_sizes) for an HLS output directory."""
+    sizes = [
+        os.path.getsize(os.path.join(hls_dir, name))
+        for name in sorted(os.listdir(hls_dir)) if name.endswith('.ts')
+    ]
+    return sum(sizes), sizes
+
+
+class Command(BaseCommand):
+    help = 'Rate-Control-Profile vergleichen (Encode-Speed, Bytes, Segmentgrößen-Varianz)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', nargs='+', default=None,
+                            help='Profile aus VIDEO_RATE_CONTROL_PROFILES (Standard: alle)')
+        parser.add_argument('--resolutions', nargs='+', default=['360p', '720p'],
+                            help='Auflösungen aus VIDEO_RESOLUTIONS')
+        parser.add_argument('--duration', type=int, default=30, help='Länge des synthetischen Testmaterials in Sekunden')
+        parser.add_argument('--source', default=None, help='Eigene Videodatei statt synthetischem Material')
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'] or list(settings.VIDEO_RATE_CONTROL_PROFILES)
+        unknown = [p for p in profiles if p not in settings.VIDEO_RATE_CONTROL_PROFILES]
+        if unknown:
+            raise CommandError(f'Unbekannte Profile: {", ".join(unknown)}')
+        work_dir = tempfile.mkdtemp(prefix='rc_bench_')
+        try:
+            sources = self._prepare_sources(work_dir, options)
+            self.stdout.write(
+                f'{"Quelle":<10} {"Auflösung":<10} {"Profil":<18} {"Speed":>8} '
+                f'{"MB":>8} {"Segmente":>9} {"Ø kB":>9} {"VK":>6} {"Max/Ø":>6}'
+            )
+            for source_name, (source_path, duration) in sources.items():
+                for resolution in options['resolutions']:
+                    for profile in profiles:
+                        self._benchmark(work_dir, source_name, source_path, resolution, profile, duration)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _prepare_sources(self, work_dir, options):
+        """Return {name: (path, duration in seconds)} of the clips to encode."""
+        if options['source']:
+            if not os.path.isfile(options['source']):
+                raise CommandError(f'Datei nicht gefunden: {options["source"]}')
+            # The speed refers to the real length of the file, not to --duration
+            duration = get_video_duration_seconds(options['source'])
+            if duration <= 0:
+                raise CommandError(f'Dauer von {options["source"]} nicht ermittelbar (ffprobe)')
+            return {'custom': (options['source'], duration)}
+        sources = {}
+        for name, lavfi_source in SYNTHETIC_SOURCES.items():
+            path = os.path.join(work_dir, f'{name}.mp4')
+            success, error = run_ffmpeg_command(build_synthetic_source_command(lavfi_source, options['duration'], path))
+            if not success:
+                raise CommandError(f'Testmaterial konnte nicht erzeugt werden: {error}')
+            sources[name] = (path, options['duration'])
+        return sources
+
+    def _benchmark(self, work_dir, source_name, source_path, resolution, profile, duration):
+        """Encode one source/resolution/profile combination and print one result row."""
+        hls_dir = os.path.join(work_dir, f'{source_name}_{resolution}_{profile}')
+        os.makedirs(hls_dir)
+        settings_dict = dict(get_quality_settings(resolution), rate_control=profile)
+        started = time.perf_counter()
+        success, error = run_ffmpeg_command(build_hls_ffmpeg_command(source_path, hls_dir, settings_dict))
+        elapsed = time.perf_counter() - started
+        if not success:
+            self.stdout.write(self.style.ERROR(f'{source_name} {resolution} {profile}: FFmpeg-Fehler {error[-200:]}'))
+            return
+        total_bytes, sizes = measure_hls_output(hls_dir)
+        mean = statistics.mean(sizes) if sizes else 0
+        stdev = statistics.pstdev(sizes) if len(sizes) > 1 else 0
+        variation = stdev / mean if mean else 0
+        peak = max(sizes) / mean if mean else 0
+        self.stdout.write(
+            f'{source_name:<10} {resolution:<10} {profile:<18} {duration / elapsed:>7.2f}x '
+            f'{total_bytes / 1e6:>8.2f} {len(sizes):>9} {mean / 1e3:>9.1f} {variation:>6.2f} {peak:>6.2f}'
+        )
+        shutil.rmtree(hls_dir, ignore_errors=True)
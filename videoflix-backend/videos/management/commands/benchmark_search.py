@@ -0,0 +1,107 @@
+"""
+Management-Befehl: Latenz der Videosuche messen.
+Legt in einer Transaktion N synthetische Videos an (Standard 100.000), baut deren
+Suchvektoren, aktualisiert die Statistiken und misst pro Suchbegriff die Latenz von
+  - ilike:    DRF-SearchFilter wie bisher (ILIKE '%q%' über vier Spalten),
+  - search:   ?search= auf der Liste (Volltext- oder Trigramm-Treffer, Index),
+  - ranked:   /api/video/search/ (Relevanz-Sortierung, Top 50).
+Am Ende wird die Transaktion zurückgerollt; es bleibt nichts in der Datenbank.
+Nur für PostgreSQL.
+"""
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+
+from api.videos.search import search_condition, search_videos
+from videos.models import Video, video_search_vector
+
+WORDS = (
+    'abenteuer nacht stadt meer sturm liebe schatten könig reise wald feuer himmel '
+    'geheimnis spiel zeit stern winter sommer legende jagd insel wüste fluss herz '
+    'berg traum krieg familie freund verrat flucht rückkehr ende anfang'
+).split()
+NAMES = (
+    'Anna Berger', 'Jonas Keller', 'Mia Schulz', 'Lukas Wagner', 'Lea Hoffmann', 'Paul Richter',
+    'Emma Krüger', 'Felix Braun', 'Sophie Wolf', 'Noah Schröder', 'Clara Neumann', 'Ben Zimmermann',
+)
+DEFAULT_QUERIES = ['sturm', 'geheimnis der insel', 'Keller', 'abentuer', 'legende -winter', 'Schroeder']
+
+
+def build_videos(count, rng):
+    """Yield `count` unsaved synthetic videos with random titles, descriptions and credits."""
+    for position in range(count):
+        title = ' '.join(rng.sample(WORDS, rng.randint(2, 4))).title()
+        yield Video(
+            title=f'{title} {position}',
+            slug=f'benchmark-search-{position}',
+            description=' '.join(rng.choices(WORDS, k=40)).capitalize() + '.',
+            director=rng.choice(NAMES),
+            cast=', '.join(rng.sample(NAMES, 3)),
+            original_video='videos/benchmark/original.mp4',
+            status='published',
+        )
+
+
+def measure(run, repeat):
+    """Return the latencies in ms of `repeat` calls of run()."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+class Command(BaseCommand):
+    help = 'Latenz der Videosuche messen (ILIKE vs. Volltext-/Trigramm-Index) mit synthetischen Titeln'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=100_000, help='Anzahl synthetischer Videos')
+        parser.add_argument('--queries', nargs='+', default=DEFAULT_QUERIES, help='Suchbegriffe')
+        parser.add_argument('--repeat', type=int, default=20, help='Messungen pro Suchbegriff und Variante')
+        parser.add_argument('--seed', type=int, default=1, help='Zufallsstartwert für reproduzierbare Daten')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Der Benchmark benötigt PostgreSQL (tsvector, pg_trgm).')
+        with transaction.atomic():
+            self._populate(options['count'], random.Random(options['seed']))
+            published = Video.objects.filter(status='published')
+            variants = {
+                'ilike': lambda text: list(published.filter(
+                    Q(title__icontains=text) | Q(description__icontains=text)
+                    | Q(director__icontains=text) | Q(cast__icontains=text)
+                ).values_list('id', flat=True)[:settings.VIDEO_SEARCH_MAX_RESULTS]),
+                'search': lambda text: list(published.filter(
+                    search_condition(text)
+                ).values_list('id', flat=True)[:settings.VIDEO_SEARCH_MAX_RESULTS]),
+                'ranked': lambda text: list(search_videos(
+                    published, text
+                ).values_list('id', flat=True)[:settings.VIDEO_SEARCH_MAX_RESULTS]),
+            }
+            self.stdout.write(f'{"Suchbegriff":<22} {"Variante":<8} {"Treffer":>8} {"p50 ms":>8} {"p95 ms":>8} {"max ms":>8}')
+            for text in options['queries']:
+                for name, run in variants.items():
+                    hits = len(run(text))  # Aufwärmen (Plan-Cache, Seiten im Puffer)
+                    timings = sorted(measure(lambda: run(text), options['repeat']))
+                    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+                    self.stdout.write(
+                        f'{text:<22} {name:<8} {hits:>8} {statistics.median(timings):>8.1f} '
+                        f'{p95:>8.1f} {timings[-1]:>8.1f}'
+                    )
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Fertig – Testdaten zurückgerollt.'))
+
+    def _populate(self, count, rng):
+        """Insert the synthetic videos (bulk, without signals) and index them like Video.save does."""
+        started = time.perf_counter()
+        Video.objects.bulk_create(build_videos(count, rng), batch_size=5000)
+        Video.objects.filter(slug__startswith='benchmark-search-').update(search_vector=video_search_vector())
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Video._meta.db_table}')
+        self.stdout.write(f'{count} Videos angelegt und indiziert in {time.perf_counter() - started:.1f} s')
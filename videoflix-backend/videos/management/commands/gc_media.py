@@ -0,0 +1,98 @@
+"""
+Management-Befehl: Verwaiste Medienverzeichnisse aufräumen (Garbage Collection).
+Durchsucht MEDIA_ROOT/videos und MEDIA_ROOT/thumbnails parallel nach Verzeichnissen,
+auf die kein Video mehr verweist: `temp_*` (Uploads ohne ID), `None` und gelöschte
+Video-IDs. Sie werden in Batches gelöscht; am Ende steht ein Bericht der freigegebenen Bytes.
+Verzeichnisse jünger als --min-age Stunden werden übersprungen (laufende Uploads).
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from videos.models import MEDIA_FILE_FIELDS, MEDIA_SUBDIRS, Video, media_dir_for_name, media_id_dirs, remove_media_dirs
+from videos.utils import get_directory_size
+
+
+def classify_media_dir(name):
+    """Return the orphan category of a media dir name: 'temp', 'none' or 'orphan'."""
+    if name == 'None':
+        return 'none'
+    if name.startswith('temp_'):
+        return 'temp'
+    return 'orphan'
+
+
+def referenced_media_dirs():
+    """
+    Return the set of absolute media dirs referenced by any video: the dirs of its file fields
+    and its id dirs (files of videos stored under videos/None/ or temp_xxx/ live there).
+    """
+    referenced = set()
+    for video_id, *names in Video.objects.values_list('id', *MEDIA_FILE_FIELDS).iterator():
+        referenced.update(media_dir_for_name(name) for name in names if name)
+        referenced.update(media_id_dirs(video_id))
+    referenced.discard(None)
+    return referenced
+
+
+def find_unreferenced_dirs(referenced, min_age_seconds):
+    """Yield (path, category) for media dirs nobody references that are older than min_age_seconds."""
+    cutoff = time.time() - min_age_seconds
+    for subdir in MEDIA_SUBDIRS:
+        root = os.path.join(os.path.abspath(settings.MEDIA_ROOT), subdir)
+        if not os.path.isdir(root):
+            continue
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if not entry.is_dir(follow_symlinks=False) or entry.path in referenced:
+                    continue
+                if entry.stat(follow_symlinks=False).st_mtime > cutoff:
+                    continue
+                yield entry.path, classify_media_dir(entry.name)
+
+
+class Command(BaseCommand):
+    help = 'Verwaiste Medienverzeichnisse (temp_*, None, gelöschte Videos) finden und löschen'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Nur anzeigen, nichts löschen')
+        parser.add_argument('--min-age', type=float, default=24,
+                            help='Nur Verzeichnisse älter als N Stunden (Standard: 24)')
+        parser.add_argument('--workers', type=int, default=8, help='Parallele Threads für Scan und Löschen')
+        parser.add_argument('--batch-size', type=int, default=50, help='Verzeichnisse pro Lösch-Batch')
+
+    def handle(self, *args, **options):
+        referenced = referenced_media_dirs()
+        candidates = list(find_unreferenced_dirs(referenced, options['min_age'] * 3600))
+        self.stdout.write(f'{len(referenced)} referenzierte, {len(candidates)} verwaiste Verzeichnisse gefunden.')
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            sizes = list(pool.map(get_directory_size, [path for path, _category in candidates]))
+            if not options['dry_run']:
+                self._reclaim(pool, [path for path, _category in candidates], sizes, options['batch_size'])
+
+        self._report(candidates, sizes, options['dry_run'])
+
+    def _reclaim(self, pool, paths, sizes, batch_size):
+        """Delete the dirs in batches (each batch in parallel) and print the progress."""
+        freed = 0
+        for start in range(0, len(paths), batch_size):
+            batch = paths[start:start + batch_size]
+            list(pool.map(lambda path: remove_media_dirs([path]), batch))
+            freed += sum(sizes[start:start + batch_size])
+            self.stdout.write(f'  {start + len(batch)}/{len(paths)} gelöscht ({freed / (1024 * 1024):.1f} MB)')
+
+    def _report(self, candidates, sizes, dry_run):
+        """Print count and bytes per category and the total."""
+        totals = {}
+        for (path, category), size in zip(candidates, sizes):
+            count, total = totals.get(category, (0, 0))
+            totals[category] = (count + 1, total + size)
+        for category, (count, total) in sorted(totals.items()):
+            self.stdout.write(f'  {category}: {count} Verzeichnisse, {total / (1024 * 1024):.1f} MB')
+        total_mb = sum(sizes) / (1024 * 1024)
+        action = 'würden freigegeben' if dry_run else 'freigegeben'
+        self.stdout.write(self.style.SUCCESS(f'{len(candidates)} Verzeichnisse, {total_mb:.1f} MB {action}.'))
@@ -0,0 +1,25 @@
+"""
+Management-Befehl: Selten genutzte Renditions löschen.
+Entfernt nicht-Basis-Renditions (siehe VIDEO_BASE_RENDITIONS) von wenig gesehenen Videos,
+deren Playlist länger nicht abgerufen wurde. Sie werden bei Bedarf erneut kodiert.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from videos.tasks import prune_unused_renditions
+
+
+class Command(BaseCommand):
+    help = 'Selten genutzte Renditions löschen (werden bei Bedarf neu kodiert)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.VIDEO_RENDITION_PRUNE_AFTER_DAYS,
+                            help='Nur Renditions ohne Abruf in den letzten N Tagen')
+        parser.add_argument('--dry-run', action='store_true', help='Nur anzeigen, nichts löschen')
+
+    def handle(self, *args, **options):
+        pruned = prune_unused_renditions(max_age_days=options['days'], dry_run=options['dry_run'])
+        for video_id, resolution, size in pruned:
+            self.stdout.write(f'  Video {video_id} {resolution}: {size / (1024 * 1024):.1f} MB')
+        total_mb = sum(size for _vid, _res, size in pruned) / (1024 * 1024)
+        action = 'würden freigegeben' if options['dry_run'] else 'freigegeben'
+        self.stdout.write(self.style.SUCCESS(f'{len(pruned)} Renditions, {total_mb:.1f} MB {action}.'))
@@ -0,0 +1,23 @@
+"""
+Management-Befehl: Typeahead-Index (Redis) neu aufbauen.
+Signale halten den Index aktuell; nach einem Redis-Verlust, Bulk-Importen oder Änderungen
+an der Datenbank vorbei wird er hier aus allen veröffentlichten Videos neu erzeugt und
+atomar ausgetauscht.
+"""
+from django.core.management.base import BaseCommand
+
+from videos.models import Video
+from videos.suggest import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Typeahead-Index (Titel, Regie, Besetzung) aus allen veröffentlichten Videos neu aufbauen'
+
+    def handle(self, *args, **options):
+        videos = (
+            Video.objects.filter(status='published')
+            .only('id', 'title', 'director', 'cast', 'view_count', 'status')
+            .iterator(chunk_size=2000)
+        )
+        count = rebuild_index(videos)
+        self.stdout.write(self.style.SUCCESS(f'Typeahead-Index mit {count} Videos neu aufgebaut.'))
@@ -0,0 +1,32 @@
+"""
+Management-Befehl: Zähler der veröffentlichten Videos pro Kategorie neu berechnen.
+Category.published_video_count wird von Signalen gepflegt; Änderungen an der Datenbank
+vorbei (Raw SQL, QuerySet.update() am Status) lassen ihn driften. Der Befehl zeigt die
+Abweichungen und setzt alle Zähler mit einem einzigen UPDATE neu.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q
+
+from videos.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Zähler der veröffentlichten Videos pro Kategorie neu berechnen'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Nur Abweichungen anzeigen, nichts ändern')
+
+    def handle(self, *args, **options):
+        categories = Category.objects.annotate(
+            actual=Count('videos', filter=Q(videos__status='published'))
+        ).order_by('name')
+        drifted = [category for category in categories if category.actual != category.published_video_count]
+        for category in drifted:
+            self.stdout.write(f'  {category.name}: {category.published_video_count} → {category.actual}')
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{len(drifted)} Kategorien mit abweichendem Zähler.'))
+            return
+        updated = Category.refresh_published_video_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated} Kategorien neu gezählt, {len(drifted)} Zähler korrigiert.'
+        ))
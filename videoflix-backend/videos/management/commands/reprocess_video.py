@@ -1,22 +1,216 @@
 """
-Management-Befehl: Video nachträglich verarbeiten (Dauer, Thumbnail, HLS).
-Nützlich wenn der RQ-Job nicht lief oder fehlgeschlagen ist.
+Management-Befehl: Videos nachträglich verarbeiten (Dauer, Thumbnail, HLS).
+Nützlich wenn der RQ-Job nicht lief oder fehlgeschlagen ist, oder um nach einer Änderung
+der Encoding-Leiter viele Titel neu zu kodieren:
+
+  reprocess_video 12                        # ein Video im Vordergrund
+  reprocess_video --all --dry-run           # Plan mit geschätzter Encode-Zeit
+  reprocess_video --missing-rendition 720p --workers 4
+  reprocess_video --broken                  # von video_path_check als defekt markiert
+  reprocess_video --status published --since 2025-01-01 --mode queue --batch-size 50
+  reprocess_video --resume                  # abgebrochenen Lauf fortsetzen
+
+Fortschritt wird nach jedem Video in einer State-Datei gespeichert (--state-file).
 """
-from django.core.management.base import BaseCommand
-from videos.tasks import process_uploaded_video
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from multiprocessing import get_context
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Exists, OuterRef
+
+from core.queues import default_worker_count, get_task_queue
+from videos.models import Video, VideoRendition
+from videos.tasks import enqueue_video_processing, process_uploaded_video, process_video_now
+
+
+def _init_worker():
+    """Process pool initializer: set up Django in the spawned worker process."""
+    django.setup()
+
+
+def _reprocess(video_id):
+    """Process pool task: run the complete pipeline for one video."""
+    return video_id, bool(process_video_now(video_id))
+
+
+def estimate_encode_seconds(duration):
+    """Estimated encode time (one worker) of a video with `duration` seconds for the base renditions."""
+    speed = settings.VIDEO_ENCODE_SPEED_ESTIMATE
+    per_second = sum(speed.get(resolution, 1.0) for resolution in settings.VIDEO_BASE_RENDITIONS)
+    return settings.VIDEO_PREPARE_SECONDS_ESTIMATE + duration * per_second
+
+
+def encode_backlog(queue):
+    """
+    Encode jobs not finished yet: queued, running, and deferred (an encode job waits in the
+    deferred registry until its prepare job on the fast queue is done).
+    """
+    return queue.count + queue.deferred_job_registry.count + queue.started_job_registry.count
+
+
+def format_seconds(seconds):
+    """Format a duration as e.g. '2h 05min' or '4min 10s'."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f'{hours}h {minutes:02d}min'
+    return f'{minutes}min {secs:02d}s'
 
 
 class Command(BaseCommand):
-    help = 'Video nachträglich verarbeiten (Dauer, Thumbnail, HLS)'
+    help = 'Videos nachträglich verarbeiten (einzeln oder per Filter, lokal parallel oder über die Queue)'
 
     def add_arguments(self, parser):
-        parser.add_argument('video_id', type=int, help='ID des Videos')
+        parser.add_argument('video_ids', nargs='*', type=int, help='IDs der Videos')
+        parser.add_argument('--all', action='store_true', help='Alle Videos')
+        parser.add_argument('--status', choices=[value for value, _label in Video.STATUS_CHOICES],
+                            help='Nur Videos mit diesem Status')
+        parser.add_argument('--missing-rendition', choices=list(settings.VIDEO_BASE_RENDITIONS),
+                            help='Nur Videos, denen diese Basis-Rendition fehlt (weitere Stufen werden '
+                                 'bei Bedarf kodiert und hier nicht erzeugt)')
+        parser.add_argument('--broken', action='store_true',
+                            help='Nur Videos, die video_path_check als defekt markiert hat')
+        parser.add_argument('--since', type=datetime.fromisoformat,
+                            help='Nur Videos, die seit diesem Datum (YYYY-MM-DD) erstellt wurden')
+        parser.add_argument('--dry-run', action='store_true', help='Nur Plan und Zeitschätzung anzeigen')
+        parser.add_argument('--mode', choices=['local', 'queue'], default='local',
+                            help='local: Prozess-Pool in diesem Prozess, queue: in Batches in die Encode-Queue')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Parallele Prozesse im lokalen Modus (Standard: Größe des Encode-Pools)')
+        parser.add_argument('--batch-size', type=int, default=20, help='Videos pro Batch im Queue-Modus')
+        parser.add_argument('--max-queued', type=int, default=None,
+                            help='Im Queue-Modus warten, bis höchstens so viele Encode-Jobs anstehen, '
+                                 'laufen oder auf ihren Prepare-Job warten (Standard: Batch-Größe)')
+        parser.add_argument('--state-file', default=str(settings.VIDEO_REPROCESS_STATE_FILE),
+                            help='Datei für den Fortschritt (zum Fortsetzen)')
+        parser.add_argument('--resume', action='store_true',
+                            help='Plan aus der State-Datei übernehmen und erledigte Videos überspringen')
 
     def handle(self, *args, **options):
-        video_id = options['video_id']
-        self.stdout.write(f'Starte Verarbeitung für Video-ID {video_id}...')
-        success = process_uploaded_video(video_id)
-        if success:
-            self.stdout.write(self.style.SUCCESS(f'Video {video_id} erfolgreich verarbeitet.'))
+        self.state_file = options['state_file']
+        if options['resume']:
+            state = self._load_state()
+        else:
+            state = {'video_ids': self._select_video_ids(options), 'done': [], 'failed': []}
+        finished = set(state['done']) | set(state['failed'])
+        pending = [video_id for video_id in state['video_ids'] if video_id not in finished]
+
+        if options['dry_run']:
+            self._print_plan(pending, options)
+            return
+        if not pending:
+            self.stdout.write(self.style.SUCCESS('Nichts zu verarbeiten.'))
+            return
+
+        self.state = state
+        self._save_state()
+        self.total = len(state['video_ids'])
+        self.started = time.monotonic()
+        self.processed = 0
+        if len(pending) == 1 and options['mode'] == 'local':
+            self._record(pending[0], process_video_now(pending[0]))
+        elif options['mode'] == 'local':
+            self._run_local(pending, options['workers'] or default_worker_count('encode'))
         else:
-            self.stdout.write(self.style.ERROR(f'Verarbeitung für Video {video_id} fehlgeschlagen. Siehe Logs.'))
+            self._run_queue(pending, options['batch_size'], options['max_queued'] or options['batch_size'])
+        self._print_summary(options['mode'])
+
+    def _select_video_ids(self, options):
+        """Return the ordered list of video ids matching the filters."""
+        filters = ('all', 'status', 'missing_rendition', 'broken', 'since')
+        if not options['video_ids'] and not any(options[name] for name in filters):
+            raise CommandError(
+                'Video-IDs oder einen Filter (--all, --status, --missing-rendition, --broken, --since) angeben.'
+            )
+        videos = Video.objects.order_by('id')
+        if options['video_ids']:
+            videos = videos.filter(id__in=options['video_ids'])
+        if options['status']:
+            videos = videos.filter(status=options['status'])
+        if options['broken']:
+            videos = videos.filter(integrity_check__needs_reprocessing=True)
+        if options['since']:
+            videos = videos.filter(created_at__gte=options['since'])
+        if options['missing_rendition']:
+            ready = VideoRendition.objects.filter(
+                video=OuterRef('pk'), resolution=options['missing_rendition'], is_ready=True
+            )
+            videos = videos.filter(~Exists(ready))
+        return list(videos.values_list('id', flat=True))
+
+    def _print_plan(self, video_ids, options):
+        """Print the videos to process and the estimated encode time."""
+        durations = dict(Video.objects.filter(id__in=video_ids).values_list('id', 'duration'))
+        total_seconds = sum(estimate_encode_seconds(durations.get(video_id, 0)) for video_id in video_ids)
+        parallel = options['workers'] or default_worker_count('encode')
+        content = sum(durations.values())
+        self.stdout.write(f'{len(video_ids)} Videos, {format_seconds(content)} Material')
+        self.stdout.write(f'Renditions: {", ".join(settings.VIDEO_BASE_RENDITIONS)}')
+        self.stdout.write(f'Geschätzte Encode-Zeit: {format_seconds(total_seconds)} (1 Worker), '
+                          f'ca. {format_seconds(total_seconds / parallel)} mit {parallel} parallel')
+        self.stdout.write(self.style.WARNING('Dry-Run: nichts verarbeitet.'))
+
+    def _run_local(self, video_ids, workers):
+        """Process the videos in a pool of spawned worker processes."""
+        self.stdout.write(f'Verarbeite {len(video_ids)} Videos mit {workers} Prozessen...')
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, mp_context=get_context('spawn'),
+                                 initializer=_init_worker) as pool:
+            futures = [pool.submit(_reprocess, video_id) for video_id in video_ids]
+            for future in as_completed(futures):
+                video_id, success = future.result()
+                self._record(video_id, success)
+
+    def _run_queue(self, video_ids, batch_size, max_queued):
+        """Enqueue the videos in batches, waiting until the encode backlog has drained enough."""
+        queue = get_task_queue(process_uploaded_video)
+        for start in range(0, len(video_ids), batch_size):
+            while encode_backlog(queue) > max_queued:
+                time.sleep(settings.VIDEO_REPROCESS_QUEUE_POLL_INTERVAL)
+            for video_id in video_ids[start:start + batch_size]:
+                enqueue_video_processing(video_id)
+                self._record(video_id, True)
+
+    def _record(self, video_id, success):
+        """Store the result in the state file and print the progress line."""
+        self.state['done' if success else 'failed'].append(video_id)
+        self._save_state()
+        self.processed += 1
+        finished = len(self.state['done']) + len(self.state['failed'])
+        elapsed = time.monotonic() - self.started
+        remaining = elapsed / self.processed * (self.total - finished)
+        result = self.style.SUCCESS('ok') if success else self.style.ERROR('fehlgeschlagen')
+        self.stdout.write(f'[{finished}/{self.total}] Video {video_id}: {result} '
+                          f'(vergangen {format_seconds(elapsed)}, Rest ca. {format_seconds(remaining)})')
+
+    def _print_summary(self, mode):
+        done, failed = len(self.state['done']), len(self.state['failed'])
+        action = 'eingereiht' if mode == 'queue' else 'verarbeitet'
+        self.stdout.write(self.style.SUCCESS(f'{done} Videos {action}.'))
+        if failed:
+            self.stdout.write(self.style.ERROR(
+                f'{failed} fehlgeschlagen: {", ".join(map(str, self.state["failed"]))}. Siehe Logs.'
+            ))
+
+    def _load_state(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'State-Datei {self.state_file} nicht lesbar: {error}')
+
+    def _save_state(self):
+        """Write the state file atomically (temp file + rename)."""
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_file)), exist_ok=True)
+        tmp_path = f'{self.state_file}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.state_file)
@@ -0,0 +1,25 @@
+"""
+Management-Befehl: Periodische Jobs einplanen (RQ CronScheduler, croniter-Syntax).
+Reiht die Jobs aus settings.RQ_CRON_JOBS zu ihren Cron-Zeitpunkten in ihre Queue
+(siehe RQ_TASK_ROUTES) ein, z. B. den Reaper für abgestürzte Verarbeitungsläufe.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.module_loading import import_string
+from rq.cron import CronScheduler
+
+from core.queues import get_queue_name
+from videos.jobs import get_redis
+
+
+class Command(BaseCommand):
+    help = 'Periodische Jobs aus RQ_CRON_JOBS einplanen (Cron-Scheduler)'
+
+    def handle(self, *args, **options):
+        scheduler = CronScheduler(connection=get_redis(), name='videoflix-cron')
+        for entry in settings.RQ_CRON_JOBS:
+            func = import_string(entry['func'])
+            queue_name = get_queue_name(func)
+            scheduler.register(func, queue_name, cron=entry['cron'])
+            self.stdout.write(f'{entry["func"]}: "{entry["cron"]}" -> Queue {queue_name}')
+        scheduler.start()
@@ -0,0 +1,100 @@
+"""
+Management-Befehl: RQ-Worker-Pools starten und überwachen.
+Startet pro Pool aus settings.RQ_WORKER_POOLS die konfigurierte Anzahl `rqworker`-Prozesse
+(Encode-Pool: CPU-Kerne / VIDEO_ENCODE_THREADS) bzw. den Cron-Scheduler, startet abgestürzte Worker neu und
+beendet alle Worker sauber bei SIGTERM/SIGINT.
+"""
+import signal
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.queues import default_worker_count
+
+POLL_INTERVAL = 2
+RESTART_BACKOFF_MAX = 60
+SHUTDOWN_TIMEOUT = 30
+
+
+class Command(BaseCommand):
+    help = 'RQ-Worker-Pools pro Queue starten und überwachen (Supervisor)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pools', nargs='+', default=None,
+                            help='Nur diese Pools starten (Standard: alle aus RQ_WORKER_POOLS)')
+        for pool_name in settings.RQ_WORKER_POOLS:
+            parser.add_argument(f'--{pool_name}', type=int, default=None, dest=f'workers_{pool_name}',
+                                help=f'Anzahl Worker im Pool "{pool_name}"')
+
+    def handle(self, *args, **options):
+        pool_names = options['pools'] or list(settings.RQ_WORKER_POOLS)
+        unknown = [name for name in pool_names if name not in settings.RQ_WORKER_POOLS]
+        if unknown:
+            raise CommandError(f'Unbekannte Pools: {", ".join(unknown)}')
+
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        self.slots = []
+        for pool_name in pool_names:
+            count = options[f'workers_{pool_name}'] or default_worker_count(pool_name)
+            pool = settings.RQ_WORKER_POOLS[pool_name]
+            target = pool.get('command') or f'Queues {", ".join(pool["queues"])}'
+            self.stdout.write(f'Pool {pool_name}: {count} Worker für {target}')
+            for _ in range(count):
+                self.slots.append({'pool': pool_name, 'process': None, 'failures': 0, 'restart_at': 0})
+
+        try:
+            self._supervise()
+        finally:
+            self._shutdown()
+
+    def _request_stop(self, signum, frame):
+        self.stopping = True
+
+    def _worker_command(self, pool_name):
+        """Build the rqworker (or custom management command) line for a pool."""
+        pool = settings.RQ_WORKER_POOLS[pool_name]
+        if pool.get('command'):
+            return [sys.executable, 'manage.py', pool['command']]
+        command = [sys.executable, 'manage.py', 'rqworker', *pool['queues']]
+        if pool.get('with_scheduler'):
+            command.append('--with-scheduler')
+        return command
+
+    def _supervise(self):
+        """Start workers and restart crashed ones (exponential backoff) until stopped."""
+        while not self.stopping:
+            now = time.monotonic()
+            for slot in self.slots:
+                process = slot['process']
+                if process and process.poll() is None:
+                    continue
+                if process:
+                    slot['failures'] = slot['failures'] + 1 if process.returncode else 0
+                    delay = min(RESTART_BACKOFF_MAX, 2 ** slot['failures']) if slot['failures'] else 0
+                    slot['restart_at'] = now + delay
+                    slot['process'] = None
+                    self.stdout.write(self.style.WARNING(
+                        f'Worker im Pool {slot["pool"]} beendet (Code {process.returncode}), Neustart in {delay}s'
+                    ))
+                if now >= slot['restart_at']:
+                    slot['process'] = subprocess.Popen(self._worker_command(slot['pool']))
+            time.sleep(POLL_INTERVAL)
+
+    def _shutdown(self):
+        """Send SIGTERM to all workers (warm shutdown) and wait for them to exit."""
+        running = [slot['process'] for slot in self.slots if slot['process'] and slot['process'].poll() is None]
+        for process in running:
+            process.terminate()
+        deadline = time.monotonic() + SHUTDOWN_TIMEOUT
+        for process in running:
+            try:
+                process.wait(timeout=max(0, deadline - time.monotonic()))
+            except subprocess.TimeoutExpired:
+                process.kill()
+        self.stdout.write(self.style.SUCCESS('Alle Worker beendet.'))
@@ -1,58 +1,87 @@
 """
-Prüft für ein Video, welcher Pfad in der DB steht und ob die Datei auf der Festplatte existiert.
+Prüft die Medien aller (oder einzelner) Videos parallel: Original, jede HLS-Playlist,
+jedes in index.m3u8 referenzierte Segment (existiert, plausible Größe) und das Thumbnail.
+Die Ergebnisse landen in der Tabelle MediaIntegrityCheck; defekte Titel werden mit
+needs_reprocessing markiert (reprocess_video --broken) oder mit --reprocess direkt eingereiht.
+Das Rendition-Inventar (VideoRendition) wird mit den intakten Renditions abgeglichen,
+Video.thumbnail_ready mit dem tatsächlich vorhandenen Thumbnail.
 """
-import os
-from django.core.management.base import BaseCommand
+from concurrent.futures import ThreadPoolExecutor
+
 from django.conf import settings
-from videos.models import Video
-from videos.utils import get_original_video_path
+from django.core.management.base import BaseCommand
+
+from api.videos.cache import bump_catalogue_version
+from videos.integrity import check_video_media
+from videos.models import MediaIntegrityCheck, Video
+from videos.tasks import enqueue_video_processing
+from videos.utils import sync_rendition_inventory
+
+RESULT_FIELDS = ['original_ok', 'thumbnail_ok', 'renditions', 'problems', 'needs_reprocessing', 'scan_ms']
 
 
 class Command(BaseCommand):
-    help = 'Prüft Video-Dateipfad (DB vs. Festplatte)'
+    help = 'Medien-Integrität prüfen (Original, Renditions, Segmente, Thumbnail) und Ergebnisse speichern'
 
     def add_arguments(self, parser):
         parser.add_argument('video_id', type=int, nargs='?', default=None,
                             help='Video-ID (ohne Angabe: alle Videos)')
+        parser.add_argument('--workers', type=int, default=16, help='Parallele Threads (Standard: 16)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Ergebnisse pro Datenbank-Batch')
+        parser.add_argument('--reprocess', action='store_true', help='Defekte Videos zur Verarbeitung einreihen')
 
     def handle(self, *args, **options):
-        video_id = options.get('video_id')
-        media_root = settings.MEDIA_ROOT
-        self.stdout.write(f'MEDIA_ROOT = {media_root}')
-        self.stdout.write('')
+        self.stdout.write(f'MEDIA_ROOT = {settings.MEDIA_ROOT}')
+        videos = Video.objects.only('id', 'title', 'status', 'original_video', 'thumbnail', 'thumbnail_ready').order_by('id')
+        if options['video_id']:
+            videos = videos.filter(id=options['video_id'])
 
-        if video_id:
-            try:
-                videos = [Video.objects.get(id=video_id)]
-            except Video.DoesNotExist:
-                self.stdout.write(self.style.ERROR(f'Video mit ID {video_id} existiert nicht.'))
-                return
+        checked, broken = 0, []
+        batch = []
+        thumbnail_flags = {True: [], False: []}
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for video, result in pool.map(lambda video: (video, check_video_media(video)), videos.iterator()):
+                checked += 1
+                sync_rendition_inventory(video, result.pop('healthy_renditions'))
+                if video.thumbnail_ready != result['thumbnail_ok']:
+                    thumbnail_flags[result['thumbnail_ok']].append(video.id)
+                batch.append(MediaIntegrityCheck(video=video, **result))
+                if result['needs_reprocessing']:
+                    broken.append(video)
+                    self._print_problems(video, result['problems'])
+                if len(batch) >= options['batch_size']:
+                    self._save(batch)
+                    batch = []
+        self._save(batch)
+        for ready, video_ids in thumbnail_flags.items():
+            if video_ids:
+                Video.objects.filter(id__in=video_ids).update(thumbnail_ready=ready)
+        if any(thumbnail_flags.values()):
+            bump_catalogue_version()  # bulk update sends no signals
+
+        if options['reprocess']:
+            for video in broken:
+                enqueue_video_processing(video.id)
+        self._print_summary(checked, broken, options['reprocess'])
+
+    def _save(self, batch):
+        """Upsert a batch of results (one row per video)."""
+        if batch:
+            MediaIntegrityCheck.objects.bulk_create(
+                batch, update_conflicts=True, unique_fields=['video'], update_fields=RESULT_FIELDS + ['checked_at']
+            )
+
+    def _print_problems(self, video, problems):
+        self.stdout.write(self.style.ERROR(f'Video {video.id} ({video.title}):'))
+        for problem in problems:
+            self.stdout.write(f'  - {problem}')
+
+    def _print_summary(self, checked, broken, reprocess):
+        self.stdout.write('')
+        self.stdout.write(f'{checked} Videos geprüft, {len(broken)} defekt.')
+        if broken and reprocess:
+            self.stdout.write(self.style.WARNING(f'{len(broken)} Videos zur Verarbeitung eingereiht.'))
+        elif broken:
+            self.stdout.write(self.style.WARNING('Neu verarbeiten mit: python manage.py reprocess_video --broken'))
         else:
-            videos = Video.objects.all().order_by('id')
-
-        for video in videos:
-            self.stdout.write(f'--- Video ID {video.id}: {video.title} ---')
-            self.stdout.write(f'  Status: {video.status}')
-            if not video.original_video:
-                self.stdout.write(self.style.WARNING('  original_video: nicht gesetzt'))
-                self.stdout.write('')
-                continue
-            name = video.original_video.name
-            self.stdout.write(f'  original_video.name (DB): {name}')
-            try:
-                stored_path = video.original_video.path
-                self.stdout.write(f'  .path: {stored_path}')
-                self.stdout.write(f'  .path existiert: {os.path.isfile(stored_path)}')
-            except Exception as e:
-                self.stdout.write(f'  .path: (Fehler: {e})')
-            full_from_name = os.path.join(media_root, name) if name else ''
-            if full_from_name:
-                self.stdout.write(f'  MEDIA_ROOT + name: {full_from_name}')
-                self.stdout.write(f'  existiert: {os.path.isfile(full_from_name)}')
-            resolved = get_original_video_path(video)
-            self.stdout.write(f'  get_original_video_path(): {resolved or "(None)"}')
-            if resolved:
-                self.stdout.write(self.style.SUCCESS('  -> Datei wird gefunden.'))
-            else:
-                self.stdout.write(self.style.ERROR('  -> Datei wird NICHT gefunden (404 beim Abspielen).'))
-            self.stdout.write('')
+            self.stdout.write(self.style.SUCCESS('Alle Medien in Ordnung.'))
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='complexity_factor',
+            field=models.FloatField(default=1.0, help_text='Skaliert die Bitraten aller Renditions (aus der Komplexitätsanalyse)', verbose_name='Komplexitätsfaktor'),
+        ),
+    ]
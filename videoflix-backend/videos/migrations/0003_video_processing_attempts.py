@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0002_video_complexity_factor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='processing_attempts',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Abgebrochene Verarbeitungsläufe seit der letzten erfolgreichen Verarbeitung', verbose_name='Verarbeitungsversuche'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0003_video_processing_attempts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaIntegrityCheck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checked_at', models.DateTimeField(auto_now=True, verbose_name='Geprüft am')),
+                ('original_ok', models.BooleanField(default=False, verbose_name='Original vorhanden')),
+                ('thumbnail_ok', models.BooleanField(default=False, verbose_name='Thumbnail vorhanden')),
+                ('renditions', models.JSONField(default=dict, help_text='Gefundene HLS-Renditions mit Anzahl Segmenten', verbose_name='Renditions')),
+                ('problems', models.JSONField(default=list, verbose_name='Probleme')),
+                ('needs_reprocessing', models.BooleanField(db_index=True, default=False, verbose_name='Neu verarbeiten')),
+                ('scan_ms', models.IntegerField(default=0, verbose_name='Prüfdauer (ms)')),
+                ('video', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='integrity_check', to='videos.video', verbose_name='Video')),
+            ],
+            options={
+                'verbose_name': 'Integritätsprüfung',
+                'verbose_name_plural': 'Integritätsprüfungen',
+                'ordering': ['-checked_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:51
+
+import os
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def record_existing_renditions(apps, schema_editor):
+    """
+    Record the finalized HLS renditions already on disk (hls_<resolution>/ next to the
+    original) as ready, so existing titles keep their renditions. The removed MP4 quality
+    fields were never used for streaming and are not carried over.
+    """
+    from videos.utils import build_m3u8_path, get_original_video_path, measure_hls_rendition, parse_media_playlist
+
+    Video = apps.get_model('videos', 'Video')
+    VideoRendition = apps.get_model('videos', 'VideoRendition')
+    renditions = []
+    for video in Video.objects.exclude(original_video='').exclude(original_video=None).iterator():
+        original_path = get_original_video_path(video)
+        if not original_path:
+            continue
+        for resolution, quality in settings.VIDEO_RESOLUTIONS.items():
+            m3u8_path = build_m3u8_path(original_path, resolution)
+            if not os.path.isfile(m3u8_path):
+                continue
+            try:
+                _entries, finalized = parse_media_playlist(m3u8_path)
+                if not finalized:
+                    continue
+                measured = measure_hls_rendition(os.path.dirname(m3u8_path))
+            except (OSError, ValueError):
+                continue  # partial or damaged rendition: re-encoded lazily or by video_path_check
+            renditions.append(VideoRendition(
+                video=video,
+                resolution=resolution,
+                width=quality['width'],
+                height=quality['height'],
+                is_ready=True,
+                **measured
+            ))
+    VideoRendition.objects.bulk_create(renditions, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0004_mediaintegritycheck'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='video',
+            name='video_1080p',
+        ),
+        migrations.RemoveField(
+            model_name='video',
+            name='video_360p',
+        ),
+        migrations.RemoveField(
+            model_name='video',
+            name='video_480p',
+        ),
+        migrations.RemoveField(
+            model_name='video',
+            name='video_720p',
+        ),
+        migrations.CreateModel(
+            name='VideoRendition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resolution', models.CharField(max_length=10, verbose_name='Auflösung')),
+                ('codec', models.CharField(default='h264', max_length=50, verbose_name='Codec')),
+                ('width', models.PositiveIntegerField(default=0, verbose_name='Breite')),
+                ('height', models.PositiveIntegerField(default=0, verbose_name='Höhe')),
+                ('bandwidth', models.PositiveIntegerField(default=0, help_text='Gemessene Spitzen-Bitrate über die Segmente (HLS BANDWIDTH)', verbose_name='Bandbreite (bit/s)')),
+                ('average_bandwidth', models.PositiveIntegerField(default=0, verbose_name='Durchschnittliche Bandbreite (bit/s)')),
+                ('segment_count', models.PositiveIntegerField(default=0, verbose_name='Anzahl Segmente')),
+                ('bytes', models.BigIntegerField(default=0, verbose_name='Größe (Bytes)')),
+                ('is_ready', models.BooleanField(default=False, verbose_name='Bereit')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Erstellt am')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Aktualisiert am')),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='videos.video', verbose_name='Video')),
+            ],
+            options={
+                'verbose_name': 'Rendition',
+                'verbose_name_plural': 'Renditions',
+                'ordering': ['video', 'height'],
+                'constraints': [models.UniqueConstraint(fields=('video', 'resolution'), name='unique_video_rendition')],
+            },
+        ),
+        migrations.RunPython(record_existing_renditions, migrations.RunPython.noop),
+    ]
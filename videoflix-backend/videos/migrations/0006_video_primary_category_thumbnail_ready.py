@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-19 07:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """Primary category = first category by name; thumbnail_ready = thumbnail set (video_path_check checks the disk)."""
+    Video = apps.get_model('videos', 'Video')
+    Video.objects.exclude(thumbnail='').exclude(thumbnail__isnull=True).update(thumbnail_ready=True)
+    for video in Video.objects.only('id').iterator():
+        first = video.categories.order_by('name').first()
+        if first:
+            Video.objects.filter(pk=video.pk).update(primary_category=first)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0005_videorendition_remove_quality_files'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='primary_category',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Erste Kategorie (nach Name), von Signalen gepflegt – für die Video-Liste', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='videos.category', verbose_name='Hauptkategorie'),
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='thumbnail_ready',
+            field=models.BooleanField(default=False, editable=False, help_text='Beim Speichern gesetzt und von video_path_check mit der Platte abgeglichen', verbose_name='Thumbnail vorhanden'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
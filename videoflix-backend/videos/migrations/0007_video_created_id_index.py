@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-19 08:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0006_video_primary_category_thumbnail_ready'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='video',
+            name='videos_vide_created_1f1e45_idx',
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['-created_at', '-id'], name='videos_vide_created_6df2ef_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 6.0.2 on 2026-10-19 08:06
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill(apps, schema_editor):
+    """Count the published videos of every category once."""
+    Category = apps.get_model('videos', 'Category')
+    Video = apps.get_model('videos', 'Video')
+    published = (
+        Video.categories.through.objects
+        .filter(category_id=OuterRef('pk'), video__status='published')
+        .values('category_id')
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+    Category.objects.update(published_video_count=Coalesce(Subquery(published), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0007_video_created_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='published_video_count',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Von Signalen gepflegt; reparieren mit manage.py recount_categories', verbose_name='Veröffentlichte Videos'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 6.0.2 on 2026-10-19 08:09
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    """Build the search vector of all existing videos in one UPDATE."""
+    Video = apps.get_model('videos', 'Video')
+    config = settings.VIDEO_SEARCH_CONFIG
+    Video.objects.update(search_vector=(
+        SearchVector('title', weight='A', config=config)
+        + SearchVector('director', 'cast', weight='B', config=config)
+        + SearchVector('description', weight='C', config=config)
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0008_category_published_video_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='video',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Gewichteter Volltextindex (Titel, Regie/Besetzung, Beschreibung), beim Speichern aktualisiert', null=True, verbose_name='Suchindex'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='video_search_vector_gin'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='video_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['director'], name='video_director_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 6.0.2 on 2026-10-19 08:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0009_video_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Person',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Name')),
+                ('slug', models.SlugField(allow_unicode=True, max_length=220, unique=True, verbose_name='Slug')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Erstellt am')),
+            ],
+            options={
+                'verbose_name': 'Person',
+                'verbose_name_plural': 'Personen',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='VideoCredit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('director', 'Regie'), ('cast', 'Besetzung')], max_length=10, verbose_name='Rolle')),
+                ('position', models.PositiveSmallIntegerField(default=0, help_text='Reihenfolge innerhalb der Rolle (wie im Textfeld)', verbose_name='Position')),
+                ('person', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credits', to='videos.person', verbose_name='Person')),
+                ('video', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='credits', to='videos.video', verbose_name='Video')),
+            ],
+            options={
+                'verbose_name': 'Mitwirkung',
+                'verbose_name_plural': 'Mitwirkungen',
+                'ordering': ['role', 'position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='video',
+            name='people',
+            field=models.ManyToManyField(blank=True, related_name='videos', through='videos.VideoCredit', to='videos.person', verbose_name='Personen'),
+        ),
+        migrations.AddIndex(
+            model_name='videocredit',
+            index=models.Index(fields=['person', 'role', 'video'], name='videos_vide_person__f97e7d_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='videocredit',
+            unique_together={('video', 'person', 'role')},
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-19 08:17
+
+import math
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_scores(apps, schema_editor):
+    """Start from the all-time view counts, as if those views happened at upload time."""
+    Video = apps.get_model('videos', 'Video')
+    rate = math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+    videos = []
+    for video in Video.objects.filter(view_count__gt=0).only('id', 'view_count', 'created_at').iterator():
+        video.trending_score = math.log(video.view_count) + rate * video.created_at.timestamp()
+        videos.append(video)
+    Video.objects.bulk_update(videos, ['trending_score'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('videos', '0010_person_videocredit'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='video',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False, help_text='Zeitlich abklingende Aufrufe (log-skaliert), periodisch aus den Aufruf-Ereignissen berechnet', verbose_name='Trending-Score'),
+        ),
+        migrations.AddIndex(
+            model_name='video',
+            index=models.Index(fields=['-trending_score', '-id'], name='videos_vide_trendin_3429a8_idx'),
+        ),
+        migrations.RunPython(seed_scores, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,8 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import FileExtensionValidator, MinValueValidator, MaxValueValidator
@@ -25,7 +29,48 @@ def thumbnail_upload_path(instance, filename):
     return f'thumbnails/{vid}/{filename}'
 
 
-def _remove_media_dirs(dirs_to_remove):
+MEDIA_FILE_FIELDS = ('original_video', 'thumbnail')
+MEDIA_SUBDIRS = ('videos', 'thumbnails')
+
+# Fields feeding Video.search_vector (see video_search_vector)
+SEARCH_VECTOR_FIELDS = ('title', 'description', 'director', 'cast')
+
+
+def video_search_vector():
+    """Weighted tsvector expression of a video: title (A), director and cast (B), description (C)."""
+    config = settings.VIDEO_SEARCH_CONFIG
+    return (
+        SearchVector('title', weight='A', config=config)
+        + SearchVector('director', 'cast', weight='B', config=config)
+        + SearchVector('description', weight='C', config=config)
+    )
+
+
+def person_slug(name):
+    """Slug identifying a person by name (case and punctuation insensitive)."""
+    return slugify(name, allow_unicode=True)[:220]
+
+
+def parse_credits(director, cast):
+    """
+    Return [(slug, name, role, position)] for the comma-separated names in `director` and
+    `cast`, in list order. Names repeated within a role are kept once.
+    """
+    credits, seen = [], set()
+    for role, text in (('director', director), ('cast', cast)):
+        position = 0
+        for name in (text or '').split(','):
+            name = name.strip()[:200].rstrip()  # Person.name length; the slug is made from the stored name
+            slug = person_slug(name)
+            if not slug or (slug, role) in seen:
+                continue
+            seen.add((slug, role))
+            credits.append((slug, name, role, position))
+            position += 1
+    return credits
+
+
+def remove_media_dirs(dirs_to_remove):
     """Remove given dir paths from disk. Ignores OSError."""
     for dir_path in dirs_to_remove:
         if os.path.isdir(dir_path):
@@ -35,6 +80,25 @@ def _remove_media_dirs(dirs_to_remove):
                 pass
 
 
+def media_dir_for_name(name):
+    """Return the absolute media dir of a stored file name, or None if outside MEDIA_ROOT."""
+    rel_dir = os.path.dirname(name or '')
+    if not rel_dir:
+        return None
+    media_root = os.path.abspath(settings.MEDIA_ROOT)
+    full_dir = os.path.abspath(os.path.join(media_root, rel_dir))
+    return full_dir if full_dir.startswith(media_root + os.sep) else None
+
+
+def media_id_dirs(video_id):
+    """
+    Return the absolute media dirs named after a video id (videos/<id>, thumbnails/<id>).
+    They belong to the video even if a stored name still points at videos/None/ or
+    temp_xxx/, because the files are looked up there as a fallback (see get_original_video_path).
+    """
+    return [media_dir_for_name(f'{subdir}/{video_id}/') for subdir in MEDIA_SUBDIRS]
+
+
 class Category(models.Model):
     """
     Categories for videos (e.g. Action, Drama, Comedy).
@@ -42,6 +106,12 @@ class Category(models.Model):
     name = models.CharField(_('Name'), max_length=100, unique=True)
     slug = models.SlugField(_('Slug'), max_length=100, unique=True, blank=True)
     description = models.TextField(_('Beschreibung'), blank=True)
+    published_video_count = models.PositiveIntegerField(
+        _('Veröffentlichte Videos'),
+        default=0,
+        editable=False,
+        help_text='Von Signalen gepflegt; reparieren mit manage.py recount_categories'
+    )
     created_at = models.DateTimeField(_('Erstellt am'), auto_now_add=True)
 
     class Meta:
@@ -57,6 +127,58 @@ class Category(models.Model):
             self.slug = slugify(self.name)
         super().save(*args, **kwargs)
 
+    @classmethod
+    def refresh_published_video_counts(cls, category_ids=None):
+        """
+        Recompute published_video_count of the given categories (all if None) in one
+        UPDATE with a correlated COUNT subquery. Returns the number of updated rows.
+        """
+        published = (
+            Video.categories.through.objects
+            .filter(category_id=OuterRef('pk'), video__status='published')
+            .values('category_id')
+            .annotate(total=Count('pk'))
+            .values('total')
+        )
+        categories = cls.objects.all() if category_ids is None else cls.objects.filter(id__in=category_ids)
+        return categories.update(published_video_count=Coalesce(Subquery(published), 0))
+
+
+class Person(models.Model):
+    """
+    Person aus Regie und Besetzung (normalisiert aus Video.director / Video.cast)
+    """
+    name = models.CharField(_('Name'), max_length=200)
+    slug = models.SlugField(_('Slug'), max_length=220, unique=True, allow_unicode=True)
+    created_at = models.DateTimeField(_('Erstellt am'), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Person')
+        verbose_name_plural = _('Personen')
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = person_slug(self.name)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def ids_for_names(cls, names):
+        """Return {slug: id} for `names`, creating missing people in bulk (safe against races)."""
+        wanted = {}
+        for name in names:
+            wanted.setdefault(person_slug(name), name)
+        wanted.pop('', None)
+        ids = dict(cls.objects.filter(slug__in=wanted).values_list('slug', 'id'))
+        missing = [cls(name=name, slug=slug) for slug, name in wanted.items() if slug not in ids]
+        if missing:
+            cls.objects.bulk_create(missing, ignore_conflicts=True)
+            ids.update(cls.objects.filter(slug__in=[person.slug for person in missing]).values_list('slug', 'id'))
+        return ids
+
 
 class Video(models.Model):
     """
@@ -76,6 +198,11 @@ class Video(models.Model):
         ('archived', 'Archiviert'),
     ]
 
+    # Nur per eigenem UPDATE geschrieben (Trending-Rollup, update_search_vector): das UPDATE eines
+    # vollen save() lässt sie aus, damit eine vor Minuten geladene Instanz sie nicht mit alten
+    # Werten überschreibt (siehe _do_update). INSERTs schreiben sie wie gewohnt.
+    DATABASE_MANAGED_FIELDS = ('trending_score', 'search_vector')
+
     title = models.CharField(_('Titel'), max_length=200)
     slug = models.SlugField(_('Slug'), max_length=200, unique=True, blank=True)
     description = models.TextField(_('Beschreibung'))
@@ -84,6 +211,16 @@ class Video(models.Model):
         related_name='videos',
         verbose_name=_('Kategorien')
     )
+    primary_category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        editable=False,
+        verbose_name=_('Hauptkategorie'),
+        help_text='Erste Kategorie (nach Name), von Signalen gepflegt – für die Video-Liste'
+    )
     
     original_video = models.FileField(
         _('Original Video'),
@@ -92,31 +229,6 @@ class Video(models.Model):
         help_text='Original hochgeladene Video-Datei'
     )
     
-    video_360p = models.FileField(
-        _('360p Version'),
-        upload_to=video_upload_path,
-        blank=True,
-        null=True
-    )
-    video_480p = models.FileField(
-        _('480p Version'),
-        upload_to=video_upload_path,
-        blank=True,
-        null=True
-    )
-    video_720p = models.FileField(
-        _('720p Version'),
-        upload_to=video_upload_path,
-        blank=True,
-        null=True
-    )
-    video_1080p = models.FileField(
-        _('1080p Version'),
-        upload_to=video_upload_path,
-        blank=True,
-        null=True
-    )
-    
     # Thumbnail/Cover
     thumbnail = models.ImageField(
         _('Thumbnail'),
@@ -124,6 +236,12 @@ class Video(models.Model):
         blank=True,
         null=True
     )
+    thumbnail_ready = models.BooleanField(
+        _('Thumbnail vorhanden'),
+        default=False,
+        editable=False,
+        help_text='Beim Speichern gesetzt und von video_path_check mit der Platte abgeglichen'
+    )
     
     duration = models.IntegerField(
         _('Dauer (Sekunden)'),
@@ -140,6 +258,11 @@ class Video(models.Model):
         _('Dateigröße (Bytes)'),
         default=0
     )
+    complexity_factor = models.FloatField(
+        _('Komplexitätsfaktor'),
+        default=1.0,
+        help_text='Skaliert die Bitraten aller Renditions (aus der Komplexitätsanalyse)'
+    )
     
     status = models.CharField(
         _('Status'),
@@ -147,6 +270,11 @@ class Video(models.Model):
         choices=STATUS_CHOICES,
         default='draft'
     )
+    processing_attempts = models.PositiveSmallIntegerField(
+        _('Verarbeitungsversuche'),
+        default=0,
+        help_text='Abgebrochene Verarbeitungsläufe seit der letzten erfolgreichen Verarbeitung'
+    )
     is_featured = models.BooleanField(
         _('Hervorgehoben'),
         default=False,
@@ -159,6 +287,12 @@ class Video(models.Model):
     )
     
     view_count = models.IntegerField(_('Anzahl Aufrufe'), default=0)
+    trending_score = models.FloatField(
+        _('Trending-Score'),
+        default=0,
+        editable=False,
+        help_text='Zeitlich abklingende Aufrufe (log-skaliert), periodisch aus den Aufruf-Ereignissen berechnet'
+    )
     rating = models.DecimalField(
         _('Bewertung'),
         max_digits=3,
@@ -169,6 +303,13 @@ class Video(models.Model):
     
     director = models.CharField(_('Regisseur'), max_length=200, blank=True)
     cast = models.TextField(_('Besetzung'), blank=True, help_text='Komma-getrennte Liste')
+    people = models.ManyToManyField(
+        Person,
+        through='VideoCredit',
+        related_name='videos',
+        blank=True,
+        verbose_name=_('Personen')
+    )
     release_year = models.IntegerField(_('Erscheinungsjahr'), blank=True, null=True)
     language = models.CharField(_('Sprache'), max_length=50, default='Deutsch')
     age_rating = models.CharField(
@@ -184,6 +325,13 @@ class Video(models.Model):
         default='0'
     )
     
+    search_vector = SearchVectorField(
+        _('Suchindex'),
+        null=True,
+        editable=False,
+        help_text='Gewichteter Volltextindex (Titel, Regie/Besetzung, Beschreibung), beim Speichern aktualisiert'
+    )
+    
     created_at = models.DateTimeField(_('Erstellt am'), auto_now_add=True)
     updated_at = models.DateTimeField(_('Aktualisiert am'), auto_now=True)
     
@@ -200,14 +348,66 @@ class Video(models.Model):
         verbose_name_plural = _('Videos')
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['-created_at']),
+            models.Index(fields=['-created_at', '-id']),  # Keyset-Paginierung (created_at, id)
             models.Index(fields=['status']),
             models.Index(fields=['is_featured']),
+            models.Index(fields=['-trending_score', '-id']),  # /trending/ liest nur die obersten k
+            GinIndex(fields=['search_vector'], name='video_search_vector_gin'),
+            GinIndex(fields=['title'], name='video_title_trgm', opclasses=['gin_trgm_ops']),
+            GinIndex(fields=['director'], name='video_director_trgm', opclasses=['gin_trgm_ops']),
         ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the loaded values, so saves can tell which fields actually changed."""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def changed_fields(self, field_names):
+        """
+        Names in `field_names` whose value differs from the one loaded from the database
+        (or last saved). For a video not loaded from the database, all of them. Deferred
+        fields are not loaded, not saved and never changed.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return set(field_names)
+        deferred = self.get_deferred_fields()
+        changed = set()
+        for name in field_names:
+            field = self._meta.get_field(name)
+            if field.attname in deferred:
+                continue
+            if field.attname not in loaded:
+                changed.add(name)
+            elif field.get_prep_value(loaded[field.attname]) != field.get_prep_value(getattr(self, field.attname)):
+                changed.add(name)
+        return changed
+
+    def loaded_value(self, field_name, default=None):
+        """Value of a field as loaded from the database (or last saved), else `default`."""
+        field = self._meta.get_field(field_name)
+        return getattr(self, '_loaded_values', {}).get(field.attname, default)
+
+    def _remember_values(self, field_names=None):
+        """Store the current values of the given fields (all loaded ones if None) as the database state."""
+        deferred = self.get_deferred_fields()
+        values = {
+            field.attname: field.get_prep_value(getattr(self, field.attname))
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+            and (field_names is None or field.name in field_names or field.attname in field_names)
+        }
+        self._loaded_values = {**getattr(self, '_loaded_values', {}), **values}
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._remember_values(fields)
+
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
@@ -215,27 +415,84 @@ class Video(models.Model):
         if self.original_video and not self.file_size:
             self.file_size = self.original_video.size
         
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'thumbnail' in update_fields:
+            self.thumbnail_ready = bool(self.thumbnail)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'thumbnail_ready'}
+        deferred = self.get_deferred_fields()
+        if update_fields is None and deferred and not self._state.adding and not kwargs.get('force_insert'):
+            # Django saves only the loaded fields of a deferred instance; DATABASE_MANAGED_FIELDS stay out too
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in deferred
+                and field.name not in self.DATABASE_MANAGED_FIELDS
+            ]
+        
+        # Search vector and credits are only rewritten when their text fields changed, so the
+        # frequent processing saves (status, duration, thumbnail) cost no extra queries.
+        text_fields = SEARCH_VECTOR_FIELDS if update_fields is None else set(SEARCH_VECTOR_FIELDS) & set(update_fields)
+        changed_text = self.changed_fields(text_fields)
+        
         super().save(*args, **kwargs)
+        self._remember_values(kwargs.get('update_fields'))
+        
+        if changed_text:
+            self.update_search_vector()
+        if changed_text & {'director', 'cast'}:
+            self.sync_credits()
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, *args, **kwargs):
+        """UPDATE of save(): without explicit update_fields, DATABASE_MANAGED_FIELDS are left out."""
+        if update_fields is None:
+            values = [value for value in values if value[0].name not in self.DATABASE_MANAGED_FIELDS]
+        return super()._do_update(base_qs, using, pk_val, values, update_fields, *args, **kwargs)
 
-    def delete(self, *args, **kwargs):
-        """On delete, remove associated media dirs (videos, thumbnails)."""
-        dirs_to_remove = self._collect_media_dirs_to_remove()
-        super().delete(*args, **kwargs)
-        _remove_media_dirs(dirs_to_remove)
-
-    def _collect_media_dirs_to_remove(self):
-        """Return list of unique media dir paths for this video's file fields."""
-        dirs_to_remove = []
-        media_root = os.path.abspath(settings.MEDIA_ROOT)
-        for field in (self.original_video, self.thumbnail, self.video_360p, self.video_480p,
-                      self.video_720p, self.video_1080p):
-            if field and field.name:
-                rel_dir = os.path.dirname(field.name)
-                if rel_dir:
-                    full_dir = os.path.abspath(os.path.join(media_root, rel_dir))
-                    if full_dir.startswith(media_root) and full_dir not in dirs_to_remove:
-                        dirs_to_remove.append(full_dir)
-        return dirs_to_remove
+    def update_search_vector(self):
+        """Recompute search_vector in the database (one UPDATE, without save signals)."""
+        Video.objects.filter(pk=self.pk).update(search_vector=video_search_vector())
+
+    def sync_credits(self):
+        """Make the video's credits match the names in director and cast (only changed rows are written)."""
+        parsed = parse_credits(self.director, self.cast)
+        person_ids = Person.ids_for_names(name for _slug, name, _role, _position in parsed)
+        wanted = {(person_ids[slug], role): position for slug, _name, role, position in parsed}
+        existing = {(credit.person_id, credit.role): credit for credit in self.credits.all()}
+        stale = [credit.pk for key, credit in existing.items() if key not in wanted]
+        if stale:
+            VideoCredit.objects.filter(pk__in=stale).delete()
+        moved = []
+        for key, position in wanted.items():
+            credit = existing.get(key)
+            if credit is not None and credit.position != position:
+                credit.position = position
+                moved.append(credit)
+        if moved:
+            VideoCredit.objects.bulk_update(moved, ['position'])
+        VideoCredit.objects.bulk_create([
+            VideoCredit(video=self, person_id=person_id, role=role, position=position)
+            for (person_id, role), position in wanted.items() if (person_id, role) not in existing
+        ])
+
+    def update_primary_category(self):
+        """Set primary_category to the first category by name (without save signals)."""
+        self.primary_category = self.categories.order_by('name').first()
+        Video.objects.filter(pk=self.pk).update(primary_category=self.primary_category)
+
+    def get_media_dirs(self):
+        """
+        Return list of unique media dir paths for this video's file fields and its id dirs.
+        They are removed in the background after a delete (see core.signals).
+        """
+        dirs = []
+        for field_name in MEDIA_FILE_FIELDS:
+            field = getattr(self, field_name)
+            full_dir = media_dir_for_name(field.name) if field else None
+            if full_dir and full_dir not in dirs:
+                dirs.append(full_dir)
+        if self.pk:
+            dirs += [full_dir for full_dir in media_id_dirs(self.pk) if full_dir not in dirs]
+        return dirs
 
     @property
     def formatted_duration(self):
@@ -264,6 +521,108 @@ class Video(models.Model):
         self.save(update_fields=['view_count'])
 
 
+class VideoCredit(models.Model):
+    """
+    Mitwirkung einer Person an einem Video (Regie oder Besetzung), aus den Textfeldern
+    des Videos gepflegt (Video.sync_credits, manage.py backfill_people)
+    """
+    ROLE_CHOICES = [
+        ('director', 'Regie'),
+        ('cast', 'Besetzung'),
+    ]
+
+    video = models.ForeignKey(Video, on_delete=models.CASCADE, related_name='credits', verbose_name=_('Video'))
+    person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name='credits', verbose_name=_('Person'))
+    role = models.CharField(_('Rolle'), max_length=10, choices=ROLE_CHOICES)
+    position = models.PositiveSmallIntegerField(
+        _('Position'),
+        default=0,
+        help_text='Reihenfolge innerhalb der Rolle (wie im Textfeld)'
+    )
+
+    class Meta:
+        verbose_name = _('Mitwirkung')
+        verbose_name_plural = _('Mitwirkungen')
+        ordering = ['role', 'position']
+        unique_together = ['video', 'person', 'role']
+        indexes = [
+            models.Index(fields=['person', 'role', 'video']),  # Filter/Facetten nach Person
+        ]
+
+    def __str__(self):
+        return f'{self.person} – {self.get_role_display()} ({self.video})'
+
+
+class VideoRendition(models.Model):
+    """
+    HLS rendition of a video (hls_<resolution>/ next to the original), written by the
+    processing pipeline. Availability is answered from this table instead of the filesystem.
+    """
+    video = models.ForeignKey(
+        Video,
+        on_delete=models.CASCADE,
+        related_name='renditions',
+        verbose_name=_('Video')
+    )
+    resolution = models.CharField(_('Auflösung'), max_length=10)
+    codec = models.CharField(_('Codec'), max_length=50, default='h264')
+    width = models.PositiveIntegerField(_('Breite'), default=0)
+    height = models.PositiveIntegerField(_('Höhe'), default=0)
+    bandwidth = models.PositiveIntegerField(
+        _('Bandbreite (bit/s)'),
+        default=0,
+        help_text='Gemessene Spitzen-Bitrate über die Segmente (HLS BANDWIDTH)'
+    )
+    average_bandwidth = models.PositiveIntegerField(_('Durchschnittliche Bandbreite (bit/s)'), default=0)
+    segment_count = models.PositiveIntegerField(_('Anzahl Segmente'), default=0)
+    bytes = models.BigIntegerField(_('Größe (Bytes)'), default=0)
+    is_ready = models.BooleanField(_('Bereit'), default=False)
+    created_at = models.DateTimeField(_('Erstellt am'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('Aktualisiert am'), auto_now=True)
+
+    class Meta:
+        verbose_name = _('Rendition')
+        verbose_name_plural = _('Renditions')
+        ordering = ['video', 'height']
+        constraints = [
+            models.UniqueConstraint(fields=['video', 'resolution'], name='unique_video_rendition'),
+        ]
+
+    def __str__(self):
+        return f"{self.video.title} – {self.resolution}"
+
+
+class MediaIntegrityCheck(models.Model):
+    """
+    Result of the last media integrity scan of a video (manage.py video_path_check).
+    """
+    video = models.OneToOneField(
+        Video,
+        on_delete=models.CASCADE,
+        related_name='integrity_check',
+        verbose_name=_('Video')
+    )
+    checked_at = models.DateTimeField(_('Geprüft am'), auto_now=True)
+    original_ok = models.BooleanField(_('Original vorhanden'), default=False)
+    thumbnail_ok = models.BooleanField(_('Thumbnail vorhanden'), default=False)
+    renditions = models.JSONField(
+        _('Renditions'),
+        default=dict,
+        help_text='Gefundene HLS-Renditions mit Anzahl Segmenten'
+    )
+    problems = models.JSONField(_('Probleme'), default=list)
+    needs_reprocessing = models.BooleanField(_('Neu verarbeiten'), default=False, db_index=True)
+    scan_ms = models.IntegerField(_('Prüfdauer (ms)'), default=0)
+
+    class Meta:
+        verbose_name = _('Integritätsprüfung')
+        verbose_name_plural = _('Integritätsprüfungen')
+        ordering = ['-checked_at']
+
+    def __str__(self):
+        return f"{self.video.title} ({'defekt' if self.needs_reprocessing else 'ok'})"
+
+
 class VideoComment(models.Model):
     """
     Comments on videos.
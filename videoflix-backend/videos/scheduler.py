@@ -0,0 +1,103 @@
+"""
+CPU-budgeted encode scheduling.
+
+Every encode runs with explicit FFmpeg thread counts (decode, filters and encode,
+see ``videos.utils.thread_limit_args``) and first takes that many cores from a global budget (``VIDEO_ENCODE_CORE_BUDGET``), shared by all
+workers through a Redis semaphore. Holders are leases that expire if a worker
+dies, and are renewed while the encode runs. Encodes wait until enough cores
+are free, so adding workers never oversubscribes the machine.
+"""
+import logging
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+from .jobs import get_redis
+from .utils import run_ffmpeg_capture, run_ffmpeg_command
+
+logger = logging.getLogger(__name__)
+
+HOLDERS_KEY = 'videoflix:encode_budget:holders'  # zset: holder -> lease expiry
+UNITS_KEY = 'videoflix:encode_budget:units'  # hash: holder -> cores
+POLL_INTERVAL = 2
+
+# KEYS[1] = holders zset, KEYS[2] = units hash
+# ARGV[1] = holder, ARGV[2] = cores, ARGV[3] = budget, ARGV[4] = now, ARGV[5] = lease expiry
+_ACQUIRE_SCRIPT = """
+local expired = redis.call('zrangebyscore', KEYS[1], '-inf', ARGV[4])
+for _, holder in ipairs(expired) do
+    redis.call('zrem', KEYS[1], holder)
+    redis.call('hdel', KEYS[2], holder)
+end
+local used = 0
+for _, units in ipairs(redis.call('hvals', KEYS[2])) do
+    used = used + tonumber(units)
+end
+if used + tonumber(ARGV[2]) > tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('zadd', KEYS[1], ARGV[5], ARGV[1])
+redis.call('hset', KEYS[2], ARGV[1], ARGV[2])
+return 1
+"""
+
+
+class EncodeSlot:
+    """Context manager holding `cores` units of the global encode core budget."""
+
+    def __init__(self, cores, ttl=None, cancel=None):
+        self.cores = max(1, min(cores, settings.VIDEO_ENCODE_CORE_BUDGET))
+        self.ttl = ttl or settings.VIDEO_ENCODE_SLOT_TTL
+        self.cancel = cancel
+        self.holder = uuid.uuid4().hex
+        self.connection = get_redis()
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        script = self.connection.register_script(_ACQUIRE_SCRIPT)
+        waited = 0
+        while True:
+            now = time.time()
+            args = [self.holder, self.cores, settings.VIDEO_ENCODE_CORE_BUDGET, now, now + self.ttl]
+            if script(keys=[HOLDERS_KEY, UNITS_KEY], args=args):
+                break
+            if self.cancel is not None:
+                self.cancel.check()
+            if waited == 0:
+                logger.info(f'Encode waits for {self.cores} free cores of {settings.VIDEO_ENCODE_CORE_BUDGET}')
+            time.sleep(POLL_INTERVAL)
+            waited += POLL_INTERVAL
+        threading.Thread(target=self._renew_loop, daemon=True).start()
+        return self.cores
+
+    def _renew_loop(self):
+        """Extend the lease every ttl/3 seconds while the encode runs."""
+        while not self._stop.wait(self.ttl / 3):
+            self.connection.zadd(HOLDERS_KEY, {self.holder: time.time() + self.ttl}, xx=True)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        pipe = self.connection.pipeline()
+        pipe.zrem(HOLDERS_KEY, self.holder)
+        pipe.hdel(UNITS_KEY, self.holder)
+        pipe.execute()
+        return False
+
+
+def encode_threads(threads=None):
+    """Thread count for one encode, never more than the whole budget."""
+    threads = threads or settings.VIDEO_ENCODE_THREADS
+    return max(1, min(threads, settings.VIDEO_ENCODE_CORE_BUDGET))
+
+
+def run_budgeted(command, threads, capture=False, cancel=None):
+    """
+    Run an FFmpeg `command` (built with `threads` threads) at low CPU/IO priority once
+    the cores are available. Returns the result of run_ffmpeg_command / run_ffmpeg_capture.
+    Raises ProcessingCancelled if `cancel` fires while waiting or encoding.
+    """
+    run = run_ffmpeg_capture if capture else run_ffmpeg_command
+    with EncodeSlot(threads, cancel=cancel):
+        return run(command, low_priority=True, cancel=cancel)
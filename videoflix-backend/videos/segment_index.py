@@ -0,0 +1,110 @@
+"""
+Binary segment index of an HLS rendition for seek and clip requests.
+
+Each finished rendition gets a ``segments.idx`` file next to its ``index.m3u8``:
+a NumPy structured array (``.npy`` format) with one record per segment holding
+the start time, duration, byte offset, size and file name. It is written once
+at processing time and loaded memory-mapped, so a seek is a binary search over
+the start times instead of re-parsing the playlist text on every request.
+"""
+import os
+from functools import lru_cache
+
+import numpy as np
+
+SEGMENT_INDEX_FILENAME = 'segments.idx'
+SEGMENT_INDEX_DTYPE = np.dtype([
+    ('start', '<f8'),
+    ('duration', '<f4'),
+    ('offset', '<u8'),
+    ('size', '<u4'),
+    ('name', 'S32'),
+])
+
+
+def segment_index_path(hls_dir):
+    return os.path.join(hls_dir, SEGMENT_INDEX_FILENAME)
+
+
+def build_segment_index(hls_dir, entries):
+    """
+    Write the index for `entries` ([(segment name, duration), ...] in playlist order)
+    atomically into hls_dir. Raises OSError if a segment is missing, ValueError if a
+    name does not fit the index.
+    """
+    index = np.zeros(len(entries), dtype=SEGMENT_INDEX_DTYPE)
+    durations = np.array([duration for _name, duration in entries], dtype=np.float64)
+    sizes = np.array([os.path.getsize(os.path.join(hls_dir, name)) for name, _duration in entries],
+                     dtype=np.uint64)
+    index['duration'] = durations
+    index['size'] = sizes
+    if len(entries):
+        index['start'][1:] = np.cumsum(durations)[:-1]
+        index['offset'][1:] = np.cumsum(sizes)[:-1]
+    for position, (name, _duration) in enumerate(entries):
+        encoded = name.encode('utf-8')
+        if len(encoded) > SEGMENT_INDEX_DTYPE['name'].itemsize:
+            raise ValueError(f'Segment name too long for index: {name}')
+        index['name'][position] = encoded
+
+    path = segment_index_path(hls_dir)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, index, allow_pickle=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+@lru_cache(maxsize=256)
+def _load_mapped(path, mtime_ns):
+    return np.load(path, mmap_mode='r', allow_pickle=False)
+
+
+def load_segment_index(hls_dir):
+    """Return the memory-mapped index of a rendition, or None if it has none (cached per file version)."""
+    path = segment_index_path(hls_dir)
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    index = _load_mapped(path, mtime_ns)
+    return index if index.dtype == SEGMENT_INDEX_DTYPE else None
+
+
+def total_duration(index):
+    """Duration in seconds covered by the index."""
+    if not len(index):
+        return 0.0
+    return float(index['start'][-1] + index['duration'][-1])
+
+
+def find_segment(index, seconds):
+    """Position of the segment containing `seconds`, or None if it lies outside the rendition."""
+    if seconds < 0 or seconds >= total_duration(index):
+        return None
+    return int(np.searchsorted(index['start'], seconds, side='right')) - 1
+
+
+def find_segment_range(index, start, end):
+    """
+    Positions [first, last) of the segments covering [start, end), or None if the range
+    is empty or starts outside the rendition. `end` is clamped to the end of the rendition.
+    """
+    first = find_segment(index, start)
+    if first is None or end <= start:
+        return None
+    last = int(np.searchsorted(index['start'], end, side='left'))
+    return first, max(last, first + 1)
+
+
+def segment_record(index, position):
+    """Plain dict of one index record (JSON-serializable)."""
+    record = index[position]
+    return {
+        'index': position,
+        'segment': record['name'].decode('utf-8'),
+        'start': round(float(record['start']), 3),
+        'duration': round(float(record['duration']), 3),
+        'offset': int(record['offset']),
+        'size': int(record['size']),
+    }
@@ -0,0 +1,189 @@
+"""
+Typeahead prefix index for the search box (Redis).
+
+All suggestible terms live in one sorted set with score 0, so Redis keeps them
+in byte order and ZRANGEBYLEX returns every term starting with a prefix in
+O(log n + k). A term is the normalized text (lower case, accents removed)
+followed by its kind, display text and video id, e.g.
+``sturm\\x1ftitle\\x1fDer Sturm\\x1f42``. Titles and names are indexed from every
+word on ("der sturm", "sturm"; "anna berger", "berger"), so typing a later word
+matches too.
+
+Matches are ordered by popularity (view count, kept in a second sorted set),
+looked up for a bounded number of lexicographic candidates
+(VIDEO_SUGGEST_CANDIDATES). Each video remembers its terms in a small set, so
+signals can update the index incrementally when a video is saved or deleted;
+``manage.py rebuild_suggest_index`` rebuilds it from the database.
+"""
+import logging
+import unicodedata
+
+from django.conf import settings
+
+from .jobs import get_redis
+
+logger = logging.getLogger(__name__)
+
+TERMS_KEY = 'videoflix:suggest:terms'  # zset, score 0: term entries in byte order
+POPULARITY_KEY = 'videoflix:suggest:popularity'  # zset: video id -> view count
+SEPARATOR = '\x1f'
+MAX_TERM_WORDS = 6  # index suffixes starting at the first N words of a title or name
+REBUILD_BATCH_SIZE = 1000
+
+
+def _video_terms_key(video_id):
+    return f'videoflix:suggest:video:{video_id}'
+
+
+def normalize(text):
+    """Lower-case, accent-free, single-spaced form of `text` used for prefix matching."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return ' '.join(stripped.replace(SEPARATOR, ' ').split())
+
+
+def _word_suffixes(text):
+    words = normalize(text).split()
+    return [' '.join(words[start:]) for start in range(min(len(words), MAX_TERM_WORDS))]
+
+
+def _entry(term, kind, display, video_id):
+    return SEPARATOR.join((term, kind, display.replace(SEPARATOR, ' '), str(video_id))).encode()
+
+
+def video_entries(video):
+    """Set of index entries (bytes) for a video's title, director and cast names."""
+    entries = {_entry(term, 'title', video.title, video.pk) for term in _word_suffixes(video.title)}
+    names = [video.director, *video.cast.split(',')]
+    for name in filter(None, (name.strip() for name in names)):
+        entries.update(_entry(term, 'person', name, video.pk) for term in _word_suffixes(name))
+    return entries
+
+
+def _index_into(pipe, video, old_entries=()):
+    """Queue the commands replacing a video's index entries (old_entries) with its current ones."""
+    entries = video_entries(video)
+    key = _video_terms_key(video.pk)
+    stale = set(old_entries) - entries
+    if stale:
+        pipe.zrem(TERMS_KEY, *stale)
+    pipe.delete(key)
+    if entries:
+        pipe.zadd(TERMS_KEY, dict.fromkeys(entries, 0))
+        pipe.sadd(key, *entries)
+    pipe.zadd(POPULARITY_KEY, {video.pk: video.view_count})
+
+
+def index_video(video):
+    """
+    Add or update a published video in the index; other videos are removed from it.
+    The video's term set is read under WATCH and replaced in MULTI/EXEC (retried if a
+    concurrent update changed it), so no stale terms are left behind.
+    """
+    if video.status != 'published':
+        remove_video(video.pk)
+        return
+    key = _video_terms_key(video.pk)
+
+    def replace_entries(pipe):
+        old_entries = pipe.smembers(key)
+        pipe.multi()
+        _index_into(pipe, video, old_entries)
+
+    get_redis().transaction(replace_entries, key)
+
+
+def remove_video(video_id):
+    """Remove all index entries of a video (atomically, like index_video)."""
+    key = _video_terms_key(video_id)
+
+    def remove_entries(pipe):
+        old_entries = pipe.smembers(key)
+        pipe.multi()
+        if old_entries:
+            pipe.zrem(TERMS_KEY, *old_entries)
+        pipe.delete(key)
+        pipe.zrem(POPULARITY_KEY, video_id)
+
+    get_redis().transaction(remove_entries, key)
+
+
+def update_popularity(video_id, view_count):
+    """Store a new view count of an indexed video (no-op for videos not in the index)."""
+    get_redis().zadd(POPULARITY_KEY, {video_id: view_count}, xx=True)
+
+
+def suggest(prefix, limit=None):
+    """
+    Return up to `limit` suggestions [{'text', 'type', 'video_id'}] for a typed prefix,
+    most popular first. Persons are merged across videos (video_id is None for them).
+    """
+    limit = limit or settings.VIDEO_SUGGEST_LIMIT
+    term = normalize(prefix).encode()
+    if not term:
+        return []
+    connection = get_redis()
+    rows = connection.zrangebylex(
+        TERMS_KEY, b'[' + term, b'[' + term + b'\xff', start=0, num=settings.VIDEO_SUGGEST_CANDIDATES
+    )
+    if not rows:
+        return []
+    candidates = [row.decode().split(SEPARATOR)[1:] for row in rows]
+    video_ids = list(dict.fromkeys(int(video_id) for _kind, _display, video_id in candidates))
+    popularity = dict(zip(video_ids, connection.zmscore(POPULARITY_KEY, video_ids)))
+
+    suggestions = {}
+    for kind, display, video_id in candidates:
+        video_id = int(video_id)
+        key = (kind, display) if kind == 'person' else (kind, video_id)
+        score = popularity.get(video_id) or 0
+        if key not in suggestions or score > suggestions[key]['score']:
+            suggestions[key] = {
+                'text': display,
+                'type': kind,
+                'video_id': video_id if kind == 'title' else None,
+                'score': score,
+            }
+    ranked = sorted(suggestions.values(), key=lambda item: (-item['score'], item['text']))
+    return [{name: item[name] for name in ('text', 'type', 'video_id')} for item in ranked[:limit]]
+
+
+def rebuild_index(videos):
+    """
+    Rebuild the whole index from `videos` (published videos) into temporary keys and swap
+    them in atomically. Term sets of videos no longer indexed are deleted. Returns the count.
+    """
+    connection = get_redis()
+    terms_tmp, popularity_tmp = f'{TERMS_KEY}:rebuild', f'{POPULARITY_KEY}:rebuild'
+    connection.delete(terms_tmp, popularity_tmp)
+    indexed = set()
+    pipe = connection.pipeline(transaction=False)
+    for video in videos:
+        entries = video_entries(video)
+        key = _video_terms_key(video.pk)
+        pipe.delete(key)
+        if entries:
+            pipe.zadd(terms_tmp, dict.fromkeys(entries, 0))
+            pipe.sadd(key, *entries)
+        pipe.zadd(popularity_tmp, {video.pk: video.view_count})
+        indexed.add(video.pk)
+        if len(indexed) % REBUILD_BATCH_SIZE == 0:
+            pipe.execute()
+    pipe.execute()
+
+    pipe = connection.pipeline()
+    for name, tmp in ((TERMS_KEY, terms_tmp), (POPULARITY_KEY, popularity_tmp)):
+        if connection.exists(tmp):
+            pipe.rename(tmp, name)
+        else:
+            pipe.delete(name)
+    pipe.execute()
+
+    stale = [
+        key for key in connection.scan_iter(match=_video_terms_key('*'), count=REBUILD_BATCH_SIZE)
+        if int(key.rsplit(b':', 1)[1]) not in indexed
+    ]
+    for start in range(0, len(stale), REBUILD_BATCH_SIZE):
+        connection.delete(*stale[start:start + REBUILD_BATCH_SIZE])
+    logger.info(f'Suggest index rebuilt: {len(indexed)} videos, {len(stale)} stale term sets removed')
+    return len(indexed)
@@ -4,23 +4,62 @@ Verwendet ffmpeg zur Video-Konvertierung in verschiedene Qualitäten
 """
 import os
 import logging
+import shutil
+import time
+from datetime import timedelta
+
 from django.conf import settings
-from .models import Video
+from rq.job import Dependency
+from core.queues import get_task_queue
+from .jobs import (
+    CancelToken,
+    Heartbeat,
+    ProcessingCancelled,
+    VideoLock,
+    RUNNING_JOB_FOLLOW_UP_DELAY,
+    clear_rendition_failures,
+    enqueue_unique,
+    follow_up_job_id,
+    is_job_pending,
+    is_processing_alive,
+    is_rendition_backed_off,
+    prepare_job_id,
+    processing_job_id,
+    record_rendition_failure,
+    rendition_job_id,
+    request_rerun,
+    retry_job_id,
+)
+from .models import MediaIntegrityCheck, Video, VideoRendition, remove_media_dirs
+from .scheduler import encode_threads, run_budgeted
 from .utils import (
     get_video_by_id,
     get_original_video_path,
     get_output_path,
     get_quality_settings,
-    build_ffmpeg_command,
     build_hls_ffmpeg_command,
     run_ffmpeg_command,
-    save_video_file,
     get_video_duration_seconds,
-    create_hls_directory,
+    create_hls_staging_directory,
+    publish_hls_directory,
+    remove_partial_renditions,
     build_thumbnail_command,
+    build_thumbnail_candidates_command,
+    get_sample_timestamps,
+    build_complexity_probe_command,
+    complexity_factor_from_probe,
+    run_ffmpeg_capture,
     save_thumbnail_file,
-    update_video_duration
+    update_video_duration,
+    build_m3u8_path,
+    hls_rendition_exists,
+    get_ready_resolutions,
+    save_rendition_inventory,
+    write_segment_index,
+    get_rendition_last_access,
+    get_directory_size,
 )
+from .thumbnails import frames_from_rgb24, select_best_frame, save_frame_as_jpeg, generate_derivatives, thumbnail_version
 
 logger = logging.getLogger(__name__)
 
@@ -37,45 +76,60 @@ def _ensure_video_and_input_path(video_id):
     return video, input_path
 
 
-def convert_video_to_quality(video_id, resolution='720p'):
-    """Convert video to specific quality"""
+def generate_thumbnail(video_id, timestamp='00:00:05', cancel=None):
+    """
+    Generate video thumbnail from the best of several candidate keyframes.
+    Falls back to a single frame at `timestamp` if no candidate could be decoded.
+    """
     video, input_path = _ensure_video_and_input_path(video_id)
     if not video:
         return False
-    logger.info(f'Start conversion for {video.title} to {resolution}')
-    output_path = get_output_path(input_path, f'{resolution}.mp4')
-    quality_settings = get_quality_settings(resolution)
-    command = build_ffmpeg_command(input_path, output_path, quality_settings)
-    success, error = run_ffmpeg_command(command)
+    logger.info(f'Generate thumbnail for {video.title}')
+    thumbnail_path = get_output_path(input_path, 'thumbnail.jpg')
+    if _write_best_candidate_frame(video, input_path, thumbnail_path, cancel):
+        save_thumbnail_file(video, thumbnail_path)
+        logger.info(f'Thumbnail saved for {video.title}')
+        return True
+    command = build_thumbnail_command(input_path, thumbnail_path, timestamp)
+    success, error = run_ffmpeg_command(command, cancel=cancel)
     if success:
-        _save_converted_video(video, resolution, output_path)
-        logger.info(f'Video {resolution} saved for {video.title}')
+        save_thumbnail_file(video, thumbnail_path)
+        logger.info(f'Thumbnail saved for {video.title} (single frame fallback)')
         return True
     logger.error(f'FFmpeg error: {error}')
     return False
 
 
-def _save_converted_video(video, resolution, file_path):
-    """Save converted video to model field"""
-    field_name = f'video_{resolution}'
-    save_video_file(video, field_name, file_path)
+def _write_best_candidate_frame(video, input_path, thumbnail_path, cancel=None):
+    """Extract candidate keyframes in one FFmpeg call and write the best one. Returns bool."""
+    timestamps = get_sample_timestamps(video.duration, settings.THUMBNAIL_CANDIDATE_COUNT)
+    command = build_thumbnail_candidates_command(input_path, timestamps)
+    success, data, error = run_ffmpeg_capture(command, low_priority=True, cancel=cancel)
+    frames = frames_from_rgb24(data) if success else None
+    if frames is None or len(frames) == 0:
+        logger.warning(f'No thumbnail candidates for {video.title}: {error}')
+        return False
+    best, score = select_best_frame(frames)
+    if score <= 0:
+        logger.warning(f'All {len(frames)} thumbnail candidates are blank for {video.title}')
+        return False
+    save_frame_as_jpeg(frames[best], thumbnail_path)
+    logger.info(f'Thumbnail candidate {best + 1}/{len(frames)} selected (score {score:.3f})')
+    return True
 
 
-def generate_thumbnail(video_id, timestamp='00:00:05'):
-    """Generate video thumbnail at specific timestamp"""
-    video, input_path = _ensure_video_and_input_path(video_id)
-    if not video:
+def generate_thumbnail_derivatives(video_id):
+    """Generate responsive WebP/AVIF thumbnail derivatives for all configured widths"""
+    video = get_video_by_id(video_id)
+    if not video or not video.thumbnail:
         return False
-    logger.info(f'Generate thumbnail for {video.title}')
-    thumbnail_path = get_output_path(input_path, 'thumbnail.jpg')
-    command = build_thumbnail_command(input_path, thumbnail_path, timestamp)
-    success, error = run_ffmpeg_command(command)
-    if success:
-        save_thumbnail_file(video, thumbnail_path)
-        logger.info(f'Thumbnail saved for {video.title}')
-        return True
-    logger.error(f'FFmpeg error: {error}')
-    return False
+    try:
+        written = generate_derivatives(video.thumbnail.path, thumbnail_version(video))
+    except (OSError, ValueError) as error:
+        logger.error(f'Thumbnail derivatives failed for {video.title}: {error}')
+        return False
+    logger.info(f'{len(written)} thumbnail derivatives saved for {video.title}')
+    return True
 
 
 def get_video_duration(video_id):
@@ -93,24 +147,66 @@ def get_video_duration(video_id):
     return False
 
 
-def convert_video_to_hls(video_id, resolution='720p'):
+def analyze_video_complexity(video_id, cancel=None):
+    """Estimate content complexity with a low-res CRF probe encode and store the bitrate factor"""
+    video, input_path = _ensure_video_and_input_path(video_id)
+    if not video:
+        return False
+    probe = settings.VIDEO_COMPLEXITY_PROBE
+    chunks, chunk_seconds = probe['chunks'], probe['chunk_seconds']
+    if 0 < video.duration < chunks * chunk_seconds:
+        chunks, chunk_seconds = 1, video.duration
+    timestamps = get_sample_timestamps(video.duration, chunks)
+    threads = encode_threads(probe['threads'])
+    command = build_complexity_probe_command(input_path, timestamps, chunk_seconds, probe, threads)
+    success, data, error = run_budgeted(command, threads, capture=True, cancel=cancel)
+    if not success or not data:
+        logger.error(f'Complexity probe failed for {video.title}: {error}')
+        return False
+    factor = complexity_factor_from_probe(len(data), chunks * chunk_seconds, probe)
+    video.complexity_factor = factor
+    video.save(update_fields=['complexity_factor'])
+    logger.info(f'Complexity factor for {video.title}: {factor}')
+    return True
+
+
+def convert_video_to_hls(video_id, resolution='720p', cancel=None):
     """Convert video to HLS format with M3U8 playlist and TS segments"""
+    cancel = cancel or CancelToken(video_id)
     video, input_path = _ensure_video_and_input_path(video_id)
     if not video:
         return False
     logger.info(f'Start HLS conversion for {video.title} to {resolution}')
     output_dir = os.path.dirname(input_path)
-    hls_dir = create_hls_directory(output_dir, resolution)
-    quality_settings = get_quality_settings(resolution)
-    command = build_hls_ffmpeg_command(input_path, hls_dir, quality_settings)
-    success, error = run_ffmpeg_command(command)
+    cancel.check()
+    staging_dir = create_hls_staging_directory(output_dir, resolution)
+    quality_settings = get_quality_settings(resolution, video.complexity_factor)
+    threads = encode_threads()
+    command = build_hls_ffmpeg_command(input_path, staging_dir, quality_settings, threads)
+    try:
+        success, error = run_budgeted(command, threads, cancel=cancel)
+    except ProcessingCancelled:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
     if success:
+        _write_segment_index(staging_dir)
+        hls_dir = publish_hls_directory(staging_dir)
+        save_rendition_inventory(video, resolution, hls_dir)
         _log_hls_success(hls_dir, resolution)
         return True
+    shutil.rmtree(staging_dir, ignore_errors=True)
     logger.error(f'FFmpeg HLS error: {error}')
     return False
 
 
+def _write_segment_index(hls_dir):
+    """Write the seek index with the rendition (it is built lazily on first seek if this fails)"""
+    try:
+        write_segment_index(hls_dir)
+    except (OSError, ValueError) as error:
+        logger.warning(f'Could not write segment index for {hls_dir}: {error}')
+
+
 def _log_hls_success(hls_dir, resolution):
     """Log successful HLS conversion"""
     segment_count = len([f for f in os.listdir(hls_dir) if f.endswith('.ts')])
@@ -118,20 +214,151 @@ def _log_hls_success(hls_dir, resolution):
     logger.info(f'{segment_count} TS segments created')
 
 
+def prepare_video(video_id):
+    """
+    Fast processing stage (duration, complexity analysis, thumbnail) – runs on the 'fast' queue.
+    Holds the video's lock like the encode stage; a rerun requested meanwhile repeats only this
+    stage, since the dependent encode job starts after it returned and released the lock.
+    """
+    def prepare():
+        return _prepare_video(video_id, CancelToken(video_id))
+
+    result = _run_locked(video_id, prepare, rerun_if_busy=True, rerun=prepare)
+    return bool(result)
+
+
+def _prepare_video(video_id, cancel):
+    """Probe, analyze and thumbnail the video; raises ProcessingCancelled if cancelled"""
+    video = get_video_by_id(video_id)
+    if not video:
+        return False
+    logger.info(f'Prepare {video.title} for encoding')
+    _set_video_status(video, 'processing')
+    get_video_duration(video_id)
+    analyze_video_complexity(video_id, cancel)
+    cancel.check()
+    generate_thumbnail(video_id, cancel=cancel)
+    cancel.check()
+    generate_thumbnail_derivatives(video_id)
+    return True
+
+
 def process_uploaded_video(video_id):
-    """Main task for complete video processing (duration, thumbnail, HLS)"""
+    """
+    Encode stage of video processing (HLS base renditions, publish) – runs on the 'encode' queue.
+    At most one run per video is active; requests during a run are coalesced into one rerun.
+    """
+    result = _run_locked(video_id, lambda: _encode_video(video_id), rerun_if_busy=True)
+    return bool(result)
+
+
+def process_video_now(video_id):
+    """Run the complete pipeline (prepare + encode) in the current process, e.g. from a command"""
+    result = _run_locked(video_id, lambda: _process_video(video_id), rerun_if_busy=True)
+    return bool(result)
+
+
+def _run_locked(video_id, work, rerun_if_busy=False, rerun=None):
+    """
+    Run `work` while holding the video's processing lock and return its result.
+    Returns None if the lock is held elsewhere (with `rerun_if_busy`, the holder is
+    asked to process the video once more when it is done). Reruns requested during
+    the run execute `rerun` (default: the complete pipeline) before the lock is released.
+    """
+    rerun = rerun or (lambda: _process_video(video_id))
+    lock = VideoLock(video_id)
+    if not lock.acquire():
+        if not rerun_if_busy:
+            logger.info(f'Video ID {video_id} is locked by another run – skipped')
+            return None
+        if request_rerun(video_id) or not lock.acquire():
+            logger.info(f'Video ID {video_id} is already being processed – rerun requested')
+            return None
+    try:
+        with Heartbeat(video_id):
+            result = _run_cancellable(video_id, work)
+            while lock.release_or_rerun():
+                logger.info(f'Rerun requested for video ID {video_id} during processing')
+                _run_cancellable(video_id, rerun)
+        return result
+    except Exception:
+        lock.release()
+        raise
+
+
+def _run_cancellable(video_id, work):
+    """Run `work`; a cancelled run (video deleted or replaced) ends quietly with False"""
+    try:
+        return work()
+    except ProcessingCancelled:
+        logger.info(f'Processing of video ID {video_id} cancelled')
+        return False
+
+
+def enqueue_video_processing(video_id):
+    """
+    Enqueue the processing run of a video (deterministic job id). Duplicate requests are
+    coalesced into the pending job, or into a single rerun if processing is active.
+    """
+    if request_rerun(video_id):
+        logger.info(f'Video ID {video_id} is being processed – rerun requested')
+        return None
+
+    def if_running():
+        return _rerun_or_follow_up(video_id)
+
+    prepare_job = enqueue_unique(prepare_video, video_id, job_id=prepare_job_id(video_id), if_running=if_running)
+    depends_on = Dependency(jobs=[prepare_job], allow_failure=True) if prepare_job else None
+    return enqueue_unique(
+        process_uploaded_video, video_id, job_id=processing_job_id(video_id), depends_on=depends_on,
+        if_running=if_running
+    )
+
+
+def _rerun_or_follow_up(video_id):
+    """
+    A job of the video is running and would not pick up the request: ask its run for a rerun,
+    or – the run already released the lock and only finishes up – enqueue the processing
+    again once the job has ended. Returns None (no job to depend on).
+    """
+    if request_rerun(video_id):
+        logger.info(f'Video ID {video_id} is being processed – rerun requested')
+        return None
+    queue = get_task_queue(enqueue_video_processing)
+    job = queue.fetch_job(follow_up_job_id(video_id))
+    if job and is_job_pending(job):
+        return None
+    queue.enqueue_in(
+        timedelta(seconds=RUNNING_JOB_FOLLOW_UP_DELAY), enqueue_video_processing, video_id,
+        job_id=follow_up_job_id(video_id)
+    )
+    logger.info(f'Job of video ID {video_id} is finishing – processing enqueued again after it')
+    return None
+
+
+def _process_video(video_id):
+    """Run the complete processing pipeline inline (caller holds the video lock)"""
+    cancel = CancelToken(video_id)
+    _prepare_video(video_id, cancel)
+    return _encode_video(video_id, cancel)
+
+
+def _encode_video(video_id, cancel=None):
+    """Encode the base HLS renditions and publish the video (caller holds the video lock)"""
+    cancel = cancel or CancelToken(video_id)
     video = get_video_by_id(video_id)
     if not video:
         return False
     
-    logger.info(f'Start complete processing for {video.title}')
+    logger.info(f'Start encoding for {video.title}')
     _set_video_status(video, 'processing')
+    _convert_base_hls_resolutions(video_id, cancel)
+    cancel.check()
     
-    get_video_duration(video_id)
-    generate_thumbnail(video_id)
-    _convert_all_hls_resolutions(video_id)
-    
-    _set_video_status(video, 'published')
+    video.status = 'published'
+    video.processing_attempts = 0
+    video.save(update_fields=['status', 'processing_attempts'])
+    MediaIntegrityCheck.objects.filter(video_id=video_id).update(needs_reprocessing=False)
     logger.info(f'Video processing completed for {video.title}')
     return True
 
@@ -142,9 +369,167 @@ def _set_video_status(video, status_value):
     video.save(update_fields=['status'])
 
 
-def _convert_all_hls_resolutions(video_id):
-    """Convert video to all HLS resolutions"""
-    resolutions = ['360p', '480p', '720p', '1080p']
-    for resolution in resolutions:
+def _convert_base_hls_resolutions(video_id, cancel=None):
+    """Convert video to the base HLS resolutions; other rungs are encoded lazily"""
+    for resolution in settings.VIDEO_BASE_RENDITIONS:
         logger.info(f'HLS conversion to {resolution}')
-        convert_video_to_hls(video_id, resolution)
+        convert_video_to_hls(video_id, resolution, cancel)
+
+
+# -----------------------------------------------------------------------------
+# Lazy renditions (encoded on first request / popularity, pruned when unused)
+# -----------------------------------------------------------------------------
+
+def encode_lazy_rendition(video_id, resolution):
+    """
+    Encode a single HLS rendition on demand; skipped while the video is being processed.
+    A failed encode puts the rung into backoff, so requests meanwhile do not enqueue it again.
+    """
+    video, input_path = _ensure_video_and_input_path(video_id)
+    if not video:
+        return False
+    if hls_rendition_exists(input_path, resolution):
+        if resolution not in get_ready_resolutions(video):
+            save_rendition_inventory(video, resolution, os.path.dirname(build_m3u8_path(input_path, resolution)))
+        return True
+    return bool(_run_locked(video_id, lambda: _encode_rendition_with_backoff(video_id, resolution)))
+
+
+def _encode_rendition_with_backoff(video_id, resolution):
+    """Run the rendition encode and record its failure (cancelled runs are not failures)"""
+    try:
+        success = convert_video_to_hls(video_id, resolution)
+    except ProcessingCancelled:
+        raise
+    except Exception:
+        record_rendition_failure(video_id, resolution)
+        raise
+    if success:
+        clear_rendition_failures(video_id, resolution)
+        return True
+    delay = record_rendition_failure(video_id, resolution)
+    logger.warning(f'{resolution} rendition of video ID {video_id} failed – not retried for {delay}s')
+    return False
+
+
+def enqueue_hls_rendition(video_id, resolution):
+    """Enqueue a single HLS rendition encode unless the same job is pending or the rung is in backoff"""
+    if is_rendition_backed_off(video_id, resolution):
+        return None
+    return enqueue_unique(encode_lazy_rendition, video_id, resolution, job_id=rendition_job_id(video_id, resolution))
+
+
+def enqueue_missing_renditions(video, ready=None):
+    """Enqueue all configured renditions that are not ready yet for the video"""
+    ready = get_ready_resolutions(video) if ready is None else ready
+    return [
+        enqueue_hls_rendition(video.id, resolution)
+        for resolution in settings.VIDEO_RESOLUTIONS
+        if resolution not in ready
+    ]
+
+
+def enqueue_renditions_if_popular(video):
+    """
+    Encode the remaining rungs of a video at or above the lazy rendition threshold.
+    Repeated calls are cheap: rungs already ready are skipped (prefetched ready_renditions
+    are used when present) and pending encodes are coalesced by their deterministic job ids.
+    """
+    if video.view_count < settings.VIDEO_LAZY_RENDITION_VIEW_THRESHOLD:
+        return
+    ready = None
+    if hasattr(video, 'ready_renditions'):
+        ready = {rendition.resolution for rendition in video.ready_renditions}
+    enqueue_missing_renditions(video, ready)
+
+
+def prune_unused_renditions(max_age_days=None, dry_run=False):
+    """
+    Remove non-base renditions of rarely watched videos whose playlist was not requested
+    within `max_age_days`. Returns a list of (video_id, resolution, bytes).
+    """
+    max_age_days = settings.VIDEO_RENDITION_PRUNE_AFTER_DAYS if max_age_days is None else max_age_days
+    cutoff = time.time() - max_age_days * 86400
+    lazy_resolutions = [r for r in settings.VIDEO_RESOLUTIONS if r not in settings.VIDEO_BASE_RENDITIONS]
+    renditions = VideoRendition.objects.filter(
+        is_ready=True,
+        resolution__in=lazy_resolutions,
+        video__status='published',
+        video__view_count__lt=settings.VIDEO_LAZY_RENDITION_VIEW_THRESHOLD
+    ).select_related('video').only('id', 'resolution', 'bytes', 'updated_at', 'video__id', 'video__original_video')
+    pruned = []
+    for rendition in renditions.iterator():
+        video, resolution = rendition.video, rendition.resolution
+        last_access = get_rendition_last_access(video.id, resolution) or rendition.updated_at.timestamp()
+        if last_access > cutoff:
+            continue
+        if not dry_run:
+            input_path = get_original_video_path(video)
+            if input_path:
+                shutil.rmtree(os.path.dirname(build_m3u8_path(input_path, resolution)), ignore_errors=True)
+            rendition.delete()
+        pruned.append((video.id, resolution, rendition.bytes))
+    return pruned
+
+
+# -----------------------------------------------------------------------------
+# Crash recovery (stale job reaper, scheduled by `manage.py run_cron`)
+# -----------------------------------------------------------------------------
+
+def reap_stale_processing():
+    """
+    Recover videos stuck in 'processing' whose run died (no heartbeat, no lock, no pending job):
+    remove partial renditions and re-enqueue with exponential backoff. After
+    VIDEO_PROCESSING_MAX_ATTEMPTS the video goes back to 'draft'. Returns the reaped video ids.
+    """
+    reaped = []
+    videos = Video.objects.filter(status='processing').only('id', 'title', 'original_video', 'processing_attempts')
+    for video in videos.iterator():
+        if is_processing_alive(video.id):
+            continue
+        input_path = get_original_video_path(video)
+        if input_path:
+            for path in remove_partial_renditions(os.path.dirname(input_path)):
+                logger.info(f'Removed partial rendition {path}')
+        _retry_or_give_up(video)
+        reaped.append(video.id)
+    return reaped
+
+
+def _retry_or_give_up(video):
+    """Schedule a delayed processing retry for a reaped video, or reset it to 'draft'"""
+    video.processing_attempts += 1
+    if video.processing_attempts > settings.VIDEO_PROCESSING_MAX_ATTEMPTS:
+        logger.error(f'Processing of {video.title} failed {video.processing_attempts - 1} times – reset to draft')
+        video.status = 'draft'
+        video.processing_attempts = 0
+        video.save(update_fields=['status', 'processing_attempts'])
+        return
+    video.save(update_fields=['processing_attempts'])
+    delay = min(
+        settings.VIDEO_PROCESSING_RETRY_BACKOFF * 2 ** (video.processing_attempts - 1),
+        settings.VIDEO_PROCESSING_RETRY_BACKOFF_MAX
+    )
+    get_task_queue(retry_video_processing).enqueue_in(
+        timedelta(seconds=delay), retry_video_processing, video.id, job_id=retry_job_id(video.id)
+    )
+    logger.warning(f'Processing of {video.title} died – retry {video.processing_attempts} in {delay}s')
+
+
+def retry_video_processing(video_id):
+    """Re-enqueue the processing run of a video that is still stuck in 'processing'"""
+    if not Video.objects.filter(id=video_id, status='processing').exists():
+        return None
+    return enqueue_video_processing(video_id)
+
+
+# -----------------------------------------------------------------------------
+# Media deletion (enqueued after a video delete, see core.signals)
+# -----------------------------------------------------------------------------
+
+def delete_video_media(dir_paths):
+    """Remove the media dirs of a deleted video in the background. Returns the bytes freed."""
+    freed = sum(get_directory_size(path) for path in dir_paths)
+    remove_media_dirs(dir_paths)
+    logger.info(f'Removed {len(dir_paths)} media dirs ({freed / (1024 * 1024):.1f} MB)')
+    return freed
@@ -0,0 +1,551 @@
+import base64
+import os
+import tempfile
+from unittest import mock
+from urllib.parse import unquote
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.test import APIClient
+
+from api.videos.cache import get_catalogue_version
+from videos.jobs import enqueue_unique
+from videos.management.commands.gc_media import referenced_media_dirs
+from videos.models import Category, Person, Video, parse_credits, person_slug
+from videos.tasks import (
+    _encode_rendition_with_backoff,
+    _rerun_or_follow_up,
+    enqueue_hls_rendition,
+    enqueue_video_processing,
+    process_uploaded_video,
+)
+from videos.thumbnails import generate_derivatives, get_or_create_variant, thumbnail_version
+from videos.trending import add_views, decayed_views, rebuild_category_trending, rollup_trending
+from videos.utils import build_complexity_probe_command, build_hls_ffmpeg_command, get_quality_settings
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def make_video(title, categories=(), status='published', **fields):
+    """Create a video without original file (no processing is enqueued)."""
+    video = Video.objects.create(title=title, description=f'{title} description', status=status, **fields)
+    if categories:
+        video.categories.set(categories)
+    return video
+
+
+@override_settings(CACHES=TEST_CACHES, SECURE_SSL_REDIRECT=False)
+class VideoAPITestCase(TestCase):
+    """Base class for API tests: empty local cache (catalogue responses) and a plain client."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+
+class VideoListQueryTests(VideoAPITestCase):
+    """GET /api/video/ runs a constant number of queries, however many videos it lists."""
+
+    LIST_QUERIES = 1
+
+    def setUp(self):
+        super().setUp()
+        self.drama = Category.objects.create(name='Drama')
+        self.comedy = Category.objects.create(name='Komödie')
+
+    def create_videos(self, count):
+        for number in range(count):
+            make_video(f'Video {Video.objects.count() + 1}', [self.drama, self.comedy][:1 + number % 2])
+
+    def test_list_query_count_does_not_grow_with_videos(self):
+        self.create_videos(3)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get('/api/video/')
+        self.assertEqual(len(response.json()), 3)
+
+        cache.clear()
+        self.create_videos(20)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get('/api/video/')
+        videos = response.json()
+        self.assertEqual(len(videos), 23)
+        self.assertTrue(all(video['category'] in ('Drama', 'Komödie') for video in videos))
+
+
+class KeysetPaginationTests(VideoAPITestCase):
+    """Cursor pagination of GET /api/video/ (?limit= / ?cursor=)."""
+
+    def setUp(self):
+        super().setUp()
+        for number in range(25):
+            make_video(f'Video {number:02d}', view_count=number % 4)
+
+    def collect_pages(self, params):
+        ids, pages = [], 0
+        response = self.client.get('/api/video/', params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            body = response.json()
+            ids.extend(video['id'] for video in body['results'])
+            pages += 1
+            if not body['next']:
+                return ids, pages
+            response = self.client.get(body['next'])
+
+    def test_cursor_round_trip_returns_every_video_once_in_order(self):
+        ids, pages = self.collect_pages({'limit': 10})
+        expected = list(Video.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual(pages, 3)
+
+    def test_cursor_round_trip_with_ties_in_ordering_field(self):
+        ids, _pages = self.collect_pages({'limit': 4, 'ordering': 'view_count'})
+        expected = list(Video.objects.order_by('view_count', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_page_queries_do_not_depend_on_position(self):
+        with CaptureQueriesContext(connection) as first_page:
+            response = self.client.get('/api/video/', {'limit': 10})
+        with self.assertNumQueries(len(first_page)):
+            self.client.get(response.json()['next'])
+
+    def test_malformed_cursor_returns_404(self):
+        for cursor in ('not-a-cursor', base64.urlsafe_b64encode(b'{"id": "x"}').decode()):
+            response = self.client.get('/api/video/', {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+
+    def test_cursor_of_another_ordering_returns_404(self):
+        cursor = self.client.get('/api/video/', {'limit': 10}).json()['next'].split('cursor=')[1]
+        response = self.client.get('/api/video/', {'cursor': unquote(cursor), 'ordering': 'title'})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CatalogueVersionTests(TestCase):
+    """The catalogue version is bumped after commit, and only for changes visible in the catalogue."""
+
+    def setUp(self):
+        cache.clear()
+        self.video = make_video('Der Sturm', status='processing')
+
+    def bumps(self, change):
+        before = get_catalogue_version()
+        with mock.patch('core.signals._run_index_update'):  # Redis indexes, dashboard job
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                change()
+                self.assertEqual(get_catalogue_version(), before, 'bumped before commit')
+        return get_catalogue_version() - before if callbacks else 0
+
+    def test_processing_saves_of_unpublished_video_do_not_bump(self):
+        def process():
+            self.video.complexity_factor = 1.4
+            self.video.save(update_fields=['complexity_factor'])
+            self.video.duration = 95
+            self.video.save(update_fields=['duration'])
+            self.video.status = 'draft'
+            self.video.save()
+        self.assertEqual(self.bumps(process), 0)
+
+    def test_publishing_bumps(self):
+        def publish():
+            self.video.status = 'published'
+            self.video.save(update_fields=['status'])
+        self.assertEqual(self.bumps(publish), 1)
+
+    def test_published_video_bumps_only_for_public_fields(self):
+        self.video.status = 'published'
+        self.video.save()
+
+        def internal_change():
+            self.video.processing_attempts = 2
+            self.video.view_count = 10
+            self.video.save()
+        self.assertEqual(self.bumps(internal_change), 0)
+
+        def title_change():
+            video = Video.objects.get(pk=self.video.pk)
+            video.title = 'Der Sturm (Director\'s Cut)'
+            video.save()
+        self.assertEqual(self.bumps(title_change), 1)
+
+
+class CategoryCounterTests(TestCase):
+    """Category.published_video_count follows publishing, unpublishing and category changes."""
+
+    def setUp(self):
+        self.drama = Category.objects.create(name='Drama')
+        self.comedy = Category.objects.create(name='Komödie')
+
+    def assertCounts(self, drama, comedy):
+        self.assertEqual(
+            {category.name: category.published_video_count for category in Category.objects.all()},
+            {'Drama': drama, 'Komödie': comedy},
+        )
+        Category.refresh_published_video_counts()  # the counters match a full recount
+        self.assertEqual(
+            {category.name: category.published_video_count for category in Category.objects.all()},
+            {'Drama': drama, 'Komödie': comedy},
+        )
+
+    def test_publish_and_unpublish(self):
+        video = make_video('Der Sturm', [self.drama, self.comedy], status='processing')
+        self.assertCounts(0, 0)
+        video.status = 'published'
+        video.save(update_fields=['status'])
+        self.assertCounts(1, 1)
+        video.status = 'draft'
+        video.save()
+        self.assertCounts(0, 0)
+
+    def test_category_changes_of_published_video(self):
+        video = make_video('Der Sturm', [self.drama])
+        make_video('Die Flut', [self.drama, self.comedy])
+        self.assertCounts(2, 1)
+        video.categories.add(self.comedy)
+        self.assertCounts(2, 2)
+        video.categories.remove(self.drama)
+        self.assertCounts(1, 2)
+        video.categories.clear()
+        self.assertCounts(1, 1)
+        self.comedy.videos.add(video)
+        self.assertCounts(1, 2)
+        self.comedy.videos.clear()
+        self.assertCounts(1, 0)
+
+    def test_category_changes_of_draft_do_not_count(self):
+        video = make_video('Der Sturm', [self.drama], status='draft')
+        video.categories.add(self.comedy)
+        self.assertCounts(0, 0)
+
+    def test_delete_published_video(self):
+        video = make_video('Der Sturm', [self.drama, self.comedy])
+        make_video('Die Flut', [self.drama])
+        with mock.patch('core.signals._cancel_video_processing'):
+            video.delete()
+        self.assertCounts(1, 0)
+
+
+class ParseCreditsTests(SimpleTestCase):
+    """parse_credits splits director and cast into (slug, name, role, position)."""
+
+    def test_order_roles_and_duplicates(self):
+        credits = parse_credits('Anna Berger', 'Max Roth, anna berger,  , Lea Sommer, MAX ROTH')
+        self.assertEqual(credits, [
+            ('anna-berger', 'Anna Berger', 'director', 0),
+            ('max-roth', 'Max Roth', 'cast', 0),
+            ('anna-berger', 'anna berger', 'cast', 1),
+            ('lea-sommer', 'Lea Sommer', 'cast', 2),
+        ])
+
+    def test_empty_fields(self):
+        self.assertEqual(parse_credits('', None), [])
+
+    def test_long_name_slug_matches_stored_name(self):
+        name = 'Ö' + 'x' * 250
+        [(slug, stored, _role, _position)] = parse_credits('', name)
+        self.assertEqual(len(stored), 200)
+        self.assertEqual(slug, person_slug(stored))
+
+
+class SyncCreditsTests(TestCase):
+    """Video.save keeps the VideoCredit rows in line with director and cast."""
+
+    def credits(self, video):
+        return list(video.credits.order_by('role', 'position').values_list('person__slug', 'role', 'position'))
+
+    def test_credits_follow_text_changes(self):
+        video = make_video('Der Sturm', director='Anna Berger', cast='Max Roth, Lea Sommer')
+        self.assertEqual(self.credits(video), [
+            ('max-roth', 'cast', 0), ('lea-sommer', 'cast', 1), ('anna-berger', 'director', 0),
+        ])
+        video.cast = 'Lea Sommer, Tom Kurz'
+        video.save(update_fields=['cast'])
+        self.assertEqual(self.credits(video), [
+            ('lea-sommer', 'cast', 0), ('tom-kurz', 'cast', 1), ('anna-berger', 'director', 0),
+        ])
+        other = make_video('Die Flut', cast='lea sommer')
+        self.assertEqual(Person.objects.filter(slug='lea-sommer').count(), 1)
+        self.assertEqual(set(Person.objects.get(slug='lea-sommer').videos.all()), {video, other})
+
+    def test_long_names_are_synced(self):
+        video = make_video('Der Sturm', cast='y' * 300)
+        self.assertEqual(video.credits.get().person.name, 'y' * 200)
+
+    def test_saves_without_text_changes_do_not_resync_or_reindex(self):
+        video = make_video('Der Sturm', director='Anna Berger', status='processing')
+        video = Video.objects.get(pk=video.pk)
+        with mock.patch.object(Video, 'sync_credits') as sync, \
+                mock.patch.object(Video, 'update_search_vector') as reindex:
+            video.duration = 95
+            video.save()
+            video.status = 'published'
+            video.save(update_fields=['status'])
+            video.director = 'Anna Berger'
+            video.save(update_fields=['director'])
+        sync.assert_not_called()
+        reindex.assert_not_called()
+        with mock.patch.object(Video, 'sync_credits') as sync:
+            video.title = 'Der Sturm 2'
+            video.save()
+        sync.assert_not_called()
+
+
+class HeroFallbackTests(VideoAPITestCase):
+    """Without Redis, the hero is picked from the database instead of failing."""
+
+    def test_hero_without_redis_picks_featured_video(self):
+        make_video('Der Sturm', view_count=500)
+        featured = make_video('Die Flut', is_featured=True)
+        make_video('Entwurf', is_featured=True, status='draft')
+        with mock.patch('videos.hero.get_redis', side_effect=redis.ConnectionError('down')):
+            response = self.client.get('/api/video/hero/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], featured.pk)
+
+
+class DetailWithoutRedisTests(VideoAPITestCase):
+    """The detail view survives a Redis outage (view recording, lazy rendition enqueue)."""
+
+    def test_detail_of_popular_video_without_redis(self):
+        video = make_video('Der Sturm', view_count=500)
+        down = redis.ConnectionError('down')
+        with mock.patch('videos.trending.get_redis', side_effect=down), \
+                mock.patch('videos.jobs.get_redis', side_effect=down):
+            response = self.client.get(f'/api/video/{video.slug}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['id'], video.pk)
+
+
+class EnqueueRunningJobTests(SimpleTestCase):
+    """A processing request is not coalesced into a job that is already running."""
+
+    def queue_with(self, status):
+        queue = mock.Mock()
+        queue.fetch_job.return_value.get_status.return_value = status
+        queue.fetch_job.return_value.last_heartbeat = None
+        return queue
+
+    def enqueue(self, queue, **kwargs):
+        with mock.patch('videos.jobs.get_redis'), mock.patch('videos.jobs.get_task_queue', return_value=queue):
+            return enqueue_unique(process_uploaded_video, 7, job_id='process-video-7', **kwargs)
+
+    def test_waiting_job_is_coalesced(self):
+        queue = self.queue_with('queued')
+        if_running = mock.Mock()
+        self.assertIs(self.enqueue(queue, if_running=if_running), queue.fetch_job.return_value)
+        if_running.assert_not_called()
+        queue.enqueue.assert_not_called()
+
+    def test_running_job_calls_if_running(self):
+        queue = self.queue_with('started')
+        if_running = mock.Mock(return_value=None)
+        self.assertIsNone(self.enqueue(queue, if_running=if_running))
+        if_running.assert_called_once_with()
+        queue.enqueue.assert_not_called()
+
+    def test_finishing_run_gets_a_follow_up(self):
+        queue = self.queue_with('finished')
+        with mock.patch('videos.tasks.request_rerun', return_value=False), \
+                mock.patch('videos.tasks.get_task_queue', return_value=queue):
+            _rerun_or_follow_up(7)
+        args, kwargs = queue.enqueue_in.call_args
+        self.assertEqual(args[1:], (enqueue_video_processing, 7))
+        self.assertEqual(kwargs, {'job_id': 'follow-up-video-7'})
+
+    def test_locked_run_gets_a_rerun(self):
+        queue = self.queue_with('finished')
+        with mock.patch('videos.tasks.request_rerun', return_value=True), \
+                mock.patch('videos.tasks.get_task_queue', return_value=queue):
+            _rerun_or_follow_up(7)
+        queue.enqueue_in.assert_not_called()
+
+
+class LazyRenditionBackoffTests(SimpleTestCase):
+    """A failed lazy rendition encode is not enqueued again while its backoff runs."""
+
+    def test_failed_encode_records_failure(self):
+        with mock.patch('videos.tasks.convert_video_to_hls', return_value=False), \
+                mock.patch('videos.tasks.record_rendition_failure', return_value=600) as record, \
+                mock.patch('videos.tasks.clear_rendition_failures') as clear:
+            self.assertFalse(_encode_rendition_with_backoff(7, '1080p'))
+        record.assert_called_once_with(7, '1080p')
+        clear.assert_not_called()
+
+    def test_successful_encode_clears_failures(self):
+        with mock.patch('videos.tasks.convert_video_to_hls', return_value=True), \
+                mock.patch('videos.tasks.record_rendition_failure') as record, \
+                mock.patch('videos.tasks.clear_rendition_failures') as clear:
+            self.assertTrue(_encode_rendition_with_backoff(7, '1080p'))
+        clear.assert_called_once_with(7, '1080p')
+        record.assert_not_called()
+
+    def test_backed_off_rung_is_not_enqueued(self):
+        with mock.patch('videos.tasks.is_rendition_backed_off', return_value=True), \
+                mock.patch('videos.tasks.enqueue_unique') as enqueue:
+            self.assertIsNone(enqueue_hls_rendition(7, '1080p'))
+        enqueue.assert_not_called()
+
+
+class EncodeThreadLimitTests(SimpleTestCase):
+    """Budgeted FFmpeg commands limit decoding, filtering and encoding to the budgeted threads."""
+
+    def test_hls_command(self):
+        command = build_hls_ffmpeg_command('in.mp4', '/out', get_quality_settings('720p'), threads=3)
+        before_input = command[:command.index('-i')]
+        self.assertEqual(before_input, ['ffmpeg', '-filter_threads', '3', '-threads', '3'])
+        self.assertEqual(command[command.index('-i'):].count('-threads'), 1)
+
+    def test_probe_command_limits_every_input(self):
+        probe = {'width': 320, 'height': 180, 'preset': 'veryfast', 'crf': 23}
+        command = build_complexity_probe_command('in.mp4', [10, 50], 4, probe, threads=2)
+        self.assertEqual(command[3:5], ['-filter_complex_threads', '2'])
+        inputs = [i for i, arg in enumerate(command) if arg == '-i']
+        self.assertEqual(len(inputs), 2)
+        self.assertEqual(command.count('-threads'), len(inputs) + 1)
+
+    def test_unbudgeted_command_has_no_limits(self):
+        command = build_hls_ffmpeg_command('in.mp4', '/out', get_quality_settings('720p'))
+        self.assertNotIn('-threads', command)
+        self.assertNotIn('-filter_threads', command)
+
+
+@override_settings(TRENDING_HALF_LIFE_HOURS=48)
+class TrendingScoreTests(SimpleTestCase):
+    """Log-space trending scores: decay, accumulation and ordering."""
+
+    NOW = 1_800_000_000
+    HOUR = 3600
+
+    def test_views_halve_after_one_half_life(self):
+        score = add_views(0.0, 100, self.NOW)
+        self.assertAlmostEqual(decayed_views(score, self.NOW), 100, places=6)
+        self.assertAlmostEqual(decayed_views(score, self.NOW + 48 * self.HOUR), 50, places=6)
+
+    def test_views_accumulate(self):
+        batched = add_views(add_views(0.0, 30, self.NOW), 70, self.NOW)
+        self.assertAlmostEqual(batched, add_views(0.0, 100, self.NOW), places=9)
+        older = add_views(add_views(0.0, 100, self.NOW - 48 * self.HOUR), 50, self.NOW)
+        self.assertAlmostEqual(decayed_views(older, self.NOW), 100, places=6)
+
+    def test_score_order_is_decayed_view_order(self):
+        scores = {
+            'old hit': add_views(0.0, 100, self.NOW - 72 * self.HOUR),  # 35.4 decayed views now
+            'new': add_views(0.0, 40, self.NOW),
+            'small': add_views(0.0, 10, self.NOW - self.HOUR),
+        }
+        by_score = sorted(scores, key=scores.get, reverse=True)
+        self.assertEqual(by_score, ['new', 'old hit', 'small'])
+        for later in (0, 24 * self.HOUR, 500 * self.HOUR):
+            by_views = sorted(scores, key=lambda name: decayed_views(scores[name], self.NOW + later), reverse=True)
+            self.assertEqual(by_views, by_score)
+
+
+class CategoryTrendingFallbackTests(VideoAPITestCase):
+    """?category= trending reads the score column while the Redis sets are unavailable."""
+
+    def setUp(self):
+        super().setUp()
+        self.drama = Category.objects.create(name='Drama')
+        self.top = make_video('Der Sturm', [self.drama], trending_score=3.0)
+        self.second = make_video('Die Flut', [self.drama], trending_score=2.0)
+        make_video('Entwurf', [self.drama], status='draft', trending_score=9.0)
+        make_video('Anderswo', trending_score=5.0)
+
+    def trending_ids(self):
+        response = self.client.get('/api/video/trending/', {'category': self.drama.slug})
+        self.assertEqual(response.status_code, 200)
+        return [video['id'] for video in response.json()]
+
+    def test_without_redis(self):
+        with mock.patch('videos.trending.get_redis', side_effect=redis.ConnectionError('down')):
+            self.assertEqual(self.trending_ids(), [self.top.pk, self.second.pk])
+
+    def test_sets_not_built_enqueue_one_rebuild(self):
+        connection = mock.Mock()
+        connection.exists.return_value = 0
+        with mock.patch('videos.trending.get_redis', return_value=connection), \
+                mock.patch('videos.trending.enqueue_unique') as enqueue:
+            self.assertEqual(self.trending_ids(), [self.top.pk, self.second.pk])
+        enqueue.assert_called_once_with(rebuild_category_trending, job_id='rebuild-category-trending')
+        connection.zadd.assert_not_called()
+
+
+class TrendingStorageTests(TestCase):
+    """The score column is written by the rollup only, which runs exclusively."""
+
+    def test_full_save_keeps_rolled_up_score(self):
+        video = make_video('Der Sturm')
+        stale = Video.objects.get(pk=video.pk)
+        Video.objects.filter(pk=video.pk).update(trending_score=42.0)  # rollup meanwhile
+        stale.duration = 95
+        stale.save()
+        self.assertEqual(Video.objects.get(pk=video.pk).trending_score, 42.0)
+        self.assertEqual(Video.objects.get(pk=video.pk).duration, 95)
+
+    def test_full_save_of_deferred_instance_keeps_rolled_up_score(self):
+        video = make_video('Der Sturm')
+        stale = Video.objects.defer('search_vector').get(pk=video.pk)
+        Video.objects.filter(pk=video.pk).update(trending_score=42.0)
+        stale.save()
+        self.assertEqual(Video.objects.get(pk=video.pk).trending_score, 42.0)
+
+    def test_save_keeps_django_semantics(self):
+        video = make_video('Der Sturm')
+        video.trending_score = 7.0
+        video.save(update_fields=['trending_score'])  # explicitly listed fields are written
+        self.assertEqual(Video.objects.get(pk=video.pk).trending_score, 7.0)
+        Video.objects.filter(pk=video.pk).delete()
+        video.save()  # row deleted meanwhile: inserted again
+        self.assertTrue(Video.objects.filter(pk=video.pk).exists())
+
+    def test_overlapping_rollup_is_skipped(self):
+        connection = mock.Mock()
+        connection.lock.return_value.acquire.return_value = False
+        with mock.patch('videos.trending.get_redis', return_value=connection):
+            self.assertEqual(rollup_trending(), 0)
+        connection.hgetall.assert_not_called()
+        connection.renamenx.assert_not_called()
+
+
+class MediaDirTests(TestCase):
+    """The id dir of a video whose stored name points at videos/None/ still belongs to it."""
+
+    def test_fallback_dir_is_referenced_and_deleted_with_the_video(self):
+        video = make_video('Der Sturm')
+        Video.objects.filter(pk=video.pk).update(original_video='videos/None/sturm.mp4')
+        video = Video.objects.get(pk=video.pk)
+        id_dir = os.path.join(os.path.abspath(settings.MEDIA_ROOT), 'videos', str(video.pk))
+        self.assertIn(id_dir, referenced_media_dirs())
+        self.assertIn(id_dir, video.get_media_dirs())
+        self.assertIn(os.path.join(os.path.dirname(id_dir), 'None'), video.get_media_dirs())
+
+
+@override_settings(THUMBNAIL_DERIVATIVE_FORMATS=['webp'], THUMBNAIL_DERIVATIVE_WIDTHS=[320])
+class ThumbnailDerivativeTests(SimpleTestCase):
+    """Pre-generated derivatives belong to one thumbnail version."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.source = os.path.join(self.tmp.name, 'thumbnail.jpg')
+        Image.new('RGB', (640, 360), 'navy').save(self.source)
+
+    def test_replaced_thumbnail_does_not_serve_old_derivative(self):
+        old, new = Video(id=1, thumbnail='videos/1/thumbnail.jpg'), Video(id=1, thumbnail='thumbnails/1/neu.jpg')
+        [old_derivative] = generate_derivatives(self.source, thumbnail_version(old))
+        self.assertEqual(get_or_create_variant(old, self.source, 320, 'webp'), old_derivative)
+        with override_settings(THUMBNAIL_RESIZE_CACHE_DIR=os.path.join(self.tmp.name, 'cache')):
+            self.assertNotEqual(get_or_create_variant(new, self.source, 320, 'webp'), old_derivative)
+
+    def test_regeneration_removes_earlier_versions(self):
+        legacy = os.path.join(self.tmp.name, 'thumb_320w.webp')
+        open(legacy, 'wb').close()
+        [first] = generate_derivatives(self.source, 'aaaaaaaaaa')
+        [second] = generate_derivatives(self.source, 'bbbbbbbbbb')
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['thumb_bbbbbbbbbb_320w.webp', 'thumbnail.jpg'])
+        self.assertNotEqual(first, second)
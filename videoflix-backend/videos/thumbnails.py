@@ -0,0 +1,230 @@
+"""
+Thumbnail selection for uploaded videos.
+
+Candidate keyframes are decoded by a single FFmpeg call (see
+``build_thumbnail_candidates_command``) and scored with vectorized NumPy
+statistics, so black frames, fades and flat title cards lose against
+well-exposed, detailed frames.
+
+Responsive derivatives: width-specific WebP/AVIF files are written next to the
+thumbnail at processing time, named after the thumbnail version so a replaced
+thumbnail never serves stale derivatives; other widths are resized on demand
+into a disk cache with LRU eviction (see ``get_or_create_variant``).
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+
+import numpy as np
+from django.conf import settings
+from PIL import Image, features
+
+logger = logging.getLogger(__name__)
+
+LUMA_WEIGHTS = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+BLANK_LUMA_MIN = 16
+BLANK_LUMA_MAX = 240
+SCORE_SUBSAMPLE = 4
+DERIVATIVE_NAME_RE = re.compile(r'^thumb_(?:[0-9a-f]+_)?\d+w\.(?:webp|avif)$')
+
+
+def frames_from_rgb24(data):
+    """Convert raw RGB24 bytes into an array of shape (n, height, width, 3)."""
+    width, height = settings.THUMBNAIL_SIZE
+    frame_size = width * height * 3
+    count = len(data) // frame_size
+    if count == 0:
+        return np.empty((0, height, width, 3), dtype=np.uint8)
+    buffer = np.frombuffer(data, dtype=np.uint8, count=count * frame_size)
+    return buffer.reshape(count, height, width, 3)
+
+
+def _luma(frames):
+    """Return subsampled luma planes (n, h', w') as float32."""
+    sampled = frames[:, ::SCORE_SUBSAMPLE, ::SCORE_SUBSAMPLE, :]
+    return sampled.astype(np.float32) @ LUMA_WEIGHTS
+
+
+def _entropy(luma):
+    """Shannon entropy (bits) of the 256-bin luma histogram of every frame."""
+    count = luma.shape[0]
+    pixels = luma.reshape(count, -1).astype(np.int64)
+    offsets = (np.arange(count, dtype=np.int64) * 256)[:, None]
+    histograms = np.bincount((pixels + offsets).ravel(), minlength=count * 256).reshape(count, 256)
+    probabilities = histograms / pixels.shape[1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where(probabilities > 0, probabilities * np.log2(probabilities), 0.0)
+    return -terms.sum(axis=1)
+
+
+def score_frames(frames):
+    """
+    Score every frame in [0, 1] from brightness, contrast and entropy.
+    Nearly black or white frames score 0.
+    """
+    if len(frames) == 0:
+        return np.empty(0, dtype=np.float32)
+    luma = _luma(frames)
+    brightness = luma.mean(axis=(1, 2))
+    contrast = luma.std(axis=(1, 2))
+    entropy = _entropy(luma)
+
+    brightness_score = 1.0 - np.abs(brightness - 128.0) / 128.0
+    contrast_score = np.clip(contrast / 64.0, 0.0, 1.0)
+    entropy_score = np.clip(entropy / 8.0, 0.0, 1.0)
+    scores = 0.3 * brightness_score + 0.3 * contrast_score + 0.4 * entropy_score
+
+    blank = (brightness < BLANK_LUMA_MIN) | (brightness > BLANK_LUMA_MAX)
+    return np.where(blank, 0.0, scores)
+
+
+def select_best_frame(frames):
+    """Return (index, score) of the best frame, or (None, 0.0) if there is none."""
+    scores = score_frames(frames)
+    if scores.size == 0:
+        return None, 0.0
+    best = int(np.argmax(scores))
+    logger.debug(f'Thumbnail candidate scores: {np.round(scores, 3).tolist()} -> {best}')
+    return best, float(scores[best])
+
+
+def save_frame_as_jpeg(frame, output_path):
+    """Write a single RGB frame to disk as JPEG."""
+    Image.fromarray(frame).save(output_path, 'JPEG', quality=90, optimize=True)
+
+
+# -----------------------------------------------------------------------------
+# Responsive derivatives (WebP/AVIF) and on-demand resize cache
+# -----------------------------------------------------------------------------
+
+IMAGE_FORMATS = {
+    'webp': {'pil_format': 'WEBP', 'content_type': 'image/webp', 'options': {'quality': 80, 'method': 4}},
+    'avif': {'pil_format': 'AVIF', 'content_type': 'image/avif', 'options': {'quality': 60}},
+}
+
+
+def supported_derivative_formats():
+    """Return the configured derivative formats this Pillow build can encode."""
+    return [fmt for fmt in settings.THUMBNAIL_DERIVATIVE_FORMATS if fmt in IMAGE_FORMATS and features.check(fmt)]
+
+
+def derivative_filename(version, width, fmt):
+    """Return the file name of a pre-generated derivative (e.g. thumb_3f2a9c01de_320w.webp)."""
+    return f'thumb_{version}_{width}w.{fmt}'
+
+
+def is_valid_variant_width(width):
+    """Widths must be a multiple of the resize step and not exceed the source width."""
+    step = settings.THUMBNAIL_RESIZE_WIDTH_STEP
+    return step <= width <= settings.THUMBNAIL_SIZE[0] and width % step == 0
+
+
+def resize_image(source_path, output_path, width, fmt):
+    """Resize `source_path` to `width` (keeping aspect ratio) and write it atomically as `fmt`."""
+    spec = IMAGE_FORMATS[fmt]
+    with Image.open(source_path) as image:
+        image = image.convert('RGB')
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+    output_dir = os.path.dirname(output_path)
+    os.makedirs(output_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix=f'.{fmt}.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            resized.save(f, spec['pil_format'], **spec['options'])
+        os.replace(tmp_path, output_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return output_path
+
+
+def generate_derivatives(source_path, version):
+    """
+    Write all configured width/format derivatives of thumbnail `version` next to `source_path`
+    and remove derivatives of earlier versions. Returns the written paths.
+    """
+    source_dir = os.path.dirname(source_path)
+    written = []
+    for fmt in supported_derivative_formats():
+        for width in settings.THUMBNAIL_DERIVATIVE_WIDTHS:
+            output_path = os.path.join(source_dir, derivative_filename(version, width, fmt))
+            written.append(resize_image(source_path, output_path, width, fmt))
+    _remove_stale_derivatives(source_dir, keep=written)
+    return written
+
+
+def _remove_stale_derivatives(source_dir, keep):
+    """Delete derivatives in `source_dir` that are not in `keep` (earlier or unversioned thumbnails)."""
+    keep = {os.path.basename(path) for path in keep}
+    for name in os.listdir(source_dir):
+        if DERIVATIVE_NAME_RE.match(name) and name not in keep:
+            try:
+                os.remove(os.path.join(source_dir, name))
+            except OSError:
+                pass
+
+
+def thumbnail_version(video):
+    """Short token identifying the current thumbnail file (cache busting, cache keys)."""
+    return hashlib.sha1(video.thumbnail.name.encode()).hexdigest()[:10]
+
+
+def _cache_path(video, width, fmt):
+    """Return the resize cache path for the given video/width/format."""
+    cache_dir = os.path.join(settings.THUMBNAIL_RESIZE_CACHE_DIR, str(video.id))
+    return os.path.join(cache_dir, f'{thumbnail_version(video)}_{width}w.{fmt}')
+
+
+def _touch(path):
+    """Mark a cache entry as recently used (LRU order is the file mtime)."""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def evict_resize_cache(max_bytes=None):
+    """Delete least recently used cache entries until the cache fits into `max_bytes`."""
+    max_bytes = settings.THUMBNAIL_RESIZE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = []
+    for root, _dirs, files in os.walk(settings.THUMBNAIL_RESIZE_CACHE_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _mtime, size, _path in entries)
+    freed = 0
+    for _mtime, size, path in sorted(entries):
+        if total - freed <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            freed += size
+        except OSError:
+            pass
+    return freed
+
+
+def get_or_create_variant(video, source_path, width, fmt):
+    """
+    Return the path of a `width`/`fmt` variant of the video's thumbnail.
+    Pre-generated derivatives win; other sizes go through the LRU disk cache.
+    """
+    name = derivative_filename(thumbnail_version(video), width, fmt)
+    pregenerated = os.path.join(os.path.dirname(source_path), name)
+    if os.path.isfile(pregenerated):
+        return pregenerated
+    cached = _cache_path(video, width, fmt)
+    if os.path.isfile(cached):
+        _touch(cached)
+        return cached
+    resize_image(source_path, cached, width, fmt)
+    evict_resize_cache()
+    return cached
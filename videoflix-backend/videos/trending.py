@@ -0,0 +1,219 @@
+"""
+Time-decayed trending scores.
+
+A view is recorded with a single HINCRBY into a Redis hash of pending counts.
+A periodic rollup job (RQ_CRON_JOBS) takes the pending hash and folds the counts
+into ``Video.trending_score``, an exponentially decayed view count with a
+half-life of TRENDING_HALF_LIFE_HOURS.
+
+Scores are kept in log space relative to a fixed point in time:
+``score = ln(sum(views_i * exp(lambda * t_i)))``. Adding views at time t is
+``score = logaddexp(score, ln(views) + lambda * t)``, and decay needs no write
+at all: the decayed count at time t is ``exp(score - lambda * t)`` for every
+video, so ordering by the stored score is ordering by decayed views. Only
+videos with new views are updated, and the values never overflow.
+
+``/trending/`` reads the top of the indexed score column. Per category, the
+TRENDING_CATEGORY_SIZE best videos are kept in one Redis sorted set each, with
+the same scores. Trimming those sets is exact, because decay does not change
+the relative order of videos that get no new views. Until the sets are built
+(by an enqueued rebuild), or while Redis is unavailable, the category top is
+read from the score column instead.
+"""
+import logging
+import math
+import time
+from contextlib import contextmanager
+
+import redis
+from django.conf import settings
+from django.db.models import Case, F, FloatField, Value, When, Window
+from django.db.models.functions import RowNumber
+
+from .jobs import enqueue_unique, get_redis
+from .models import Video
+
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = 'videoflix:trending:pending'  # hash: video id -> views since the last rollup
+PROCESSING_KEY = 'videoflix:trending:processing'  # pending hash taken over by a running rollup
+CATEGORY_BUILT_KEY = 'videoflix:trending:categories_built'
+ROLLUP_LOCK_KEY = 'videoflix:trending:rollup_lock'
+ROLLUP_LOCK_TIMEOUT = 15 * 60  # seconds; far longer than a rollup takes
+CATEGORY_REBUILD_JOB_ID = 'rebuild-category-trending'
+
+
+def _category_key(category_id):
+    return f'videoflix:trending:category:{category_id}'
+
+
+def decay_rate():
+    """lambda of exp(-lambda * t) in 1/seconds for the configured half-life."""
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def add_views(score, views, at):
+    """Log-space score after adding `views` at unix time `at` (logaddexp)."""
+    added = math.log(views) + decay_rate() * at
+    high, low = max(score, added), min(score, added)
+    return high + math.log1p(math.exp(low - high))
+
+
+def decayed_views(score, now=None):
+    """Decayed view count represented by a log-space score at time `now`."""
+    return math.exp(score - decay_rate() * (now or time.time()))
+
+
+def record_view(video_id):
+    """Count one view of a video for the next rollup (one Redis command)."""
+    get_redis().hincrby(PENDING_KEY, video_id, 1)
+
+
+def _take_pending(connection):
+    """
+    Return the pending counts {video id: views} and the key holding them. A hash left over
+    by a crashed rollup is processed first; otherwise the pending hash is renamed atomically.
+    """
+    if not connection.exists(PROCESSING_KEY):
+        try:
+            connection.renamenx(PENDING_KEY, PROCESSING_KEY)
+        except redis.ResponseError:  # no pending views
+            return {}
+    return {int(video_id): int(views) for video_id, views in connection.hgetall(PROCESSING_KEY).items()}
+
+
+def rollup_trending(now=None):
+    """
+    RQ task: fold the pending views into the trending scores of the videos (one UPDATE)
+    and their categories' sorted sets. Returns the number of updated videos.
+    Runs exclusively: a second rollup started meanwhile would fold the same processing
+    hash again and count its views twice, so it returns 0 right away.
+    """
+    connection = get_redis()
+    with _rollup_lock(connection) as acquired:
+        if not acquired:
+            logger.info('Trending rollup already running – skipped')
+            return 0
+        return _rollup(connection, now or time.time())
+
+
+@contextmanager
+def _rollup_lock(connection):
+    """Hold the rollup lock (non-blocking); yields whether it was acquired."""
+    lock = connection.lock(ROLLUP_LOCK_KEY, timeout=ROLLUP_LOCK_TIMEOUT, blocking=False)
+    if not lock.acquire():
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError:  # expired meanwhile
+            logger.warning('Trending rollup outlived its lock')
+
+
+def _rollup(connection, now):
+    """Rollup body (caller holds the rollup lock)."""
+    if not connection.exists(CATEGORY_BUILT_KEY):
+        _rebuild_category_sets(connection)
+    pending = _take_pending(connection)
+    if not pending:
+        return 0
+    scores = dict(
+        Video.objects.filter(pk__in=pending, status='published').values_list('id', 'trending_score')
+    )
+    new_scores = {video_id: add_views(score, pending[video_id], now) for video_id, score in scores.items()}
+    if new_scores:
+        Video.objects.filter(pk__in=new_scores).update(trending_score=Case(
+            *(When(pk=video_id, then=Value(score)) for video_id, score in new_scores.items()),
+            default=F('trending_score'),
+            output_field=FloatField(),
+        ))
+        memberships = Video.categories.through.objects.filter(video_id__in=new_scores).values_list(
+            'category_id', 'video_id'
+        )
+        by_category = {}
+        for category_id, video_id in memberships:
+            by_category.setdefault(category_id, {})[video_id] = new_scores[video_id]
+        pipe = connection.pipeline()
+        for category_id, members in by_category.items():
+            pipe.zadd(_category_key(category_id), members)
+            pipe.zremrangebyrank(_category_key(category_id), 0, -(settings.TRENDING_CATEGORY_SIZE + 1))
+        pipe.execute()
+    connection.delete(PROCESSING_KEY)
+    logger.info(f'Trending rollup: {sum(pending.values())} views, {len(new_scores)} videos updated')
+    return len(new_scores)
+
+
+def rebuild_category_trending():
+    """
+    RQ task: rebuild the per-category sorted sets from the score column (the best
+    TRENDING_CATEGORY_SIZE published videos per category, one windowed query).
+    Holds the rollup lock, so no rollup writes into the sets meanwhile; if a rollup
+    runs, the rebuild is skipped (the rollup builds missing sets itself).
+    """
+    connection = get_redis()
+    with _rollup_lock(connection) as acquired:
+        if not acquired:
+            logger.info('Trending rollup running – category rebuild skipped')
+            return 0
+        return _rebuild_category_sets(connection)
+
+
+def _rebuild_category_sets(connection):
+    """Rebuild body (caller holds the rollup lock). Returns the number of categories."""
+    rows = (
+        Video.categories.through.objects
+        .filter(video__status='published', video__trending_score__gt=0)
+        .annotate(rank=Window(
+            RowNumber(),
+            partition_by=F('category_id'),
+            order_by=[F('video__trending_score').desc(), F('video_id').desc()],
+        ))
+        .filter(rank__lte=settings.TRENDING_CATEGORY_SIZE)
+        .values_list('category_id', 'video_id', 'video__trending_score')
+    )
+    by_category = {}
+    for category_id, video_id, score in rows:
+        by_category.setdefault(category_id, {})[video_id] = score
+    stale = [key for key in connection.scan_iter(match=_category_key('*'))]
+    pipe = connection.pipeline()
+    if stale:
+        pipe.delete(*stale)
+    for category_id, members in by_category.items():
+        pipe.zadd(_category_key(category_id), members)
+    pipe.set(CATEGORY_BUILT_KEY, 1)
+    pipe.execute()
+    return len(by_category)
+
+
+def trending_in_category(queryset, category_id, limit):
+    """
+    Best `limit` videos of `queryset` in a category, read from its sorted set (O(log n + k)).
+    Falls back to the indexed score column while the sets are not built or Redis is unavailable.
+    """
+    queryset = queryset.filter(categories__id=category_id)
+    try:
+        ids = _category_trending_ids(category_id, limit)
+    except redis.RedisError as exc:
+        logger.warning(f'Trending sets unavailable, reading category {category_id} from the database: {exc}')
+        ids = None
+    if ids is None:
+        return list(queryset.order_by('-trending_score', '-id')[:limit])
+    videos = queryset.in_bulk(ids)
+    return [videos[video_id] for video_id in ids if video_id in videos][:limit]
+
+
+def _category_trending_ids(category_id, limit):
+    """
+    Video ids of the category's sorted set, best first, or None if the sets are not built yet
+    (a rebuild is enqueued; concurrent requests coalesce into the same job).
+    """
+    connection = get_redis()
+    if not connection.exists(CATEGORY_BUILT_KEY):
+        enqueue_unique(rebuild_category_trending, job_id=CATEGORY_REBUILD_JOB_ID)
+        return None
+    # Fetch a few extra ids: entries of unpublished or recategorized videos are dropped
+    # by the caller and disappear from the set with the next rebuild.
+    return [int(video_id) for video_id in connection.zrevrange(_category_key(category_id), 0, 2 * limit - 1)]
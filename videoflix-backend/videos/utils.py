@@ -3,23 +3,40 @@ Utility functions for video processing, file management, and HLS streaming.
 
 Video processing: FFmpeg commands, duration, thumbnails, HLS conversion.
 File paths: get original video path, output path, etc.
-HLS streaming: serve files with range support, M3U8/segment delivery.
+HLS streaming: serve files with range support, M3U8/segment delivery, seek and clip playlists.
 """
 import logging
+import math
 import os
+import shutil
+import signal
 import subprocess
+import time
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files import File
 from django.http import FileResponse, Http404, HttpResponse
 from rest_framework import status
 from rest_framework.response import Response
 
-from .models import Video
+from .jobs import ProcessingCancelled
+from .models import Video, VideoRendition
+from .segment_index import (
+    build_segment_index,
+    find_segment,
+    find_segment_range,
+    load_segment_index,
+    segment_record,
+    total_duration,
+)
+from .thumbnails import IMAGE_FORMATS, get_or_create_variant, is_valid_variant_width, supported_derivative_formats
 
 logger = logging.getLogger(__name__)
 STREAM_CHUNK_SIZE = 1024 * 1024
+CANCEL_POLL_INTERVAL = 1  # seconds between cancellation checks while FFmpeg runs
 VALID_HLS_RESOLUTIONS = ['360p', '480p', '720p', '1080p']
+RENDITION_CODEC = 'h264'
 
 
 def get_video_by_id(video_id):
@@ -83,63 +100,138 @@ def get_output_path(input_path, suffix):
     return os.path.join(output_dir, output_filename)
 
 
-def get_quality_settings(resolution):
-    """Get video quality settings for resolution"""
-    return settings.VIDEO_RESOLUTIONS.get(resolution, {})
+def get_quality_settings(resolution, complexity_factor=1.0):
+    """Get video quality settings for resolution, bitrate scaled by the title's complexity factor"""
+    quality_settings = dict(settings.VIDEO_RESOLUTIONS.get(resolution, {}))
+    if quality_settings and complexity_factor != 1.0:
+        bitrate_kbps = parse_bitrate_kbps(quality_settings.get('bitrate', '2800k'))
+        quality_settings['bitrate'] = f'{int(bitrate_kbps * complexity_factor)}k'
+    return quality_settings
 
 
-def build_ffmpeg_command(input_path, output_path, settings_dict):
-    """Build FFmpeg command for video conversion"""
-    width = settings_dict.get('width', 1280)
-    height = settings_dict.get('height', 720)
-    bitrate = settings_dict.get('bitrate', '2800k')
-    
-    return [
-        'ffmpeg', '-i', input_path,
-        '-c:v', 'libx264', '-preset', 'medium',
-        '-crf', '23', '-vf', f'scale={width}:{height}',
-        '-b:v', bitrate, '-c:a', 'aac', '-b:a', '128k',
-        '-movflags', '+faststart', '-y', output_path
+def parse_bitrate_kbps(bitrate):
+    """Parse an FFmpeg bitrate string ('2800k', '5M') into kbit/s"""
+    value = str(bitrate).strip().lower()
+    if value.endswith('m'):
+        return int(float(value[:-1]) * 1000)
+    if value.endswith('k'):
+        return int(float(value[:-1]))
+    return int(float(value) / 1000)
+
+
+def get_rate_control(settings_dict):
+    """Merge the rendition's rate control profile with per-rendition overrides"""
+    profile_name = settings_dict.get('rate_control', settings.DEFAULT_RATE_CONTROL_PROFILE)
+    profile = dict(settings.VIDEO_RATE_CONTROL_PROFILES[profile_name])
+    profile.update({key: settings_dict[key] for key in profile if key in settings_dict})
+    return profile
+
+
+def build_rate_control_args(settings_dict, segment_duration=None):
+    """
+    Build libx264 rate control arguments: capped CRF with VBV (-maxrate/-bufsize).
+    With `segment_duration`, keyframes are forced on segment boundaries (closed GOPs per segment).
+    """
+    profile = get_rate_control(settings_dict)
+    bitrate_kbps = parse_bitrate_kbps(settings_dict.get('bitrate', '2800k'))
+    args = ['-c:v', 'libx264', '-preset', profile['preset']]
+    if profile.get('tune'):
+        args += ['-tune', profile['tune']]
+    args += [
+        '-crf', str(profile['crf']),
+        '-maxrate', f'{int(bitrate_kbps * profile["maxrate_factor"])}k',
+        '-bufsize', f'{int(bitrate_kbps * profile["bufsize_factor"])}k',
     ]
+    if segment_duration:
+        args += ['-force_key_frames', f'expr:gte(t,n_forced*{segment_duration})', '-sc_threshold', '0']
+    return args
+
+
+def thread_limit_args(threads, option):
+    """
+    Return [option, threads] if a thread count is given. FFmpeg's -threads only applies to the
+    decoder or encoder next to it, so budgeted commands limit decode (before every -i),
+    filtering (-filter_threads / -filter_complex_threads) and encode (after the codec) each.
+    """
+    return [option, str(threads)] if threads else []
 
 
-def build_hls_ffmpeg_command(input_path, output_dir, settings_dict):
-    """Build FFmpeg command for HLS conversion"""
+def build_hls_ffmpeg_command(input_path, output_dir, settings_dict, threads=None):
+    """Build FFmpeg command for HLS conversion (decode, scale and encode limited to `threads` if given)"""
     width = settings_dict.get('width', 1280)
     height = settings_dict.get('height', 720)
-    bitrate = settings_dict.get('bitrate', '2800k')
+    segment_duration = settings.HLS_SEGMENT_DURATION
     m3u8_path = os.path.join(output_dir, 'index.m3u8')
     segment_pattern = os.path.join(output_dir, 'segment_%03d.ts')
     
     return [
-        'ffmpeg', '-i', input_path,
-        '-c:v', 'libx264', '-preset', 'medium',
-        '-crf', '23', '-vf', f'scale={width}:{height}',
-        '-b:v', bitrate, '-c:a', 'aac', '-b:a', '128k',
-        '-f', 'hls', '-hls_time', '10',
+        'ffmpeg',
+        *thread_limit_args(threads, '-filter_threads'),
+        *thread_limit_args(threads, '-threads'), '-i', input_path,
+        *build_rate_control_args(settings_dict, segment_duration),
+        *thread_limit_args(threads, '-threads'),
+        '-vf', f'scale={width}:{height}',
+        '-c:a', 'aac', '-b:a', '128k',
+        '-f', 'hls', '-hls_time', str(segment_duration),
         '-hls_list_size', '0', '-hls_segment_filename',
         segment_pattern, '-y', m3u8_path
     ]
 
 
-def run_ffmpeg_command(command):
-    """Execute FFmpeg command and return success status"""
-    logger.info(f'Running FFmpeg: {" ".join(command)}')
-    process = subprocess.run(
+def _lower_process_priority():
+    """preexec_fn: lower the CPU priority of the child so HTTP serving stays responsive."""
+    os.nice(settings.VIDEO_ENCODE_NICE)
+
+
+def _low_priority_options(command):
+    """Return (command, subprocess kwargs) for running `command` niced and with idle-ish IO priority."""
+    if settings.VIDEO_ENCODE_IONICE and shutil.which('ionice'):
+        command = ['ionice', '-c', '2', '-n', '7', *command]
+    return command, {'preexec_fn': _lower_process_priority}
+
+
+def _run_process(command, text, low_priority=False, cancel=None):
+    """
+    Run `command` in its own process group and return (returncode, stdout, stderr).
+    With a `cancel` token (videos.jobs.CancelToken) the token is polled while the process
+    runs; on cancellation the whole process group is killed and ProcessingCancelled raised.
+    """
+    kwargs = {}
+    if low_priority:
+        command, kwargs = _low_priority_options(command)
+    process = subprocess.Popen(
         command,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
-        text=True
+        text=text,
+        start_new_session=True,
+        **kwargs
     )
-    return process.returncode == 0, process.stderr
+    timeout = CANCEL_POLL_INTERVAL if cancel is not None else None
+    while True:
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+            return process.returncode, stdout, stderr
+        except subprocess.TimeoutExpired:
+            if cancel.cancelled:
+                _kill_process_group(process)
+                raise ProcessingCancelled(f'Processing of video ID {cancel.video_id} was cancelled')
+
+
+def _kill_process_group(process):
+    """Kill a process started with start_new_session=True and all its children."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.communicate()
 
 
-def save_video_file(video, field_name, file_path):
-    """Save converted video file to model field"""
-    filename = os.path.basename(file_path)
-    with open(file_path, 'rb') as f:
-        field = getattr(video, field_name)
-        field.save(filename, File(f), save=True)
+def run_ffmpeg_command(command, low_priority=False, cancel=None):
+    """Execute FFmpeg command and return success status"""
+    logger.info(f'Running FFmpeg: {" ".join(command)}')
+    returncode, _stdout, stderr = _run_process(command, True, low_priority, cancel)
+    return returncode == 0, stderr
 
 
 def get_video_duration_seconds(video_path):
@@ -167,22 +259,145 @@ def get_video_duration_seconds(video_path):
         return 0
 
 
-def create_hls_directory(base_path, resolution):
-    """Create HLS output directory"""
-    hls_dir = os.path.join(base_path, f'hls_{resolution}')
-    os.makedirs(hls_dir, exist_ok=True)
-    return hls_dir
+HLS_STAGING_SUFFIX = '.partial'
+HLS_REPLACED_SUFFIX = '.old'
+
+
+def create_hls_staging_directory(base_path, resolution):
+    """
+    Create an empty staging directory for an HLS rendition. FFmpeg writes into it and it is
+    renamed into place by publish_hls_directory only on success, so a crash never leaves a
+    half-written hls_<resolution> directory behind.
+    """
+    staging_dir = os.path.join(base_path, f'hls_{resolution}{HLS_STAGING_SUFFIX}')
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.mkdir(staging_dir)  # no parents: never recreate the dir of a deleted video
+    return staging_dir
+
+
+def publish_hls_directory(staging_dir):
+    """Rename a finished staging directory to its final hls_<resolution> name (replacing an old one)"""
+    final_dir = staging_dir[:-len(HLS_STAGING_SUFFIX)]
+    replaced_dir = f'{final_dir}{HLS_REPLACED_SUFFIX}'
+    if os.path.isdir(final_dir):
+        shutil.rmtree(replaced_dir, ignore_errors=True)
+        os.rename(final_dir, replaced_dir)
+    os.rename(staging_dir, final_dir)
+    shutil.rmtree(replaced_dir, ignore_errors=True)
+    return final_dir
+
+
+def is_complete_playlist(m3u8_path):
+    """Return True if the playlist exists and was finalized by FFmpeg (#EXT-X-ENDLIST)."""
+    try:
+        with open(m3u8_path, 'r', encoding='utf-8') as f:
+            return '#EXT-X-ENDLIST' in f.read()
+    except OSError:
+        return False
+
+
+def remove_partial_renditions(video_dir):
+    """
+    Remove leftovers of interrupted encodes in a video directory: staging and replaced
+    directories, and hls_* directories without a finalized playlist. Returns removed paths.
+    """
+    if not os.path.isdir(video_dir):
+        return []
+    removed = []
+    for name in os.listdir(video_dir):
+        path = os.path.join(video_dir, name)
+        if not name.startswith('hls_') or not os.path.isdir(path):
+            continue
+        leftover = name.endswith((HLS_STAGING_SUFFIX, HLS_REPLACED_SUFFIX))
+        if leftover or not is_complete_playlist(os.path.join(path, 'index.m3u8')):
+            shutil.rmtree(path, ignore_errors=True)
+            removed.append(path)
+    return removed
 
 
 def build_thumbnail_command(input_path, output_path, timestamp='00:00:05'):
-    """Build FFmpeg command for thumbnail generation"""
+    """Build FFmpeg command for thumbnail generation (input seeking: -ss before -i)"""
+    width, height = settings.THUMBNAIL_SIZE
     return [
-        'ffmpeg', '-i', input_path, '-ss', timestamp,
-        '-vframes', '1', '-vf', 'scale=1280:720',
+        'ffmpeg', '-ss', timestamp, '-i', input_path,
+        '-vframes', '1', '-vf', f'scale={width}:{height}',
         '-q:v', '2', '-y', output_path
     ]
 
 
+def get_sample_timestamps(duration_seconds, count):
+    """
+    Return `count` seek positions spread over the video, skipping intro and credits.
+    Falls back to the first seconds when the duration is unknown.
+    """
+    if duration_seconds <= 0:
+        return [float(i) for i in range(count)]
+    start = duration_seconds * 0.05
+    span = duration_seconds * 0.85
+    step = span / count
+    return [round(start + step * i, 3) for i in range(count)]
+
+
+def build_thumbnail_candidates_command(input_path, timestamps):
+    """
+    Build one FFmpeg command that seeks on input to every timestamp, decodes only
+    the keyframe found there and writes all frames as raw RGB24 to stdout.
+    """
+    width, height = settings.THUMBNAIL_SIZE
+    command = ['ffmpeg', '-v', 'error']
+    for timestamp in timestamps:
+        command += ['-skip_frame', 'nokey', '-noaccurate_seek', '-ss', str(timestamp), '-i', input_path]
+    chains = [
+        f'[{i}:v:0]trim=end_frame=1,scale={width}:{height},setsar=1[c{i}]'
+        for i in range(len(timestamps))
+    ]
+    inputs = ''.join(f'[c{i}]' for i in range(len(timestamps)))
+    filter_graph = ';'.join(chains) + f';{inputs}concat=n={len(timestamps)}:v=1:a=0[out]'
+    return command + [
+        '-filter_complex', filter_graph, '-map', '[out]',
+        '-frames:v', str(len(timestamps)), '-fps_mode', 'vfr',
+        '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1'
+    ]
+
+
+def build_complexity_probe_command(input_path, timestamps, chunk_seconds, probe_settings, threads=None):
+    """
+    Build one FFmpeg command that encodes short chunks at the given timestamps with a
+    low-res CRF encode and writes the raw H.264 stream to stdout (only its size matters).
+    """
+    width, height = probe_settings['width'], probe_settings['height']
+    command = ['ffmpeg', '-v', 'error', *thread_limit_args(threads, '-filter_complex_threads')]
+    for timestamp in timestamps:
+        command += [*thread_limit_args(threads, '-threads'), '-ss', str(timestamp), '-t', str(chunk_seconds),
+                    '-i', input_path]
+    chains = [f'[{i}:v:0]scale={width}:{height},setsar=1[c{i}]' for i in range(len(timestamps))]
+    inputs = ''.join(f'[c{i}]' for i in range(len(timestamps)))
+    filter_graph = ';'.join(chains) + f';{inputs}concat=n={len(timestamps)}:v=1:a=0[out]'
+    return command + [
+        '-filter_complex', filter_graph, '-map', '[out]', '-an',
+        '-c:v', 'libx264', '-preset', probe_settings['preset'], '-crf', str(probe_settings['crf']),
+        *thread_limit_args(threads, '-threads'),
+        '-f', 'h264', 'pipe:1'
+    ]
+
+
+def complexity_factor_from_probe(encoded_bytes, sampled_seconds, probe_settings):
+    """Map the probe bitrate onto a bitrate factor, clamped to VIDEO_COMPLEXITY_FACTOR_RANGE"""
+    if sampled_seconds <= 0 or encoded_bytes <= 0:
+        return 1.0
+    measured_kbps = encoded_bytes * 8 / 1000 / sampled_seconds
+    low, high = settings.VIDEO_COMPLEXITY_FACTOR_RANGE
+    factor = measured_kbps / probe_settings['reference_kbps']
+    return round(min(max(factor, low), high), 3)
+
+
+def run_ffmpeg_capture(command, low_priority=False, cancel=None):
+    """Execute FFmpeg command and return (success, stdout bytes, stderr text)"""
+    logger.info(f'Running FFmpeg: {" ".join(command)}')
+    returncode, stdout, stderr = _run_process(command, False, low_priority, cancel)
+    return returncode == 0, stdout, stderr.decode(errors='replace')
+
+
 def save_thumbnail_file(video, file_path):
     """Save thumbnail file to video model."""
     filename = os.path.basename(file_path)
@@ -272,6 +487,127 @@ def build_m3u8_path(original_path, resolution):
     return os.path.join(hls_dir, 'index.m3u8')
 
 
+def hls_rendition_exists(original_path, resolution):
+    """Return True if the rendition's index.m3u8 exists on disk."""
+    return os.path.isfile(build_m3u8_path(original_path, resolution))
+
+
+def parse_media_playlist(m3u8_path):
+    """Return ([(segment name, duration in seconds), ...], finalized) of an HLS media playlist."""
+    entries, duration, finalized = [], 0.0, False
+    with open(m3u8_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('#EXTINF:'):
+                duration = float(line[len('#EXTINF:'):].split(',', 1)[0] or 0)
+            elif line == '#EXT-X-ENDLIST':
+                finalized = True
+            elif line and not line.startswith('#'):
+                entries.append((line, duration))
+                duration = 0.0
+    return entries, finalized
+
+
+def measure_hls_rendition(hls_dir):
+    """Measure a finished rendition: segment count, bytes, peak and average bandwidth (bit/s)."""
+    entries, _finalized = parse_media_playlist(os.path.join(hls_dir, 'index.m3u8'))
+    total_bytes, total_duration, peak = 0, 0.0, 0.0
+    for name, duration in entries:
+        size = os.path.getsize(os.path.join(hls_dir, name))
+        total_bytes += size
+        total_duration += duration
+        if duration > 0:
+            peak = max(peak, size * 8 / duration)
+    return {
+        'segment_count': len(entries),
+        'bytes': total_bytes,
+        'bandwidth': int(peak),
+        'average_bandwidth': int(total_bytes * 8 / total_duration) if total_duration else 0,
+    }
+
+
+def save_rendition_inventory(video, resolution, hls_dir):
+    """Record a finished HLS rendition (measured from disk) as ready in VideoRendition."""
+    quality = settings.VIDEO_RESOLUTIONS[resolution]
+    rendition, _created = VideoRendition.objects.update_or_create(
+        video=video,
+        resolution=resolution,
+        defaults={
+            'codec': RENDITION_CODEC,
+            'width': quality['width'],
+            'height': quality['height'],
+            'is_ready': True,
+            **measure_hls_rendition(hls_dir),
+        }
+    )
+    return rendition
+
+
+def sync_rendition_inventory(video, healthy_resolutions):
+    """Mark exactly the given on-disk renditions as ready (records missing rows, unsets vanished ones)."""
+    original_path = get_original_video_path(video)
+    ready = get_ready_resolutions(video)
+    for resolution in set(healthy_resolutions) - ready:
+        save_rendition_inventory(video, resolution, os.path.dirname(build_m3u8_path(original_path, resolution)))
+    if ready - set(healthy_resolutions):
+        video.renditions.filter(is_ready=True).exclude(resolution__in=healthy_resolutions).update(is_ready=False)
+
+
+def get_ready_resolutions(video):
+    """Return the set of resolutions with a ready rendition (one indexed query)."""
+    return set(video.renditions.filter(is_ready=True).values_list('resolution', flat=True))
+
+
+def find_nearest_available_resolution(available, resolution):
+    """Return the resolution in `available` closest in height (lower preferred on ties), or None."""
+    target = settings.VIDEO_RESOLUTIONS.get(resolution, {}).get('height', 0)
+
+    def distance(candidate):
+        height = settings.VIDEO_RESOLUTIONS[candidate]['height']
+        return abs(height - target), height > target
+
+    for candidate in sorted(VALID_HLS_RESOLUTIONS, key=distance):
+        if candidate != resolution and candidate in available:
+            return candidate
+    return None
+
+
+def rewrite_playlist_segments(content, resolution):
+    """Point relative segment URIs of a playlist at another rendition (../<resolution>/segment)."""
+    lines = []
+    for line in content.splitlines():
+        if line and not line.startswith('#') and '/' not in line:
+            line = f'../{resolution}/{line}'
+        lines.append(line)
+    return '\n'.join(lines) + '\n'
+
+
+def _rendition_access_key(video_id, resolution):
+    return f'rendition_last_access:{video_id}:{resolution}'
+
+
+def record_rendition_access(video_id, resolution):
+    """Remember when a rendition playlist was last requested (used for pruning)."""
+    cache.set(_rendition_access_key(video_id, resolution), time.time(), timeout=None)
+
+
+def get_rendition_last_access(video_id, resolution):
+    """Return the timestamp of the last playlist request, or None if unknown."""
+    return cache.get(_rendition_access_key(video_id, resolution))
+
+
+def get_directory_size(path):
+    """Return the total size in bytes of all files below path."""
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
 def create_m3u8_response(content, filename='index.m3u8'):
     """Create M3U8 HTTP response."""
     response = HttpResponse(content, content_type='application/vnd.apple.mpegurl')
@@ -307,6 +643,109 @@ def serve_m3u8_or_fallback(m3u8_path, original_path):
     return None
 
 
+def serve_nearest_rendition_playlist(original_path, resolution, available):
+    """
+    Serve the playlist of the nearest rendition in `available` (segment URIs rewritten to it).
+    Returns None if no rendition is available yet.
+    """
+    fallback = find_nearest_available_resolution(available, resolution)
+    if not fallback:
+        return None
+    content = read_m3u8_file(build_m3u8_path(original_path, fallback))
+    if not content:
+        return None
+    response = create_m3u8_response(rewrite_playlist_segments(content, fallback))
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+def write_segment_index(hls_dir):
+    """Build the binary segment index of a rendition from its playlist (see videos.segment_index)."""
+    entries, _finalized = parse_media_playlist(os.path.join(hls_dir, 'index.m3u8'))
+    return build_segment_index(hls_dir, entries)
+
+
+def get_segment_index(original_path, resolution):
+    """
+    Return the memory-mapped segment index of a rendition, building it once from the
+    playlist for renditions encoded before indexes existed. Raises Http404 if the
+    rendition does not exist.
+    """
+    hls_dir = os.path.dirname(build_m3u8_path(original_path, resolution))
+    index = load_segment_index(hls_dir)
+    if index is not None:
+        return index
+    if not is_complete_playlist(os.path.join(hls_dir, 'index.m3u8')):
+        raise Http404(f'Rendition {resolution} not available')
+    try:
+        write_segment_index(hls_dir)
+    except (OSError, ValueError) as error:
+        logger.warning('Could not build segment index for %s: %s', hls_dir, error)
+        raise Http404(f'Rendition {resolution} not available')
+    return load_segment_index(hls_dir)
+
+
+def parse_seconds_param(value, name):
+    """Parse a time query parameter in seconds. Returns (seconds, None) or (None, 400 Response)."""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        seconds = None
+    if seconds is None or not math.isfinite(seconds) or seconds < 0:
+        return None, Response(
+            {'error': f'Parameter {name} must be a non-negative number of seconds.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return seconds, None
+
+
+def serve_segment_seek(original_path, resolution, seconds):
+    """Return the segment containing `seconds` (name, start, duration, byte offset and size)."""
+    index = get_segment_index(original_path, resolution)
+    position = find_segment(index, seconds)
+    if position is None:
+        return Response(
+            {'error': f'Time {seconds} is outside the video (duration {total_duration(index):.3f}s).'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return Response({
+        **segment_record(index, position),
+        'resolution': resolution,
+        'segment_offset': round(seconds - float(index['start'][position]), 3),
+    })
+
+
+def build_clip_playlist(index, first, last, start):
+    """Media playlist of segments [first, last), starting playback at `start` seconds."""
+    clip = index[first:last]
+    target_duration = math.ceil(float(clip['duration'].max()))
+    lines = [
+        '#EXTM3U',
+        '#EXT-X-VERSION:6',
+        f'#EXT-X-TARGETDURATION:{target_duration}',
+        f'#EXT-X-MEDIA-SEQUENCE:{first}',
+        '#EXT-X-PLAYLIST-TYPE:VOD',
+        f'#EXT-X-START:TIME-OFFSET={start - float(clip["start"][0]):.3f},PRECISE=YES',
+    ]
+    for record in clip:
+        lines.append(f'#EXTINF:{float(record["duration"]):.6f},')
+        lines.append(record['name'].decode('utf-8'))
+    lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines) + '\n'
+
+
+def serve_clip_playlist(original_path, resolution, start, end):
+    """Serve a playlist with only the segments covering [start, end) of a rendition."""
+    index = get_segment_index(original_path, resolution)
+    segment_range = find_segment_range(index, start, end)
+    if segment_range is None:
+        return Response(
+            {'error': f'Invalid clip range {start}-{end} (duration {total_duration(index):.3f}s).'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    return create_m3u8_response(build_clip_playlist(index, *segment_range, start), filename='clip.m3u8')
+
+
 def validate_segment_name(segment):
     r"""Raise Http404 if segment contains path traversal (.. or / or \)."""
     if '..' in segment or '/' in segment or '\\' in segment:
@@ -345,3 +784,21 @@ def serve_ts_segment(original_path, resolution, segment):
         return response
     except IOError:
         raise Http404('Error reading segment file')
+
+
+def serve_thumbnail_variant(video, width, fmt):
+    """Serve a resized thumbnail (pre-generated or from the resize cache). Raises Http404 if unavailable."""
+    if fmt not in supported_derivative_formats() or not is_valid_variant_width(width):
+        raise Http404('Unsupported thumbnail size or format')
+    if not video.thumbnail:
+        raise Http404('Thumbnail not found')
+    source_path = os.path.join(settings.MEDIA_ROOT, video.thumbnail.name)
+    if not os.path.isfile(source_path):
+        raise Http404('Thumbnail not found')
+    try:
+        variant_path = get_or_create_variant(video, source_path, width, fmt)
+        response = FileResponse(open(variant_path, 'rb'), content_type=IMAGE_FORMATS[fmt]['content_type'])
+    except (OSError, ValueError):
+        raise Http404('Error reading thumbnail')
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response